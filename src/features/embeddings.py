@@ -0,0 +1,165 @@
+# src/features/embeddings.py
+# Caché de embeddings de oración de un encoder congelado (BERT de
+# train_transformer), para entrenar cabezas lineales/MLP sin volver a pasar
+# por el encoder. Un directorio por (model_id, max_length, pooling, dtype):
+#   <dir>/keys.bin  -> hash (blake2b 16B) del texto de cada fila, sólo append
+#   <dir>/emb.bin   -> matriz (n, dim) cruda, memory-mappeable, sólo append
+#   <dir>/meta.json -> dim, dtype (n sale del tamaño de los .bin)
+# Textos nuevos se codifican y se agregan al final; lo ya visto no se recalcula.
+import hashlib, json, os
+import numpy as np
+from src.common.paths import pjoin
+from src.common.logging import get_logger
+
+log = get_logger("features.embeddings")
+
+EMB_DIR = pjoin("data", "processed", "emb_cache")
+BATCH = 64
+
+
+def text_key(text) -> bytes:
+    return hashlib.blake2b(str(text).encode("utf-8"), digest_size=16).digest()
+
+
+class MeanPoolEncoder:
+    """Encoder HF congelado → media de los estados ocultos (sin padding)."""
+
+    def __init__(self, model_id, max_length=256, batch_size=BATCH):
+        import torch
+        from transformers import AutoTokenizer, AutoModel
+
+        self.torch = torch
+        self.tok = AutoTokenizer.from_pretrained(model_id, use_fast=True)
+        self.model = AutoModel.from_pretrained(model_id).eval()
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.dim = int(self.model.config.hidden_size)
+
+    def __call__(self, texts) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        # orden por longitud: lotes homogéneos, menos padding
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        with self.torch.inference_mode():
+            for i in range(0, len(order), self.batch_size):
+                idx = order[i : i + self.batch_size]
+                enc = self.tok(
+                    [texts[j] for j in idx],
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors="pt",
+                )
+                h = self.model(**enc).last_hidden_state
+                m = enc["attention_mask"].unsqueeze(-1).to(h.dtype)
+                out[idx] = ((h * m).sum(1) / m.sum(1).clamp(min=1)).float().numpy()
+        return out
+
+
+class EmbeddingCache:
+    def __init__(self, model_id, max_length=256, pooling="mean", dtype="float16"):
+        raw = json.dumps([model_id, int(max_length), pooling, dtype])
+        key = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+        self.path = os.path.join(str(EMB_DIR), key)
+        self.model_id = model_id
+        self.max_length = int(max_length)
+        self.dtype = np.dtype(dtype)
+        self._encoder = None
+        os.makedirs(self.path, exist_ok=True)
+        self._kpath = os.path.join(self.path, "keys.bin")
+        self._epath = os.path.join(self.path, "emb.bin")
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {"model_id": model_id, "pooling": pooling, "dim": None, "n": 0}
+            self.meta.update(max_length=self.max_length, dtype=self.dtype.name)
+        self._keys = self._load_keys()
+        self._pos = {k: i for i, k in enumerate(self._keys)}
+
+    def _load_keys(self) -> list:
+        """n = filas completas en ambos .bin; un append cortado a medias se recorta."""
+        dim = self.meta["dim"]
+        old = os.path.join(self.path, "keys.npy")
+        if dim and os.path.exists(old) and not os.path.exists(self._kpath):
+            # formato anterior: keys.npy uint8 (n, 16) reescrito en cada bloque
+            with open(self._kpath, "wb") as f:
+                f.write(np.load(old)[: self.meta["n"]].tobytes())
+            os.remove(old)
+        if not dim or not os.path.exists(self._kpath):
+            for p in (self._kpath, self._epath):
+                if os.path.exists(p):
+                    os.remove(p)
+            return []
+        row = dim * self.dtype.itemsize
+        n = min(
+            os.path.getsize(self._kpath) // 16,
+            os.path.getsize(self._epath) // row if os.path.exists(self._epath) else 0,
+        )
+        for p, size in ((self._kpath, n * 16), (self._epath, n * row)):
+            if os.path.getsize(p) != size:
+                with open(p, "r+b") as f:
+                    f.truncate(size)
+        self.meta["n"] = n
+        with open(self._kpath, "rb") as f:
+            raw = f.read()
+        return [raw[i : i + 16] for i in range(0, len(raw), 16)]
+
+    def _save_meta(self):
+        self.meta["n"] = len(self._keys)
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = MeanPoolEncoder(self.model_id, self.max_length)
+        return self._encoder
+
+    def matrix(self) -> np.ndarray:
+        n, dim = self.meta["n"], self.meta["dim"]
+        if not n:
+            return np.zeros((0, dim or 0), dtype=self.dtype)
+        return np.memmap(
+            os.path.join(self.path, "emb.bin"),
+            dtype=self.dtype,
+            mode="r",
+            shape=(n, dim),
+        )
+
+    def _append(self, keys, emb: np.ndarray):
+        if self.meta["dim"] is None:
+            self.meta["dim"] = int(emb.shape[1])
+            self._save_meta()  # dim hace falta para leer emb.bin tras un corte
+        # emb primero: una clave sin fila se descarta al cargar
+        with open(self._epath, "ab") as f:
+            f.write(np.ascontiguousarray(emb, dtype=self.dtype).tobytes())
+        with open(self._kpath, "ab") as f:
+            f.write(b"".join(keys))
+        for k in keys:
+            self._pos[k] = len(self._keys)
+            self._keys.append(k)
+        self.meta["n"] = len(self._keys)
+
+    def embed(self, texts, chunk=4096) -> np.ndarray:
+        """
+        Embeddings (float32) alineados con `texts`. Sólo codifica los textos
+        cuyo hash no está en caché; guarda por bloques para poder cortar.
+        """
+        texts = [str(t) for t in texts]
+        keys = [text_key(t) for t in texts]
+        todo = {}
+        for k, t in zip(keys, texts):
+            if k not in self._pos and k not in todo:
+                todo[k] = t
+        if todo:
+            log.info("Embeddings: %d en caché | %d nuevos", len(self._pos), len(todo))
+            ks = list(todo)
+            for i in range(0, len(ks), chunk):
+                part = ks[i : i + chunk]
+                self._append(part, self.encoder([todo[k] for k in part]))
+            self._save_meta()
+        else:
+            log.info("Embeddings: %d textos, todos en caché", len(texts))
+        M = self.matrix()
+        return np.asarray(M[[self._pos[k] for k in keys]], dtype=np.float32)
@@ -0,0 +1,157 @@
+# src/features/lexicon.py
+# Expansión semántica de los léxicos de aspectos (absa_extract.ASPECTOS).
+# 1) Vocabulario del corpus (feature store "bow", con df mínimo) ∩ palabras con
+#    vector en es_core_news_md → matriz float32 normalizada (índice en disco).
+# 2) Top-k por bloques con NumPy (producto punto = coseno) desde cada semilla.
+# 3) Propuestas por aspecto con similitud → reports/lexicon_candidatos.csv y
+#    léxico expandido + lookup precompilado token→aspectos para absa_extract:
+#      python -m src.features.lexicon --accept 0.6
+#      python -m src.models.absa_extract --lexicon data/processed/aspectos_expandidos.json
+import argparse, hashlib, json, os
+import numpy as np
+import pandas as pd
+from src.common.paths import pjoin
+from src.common.logging import get_logger
+from src.features.store import get_store, doc_freq
+
+log = get_logger("features.lexicon")
+
+INDEX_DIR = pjoin("data", "processed", "lex_index")
+LEXICON_OUT = pjoin("data", "processed", "aspectos_expandidos.json")
+BLOCK = 8192
+TOPK = 50
+
+
+def build_index(csv_path, spacy_model="es_core_news_md", min_df=3):
+    """(términos, V normalizada float32) del vocabulario del corpus con vector."""
+    store = get_store(csv_path, "bow")
+    raw = json.dumps([store.path, spacy_model, min_df])
+    out = os.path.join(str(INDEX_DIR), hashlib.sha1(raw.encode()).hexdigest()[:12])
+    if os.path.exists(os.path.join(out, "V.npy")):
+        log.info("Índice de vectores en caché: %s", out)
+        return np.load(os.path.join(out, "terms.npy")), np.load(
+            os.path.join(out, "V.npy"), mmap_mode="r"
+        )
+
+    import spacy
+
+    nlp = spacy.load(spacy_model, disable=["parser", "ner", "tagger", "textcat"])
+    df = doc_freq(store.X)
+    vocab = store.vocab
+    terms, rows = [], []
+    for j in np.flatnonzero(df >= min_df):
+        t = str(vocab[j])
+        # sólo palabras: fuera marcas de negación (no_x), emojis (:x:) y números
+        if not t.isalpha():
+            continue
+        lex = nlp.vocab[t]
+        if lex.has_vector:
+            terms.append(t)
+            rows.append(lex.vector)
+    if not rows:
+        raise RuntimeError(f"Ningún término del corpus tiene vector en {spacy_model}")
+    V = np.asarray(rows, dtype=np.float32)
+    V /= np.linalg.norm(V, axis=1, keepdims=True).clip(min=1e-12)
+    os.makedirs(out, exist_ok=True)
+    np.save(os.path.join(out, "terms.npy"), np.array(terms))
+    np.save(os.path.join(out, "V.npy"), V)
+    log.info("Índice: %d términos x %d dims -> %s", *V.shape, out)
+    return np.array(terms), V
+
+
+def topk_blocked(Q: np.ndarray, V: np.ndarray, k: int = TOPK, block: int = BLOCK):
+    """
+    Top-k por coseno de cada fila de Q contra V (ambas normalizadas), recorriendo
+    V por bloques: memoria O(len(Q) * (block + k)). Devuelve (idx, sims) ordenados.
+    """
+    m = len(Q)
+    best_i = np.zeros((m, 0), dtype=np.int64)
+    best_s = np.zeros((m, 0), dtype=np.float32)
+    for j in range(0, len(V), block):
+        S = Q @ np.asarray(V[j : j + block]).T
+        kk = min(k, S.shape[1])
+        part = np.argpartition(-S, kk - 1, axis=1)[:, :kk]
+        cand_i = np.concatenate([best_i, part + j], axis=1)
+        cand_s = np.concatenate([best_s, np.take_along_axis(S, part, 1)], axis=1)
+        kk = min(k, cand_s.shape[1])
+        sel = np.argpartition(-cand_s, kk - 1, axis=1)[:, :kk]
+        best_i = np.take_along_axis(cand_i, sel, 1)
+        best_s = np.take_along_axis(cand_s, sel, 1)
+    order = np.argsort(-best_s, axis=1)
+    return np.take_along_axis(best_i, order, 1), np.take_along_axis(best_s, order, 1)
+
+
+def propose(aspectos: dict, terms, V, k=TOPK, min_sim=0.5) -> pd.DataFrame:
+    """
+    Candidatos por aspecto: vecinos de cada semilla con vector; un término
+    queda en el aspecto con mayor similitud y se descartan los ya presentes.
+    """
+    pos = {t: i for i, t in enumerate(terms)}
+    known = set().union(*aspectos.values())
+    seeds = [(a, w) for a, lex in aspectos.items() for w in sorted(lex) if w in pos]
+    if not seeds:
+        return pd.DataFrame(columns=["aspecto", "termino", "sim", "semilla"])
+    Q = np.asarray(V[[pos[w] for _, w in seeds]], dtype=np.float32)
+    idx, sims = topk_blocked(Q, V, k + 1)  # +1: la semilla se encuentra a sí misma
+    rows = [
+        (a, str(terms[i]), float(s), w)
+        for (a, w), ii, ss in zip(seeds, idx, sims)
+        for i, s in zip(ii, ss)
+        if s >= min_sim and str(terms[i]) not in known
+    ]
+    cand = pd.DataFrame(rows, columns=["aspecto", "termino", "sim", "semilla"])
+    cand = cand.sort_values("sim", ascending=False).drop_duplicates("termino")
+    return cand.sort_values(["aspecto", "sim"], ascending=[True, False])
+
+
+def compile_lookup(aspectos: dict) -> dict:
+    """Léxico → {"aspects": [...], "index": {token: bitmask}} (ver absa_extract)."""
+    names = list(aspectos)
+    index: dict[str, int] = {}
+    for i, a in enumerate(names):
+        for w in aspectos[a]:
+            index[w] = index.get(w, 0) | (1 << i)
+    return {"aspects": names, "index": index}
+
+
+def run(args):
+    from src.models.absa_extract import ASPECTOS, input_path
+
+    terms, V = build_index(args.input or input_path(), args.spacy_model, args.min_df)
+    cand = propose(ASPECTOS, terms, V, args.k, args.min_sim)
+    os.makedirs("reports", exist_ok=True)
+    out_csv = pjoin("reports", "lexicon_candidatos.csv")
+    cand.to_csv(out_csv, index=False)
+    print(f"Candidatos: {len(cand)} -> {out_csv}")
+
+    acc = cand[cand["sim"] >= args.accept]
+    expanded = {a: sorted(lex) for a, lex in ASPECTOS.items()}
+    for a, g in acc.groupby("aspecto"):
+        expanded[a] = sorted(set(expanded[a]) | set(g["termino"]))
+    state = {
+        "lexicon": expanded,
+        "accept": args.accept,
+        "added": {a: sorted(g["termino"]) for a, g in acc.groupby("aspecto")},
+        **compile_lookup(expanded),
+    }
+    os.makedirs(os.path.dirname(str(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    for a, ws in state["added"].items():
+        print(f"  {a}: +{len(ws)} ({', '.join(ws[:8])}{'…' if len(ws) > 8 else ''})")
+    print(f"Léxico expandido (sim >= {args.accept}) -> {args.out}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", default=None, help="CSV (por defecto el de ABSA)")
+    ap.add_argument("--spacy-model", default="es_core_news_md")
+    ap.add_argument("--min-df", type=int, default=3)
+    ap.add_argument("--k", type=int, default=TOPK, help="vecinos por semilla")
+    ap.add_argument("--min-sim", type=float, default=0.5, help="umbral del reporte")
+    ap.add_argument(
+        "--accept", type=float, default=0.65, help="umbral para el léxico expandido"
+    )
+    ap.add_argument("--out", default=str(LEXICON_OUT))
+    args = ap.parse_args()
+    run(args)
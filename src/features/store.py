@@ -0,0 +1,190 @@
+# src/features/store.py
+# Almacén de features dispersas compartido por baseline, LDA y ABSA.
+# Se construye una vez por versión de datos (ruta + tamaño + mtime del CSV) y
+# por análisis (tokenizado); se guarda como CSR en .npy memory-mappeables:
+#   <dir>/data.npy, indices.npy, indptr.npy  -> conteos término-documento
+#   <dir>/vocab.npy                          -> términos ordenados (col j)
+#   <dir>/ids.npy                            -> id de cada fila (fila i = fila i del CSV)
+import hashlib, json, os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from src.common.paths import pjoin
+from src.common.logging import get_logger
+
+log = get_logger("features.store")
+
+STORE_DIR = pjoin("data", "processed", "features")
+CHUNKSIZE = 50_000
+TEXT_COL = "texto_proc"
+
+
+def analyzer_params(kind: str, ngram: int = 1) -> dict:
+    """
+    kind="tfidf": mismo análisis que el TfidfVectorizer de train_baseline.
+    kind="bow":   tokens separados por espacio, como topics_lda y absa_extract.
+    """
+    if kind == "tfidf":
+        return {
+            "kind": kind,
+            "ngram_range": [1, int(ngram)],
+            "strip_accents": "unicode",
+            "lowercase": True,
+        }
+    if kind == "bow":
+        return {"kind": kind, "ngram_range": [1, 1], "lowercase": False}
+    raise ValueError(f"kind desconocido: {kind}")
+
+
+def make_vectorizer(params: dict, **kw) -> CountVectorizer:
+    p = {k: v for k, v in params.items() if k != "kind"}
+    p["ngram_range"] = tuple(p["ngram_range"])
+    if params["kind"] == "bow":
+        p.update(tokenizer=str.split, token_pattern=None)
+    p.update(kw)
+    return CountVectorizer(**p)
+
+
+def data_version(csv_path) -> str:
+    st = os.stat(csv_path)
+    return f"{os.path.abspath(csv_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def store_key(csv_path, params: dict) -> str:
+    raw = json.dumps([data_version(csv_path), params], sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+class FeatureStore:
+    """Vista de sólo lectura (memmap) sobre un almacén ya construido."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        load = lambda n: np.load(os.path.join(self.path, f"{n}.npy"), mmap_mode="r")
+        self.X = sparse.csr_matrix(
+            (load("data"), load("indices"), load("indptr")),
+            shape=tuple(self.meta["shape"]),
+            copy=False,
+        )
+        self.vocab = load("vocab")
+        self.ids = load("ids")
+        self._pos = None
+
+    @property
+    def params(self) -> dict:
+        return self.meta["params"]
+
+    def rows(self, ids) -> np.ndarray:
+        """Posiciones de fila para una secuencia de ids."""
+        if self._pos is None:
+            self._pos = pd.Series(np.arange(len(self.ids)), index=np.asarray(self.ids))
+        return self._pos.loc[[str(i) for i in ids]].to_numpy()
+
+    def slice(self, rows) -> sparse.csr_matrix:
+        return self.X[np.asarray(rows)]
+
+    def columns(self, terms) -> np.ndarray:
+        """Índices de columna de los términos presentes en el vocabulario."""
+        if len(self.vocab) == 0:
+            return np.empty(0, dtype=int)
+        terms = np.asarray(sorted(set(terms)), dtype=self.vocab.dtype)
+        j = np.searchsorted(self.vocab, terms)
+        j = np.clip(j, 0, len(self.vocab) - 1)
+        return j[self.vocab[j] == terms]
+
+
+def build(csv_path, params: dict, out_dir) -> FeatureStore:
+    """Tokeniza el CSV por chunks y guarda la matriz de conteos CSR."""
+    analyze = make_vectorizer(params).build_analyzer()
+    vocab: dict[str, int] = {}
+    ids, data, indices, lens = [], [], [], []
+    for chunk in pd.read_csv(csv_path, chunksize=CHUNKSIZE):
+        if TEXT_COL not in chunk.columns:
+            raise KeyError(f"{csv_path} no tiene columna {TEXT_COL}")
+        ids.append(chunk["id"].astype(str).to_numpy())
+        for doc in chunk[TEXT_COL].fillna("").astype(str):
+            counts: dict[int, int] = {}
+            for term in analyze(doc):
+                j = vocab.setdefault(term, len(vocab))
+                counts[j] = counts.get(j, 0) + 1
+            indices.append(
+                np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+            )
+            data.append(np.fromiter(counts.values(), dtype=np.int32, count=len(counts)))
+            lens.append(len(counts))
+
+    # reordena columnas por término (mismo orden que sklearn)
+    terms = np.array(list(vocab.keys()), dtype=str)
+    order = np.argsort(terms, kind="stable")
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    indptr = np.zeros(len(lens) + 1, dtype=np.int64)
+    np.cumsum(lens, out=indptr[1:])
+    X = sparse.csr_matrix(
+        (
+            np.concatenate(data) if data else np.zeros(0, np.int32),
+            (
+                remap[np.concatenate(indices)].astype(np.int32)
+                if indices
+                else np.zeros(0, np.int32)
+            ),
+            indptr,
+        ),
+        shape=(len(lens), len(vocab)),
+    )
+    X.sort_indices()
+
+    tmp = f"{out_dir}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "data.npy"), X.data)
+    np.save(os.path.join(tmp, "indices.npy"), X.indices)
+    np.save(os.path.join(tmp, "indptr.npy"), X.indptr)
+    np.save(os.path.join(tmp, "vocab.npy"), terms[order])
+    np.save(
+        os.path.join(tmp, "ids.npy"),
+        np.concatenate(ids).astype(str) if ids else np.zeros(0, dtype=str),
+    )
+    meta = {
+        "source": os.path.abspath(csv_path),
+        "version": data_version(csv_path),
+        "params": params,
+        "shape": list(X.shape),
+        "nnz": int(X.nnz),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out_dir)
+    log.info("Feature store %s | docs=%d | vocab=%d | nnz=%d", out_dir, *X.shape, X.nnz)
+    return FeatureStore(out_dir)
+
+
+def get_store(csv_path, kind: str = "tfidf", ngram: int = 1) -> FeatureStore:
+    """Devuelve el almacén para (CSV, análisis); lo construye si no existe."""
+    params = analyzer_params(kind, ngram)
+    name = f"{os.path.splitext(os.path.basename(str(csv_path)))[0]}-{kind}"
+    out_dir = os.path.join(str(STORE_DIR), f"{name}-{store_key(csv_path, params)}")
+    if os.path.exists(os.path.join(out_dir, "meta.json")):
+        log.info("Feature store en caché: %s", out_dir)
+        return FeatureStore(out_dir)
+    os.makedirs(str(STORE_DIR), exist_ok=True)
+    return build(csv_path, params, out_dir)
+
+
+def doc_freq(X: sparse.csr_matrix) -> np.ndarray:
+    return np.bincount(X.indices, minlength=X.shape[1])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "csv", nargs="?", default=str(pjoin("data", "interim", "limpio_final.csv"))
+    )
+    ap.add_argument("--kind", choices=["tfidf", "bow"], default="tfidf")
+    ap.add_argument("--ngram", type=int, default=2)
+    args = ap.parse_args()
+    get_store(args.csv, args.kind, args.ngram)
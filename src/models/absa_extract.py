@@ -1,7 +1,10 @@
 # src/models/absa_extract.py
-import os, re, pandas as pd, numpy as np
+import argparse, hashlib, json, os, re, time, pandas as pd, numpy as np
+import multiprocessing as mp
+from array import array
 from src.common.paths import pjoin
 from src.common.logging import get_logger
+from src.features.store import get_store
 
 log = get_logger("models.absa")
 
@@ -101,18 +104,93 @@ NEG_KW = [
 ]
 
 
+# === Índice invertido token → aspectos (bitmask) ===
+ASPECT_NAMES = list(ASPECTOS)
+POLS = ["neg", "neu", "pos"]
+_POL_ID = {p: i for i, p in enumerate(POLS)}
+TOKEN_INDEX: dict[str, int] = {}
+for _i, _lex in enumerate(ASPECTOS.values()):
+    for _w in _lex:
+        TOKEN_INDEX[_w] = TOKEN_INDEX.get(_w, 0) | (1 << _i)
+LEXICON_ID = "base"
+_LEXICON_PATH = None
+
+
+class _MaskIds(dict):
+    """bitmask → ids de aspecto, calculado la primera vez que aparece."""
+
+    def __missing__(self, m):
+        v = self[m] = tuple(i for i in range(m.bit_length()) if m >> i & 1)
+        return v
+
+
+_MASK_IDS = _MaskIds()
+
+
+def use_lexicon(path=None):
+    """
+    Reemplaza ASPECTOS por un léxico expandido (src.features.lexicon) cargando
+    su lookup token→bitmask ya compilado: el costo por token no crece con él.
+    """
+    global ASPECTOS, ASPECT_NAMES, TOKEN_INDEX, LEXICON_ID, _LEXICON_PATH
+    if not path or path == _LEXICON_PATH:
+        return
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    ASPECTOS = {a: set(ws) for a, ws in state["lexicon"].items()}
+    ASPECT_NAMES = list(state["aspects"])
+    TOKEN_INDEX = {t: int(m) for t, m in state["index"].items()}
+    raw = json.dumps(state["index"], sort_keys=True).encode("utf-8")
+    LEXICON_ID = "lex:" + hashlib.sha1(raw).hexdigest()[:12]
+    _LEXICON_PATH = path
+    _MASK_IDS.clear()
+    log.info(
+        "Léxico %s: %d aspectos, %d términos", path, len(ASPECT_NAMES), len(TOKEN_INDEX)
+    )
+
+
+def _init_worker(polarity=None, lexicon=None):
+    use_lexicon(lexicon)
+    set_polarity(polarity)
+
+
+SENT_RE = re.compile(r"[.!?]\s+")
+CHUNK = 20_000
+READ_CHUNK = 200_000
+N_EJEMPLOS = 3
+
+
 def frases(t: str):
+    return [s.strip() for s in SENT_RE.split(str(t)) if s and len(s.strip()) > 0]
+
+
+def compile_keywords(lex: dict) -> re.Pattern:
+    """
+    Un solo regex para todo el léxico {keyword: polaridad}: alternativas de la
+    más larga a la más corta (la frase "no lo recomiendo" gana a "recomiendo"),
+    con bordes de palabra que también sirven para ":smile:" y tokens "no_x"
+    marcados por la negación del preprocesamiento.
+    """
+    alts = sorted(lex, key=len, reverse=True)
+    body = "|".join(re.escape(k) for k in alts)
+    return re.compile(rf"(?<!\w)(?:{body}|no_\w+)(?!\w)")
+
+
+KW_POL = {**{k: "pos" for k in POS_KW}, **{k: "neg" for k in NEG_KW}}
+KW_RE = compile_keywords(KW_POL)
+
+
+def kw_hits(s: str):
+    """(inicio, fin, keyword, polaridad) de cada keyword en una sola pasada."""
     return [
-        s.strip() for s in re.split(r"[.!?]\s+", str(t)) if s and len(s.strip()) > 0
+        (m.start(), m.end(), m.group(), KW_POL.get(m.group(), "neg"))
+        for m in KW_RE.finditer(s.lower())
     ]
 
 
-def rule_sentiment(s: str):
-    s = s.lower()
-    pos = any(k in s for k in POS_KW)
-    neg = (
-        any(k in s for k in NEG_KW) or "no_" in s
-    )  # favorece detectar negación del prepro
+def rule_sentiment(s: str, hits=None):
+    pols = {p for *_, p in (kw_hits(s) if hits is None else hits)}
+    pos, neg = "pos" in pols, "neg" in pols  # "no_x" cuenta como negativo
     if pos and not neg:
         return "pos"
     if neg and not pos:
@@ -120,6 +198,187 @@ def rule_sentiment(s: str):
     return "neu"
 
 
+class ModelPolarity:
+    """
+    Polaridad de frases con un modelo guardado en vez de POS_KW/NEG_KW:
+    baseline (models/*.joblib o *.compact/, sobre texto_proc) o transformer
+    exportado a ONNX (src.models.onnx_infer). Las frases se deduplican, se
+    puntúan en un solo lote por bloque y se cachean por hash (PredictionCache).
+    """
+
+    def __init__(self, spec: dict):
+        from src.models.pred_cache import PredictionCache, tokenizer_lowercases
+
+        self.spec = dict(spec)
+        # el transformer se entrenó sobre texto_raw cased: puntúa frases crudas
+        self.raw = bool(spec.get("onnx"))
+        if spec.get("onnx"):
+            from src.models.onnx_infer import OnnxScorer
+
+            scorer = OnnxScorer(spec["onnx"])
+            self.fn, classes = scorer, scorer.labels
+            model_id = f"onnx:{spec['onnx']}"
+            lowercase = tokenizer_lowercases(scorer.tok)
+        else:
+            from src.models.compact_model import CompactModel
+            from src.models.score_baseline import resolve_model
+
+            model = CompactModel(resolve_model(spec["model"]))
+            self.fn, classes = model.decision_function, list(model.classes_)
+            model_id = os.path.basename(str(spec["model"]))
+            lowercase = True
+        unknown = [c for c in map(str, classes) if c not in _POL_ID]
+        if unknown:
+            raise ValueError(f"Clases del modelo fuera de {POLS}: {unknown}")
+        self.map = np.array([_POL_ID[str(c)] for c in classes], dtype=np.int8)
+        self.cache = None
+        if spec.get("cache_size", 0) > 0 or spec.get("cache_db"):
+            self.cache = PredictionCache(
+                model_id,
+                max(spec.get("cache_size", 0), 1),
+                spec.get("cache_db"),
+                lowercase=lowercase,
+            )
+
+    def __call__(self, sentences) -> np.ndarray:
+        if self.cache is not None:
+            s = self.cache.scores(sentences, self.fn)
+        else:
+            uniq, inv = np.unique(
+                np.asarray(sentences, dtype=object), return_inverse=True
+            )
+            s = np.asarray(self.fn(uniq.tolist()))[inv]
+        idx = (s > 0).astype(int) if s.ndim == 1 else s.argmax(axis=1)
+        return self.map[idx]
+
+
+_polarity = None  # ModelPolarity del proceso (None = reglas)
+
+
+def set_polarity(spec=None):
+    """Carga (o reutiliza, si el spec no cambió) el modelo de polaridad."""
+    global _polarity
+    if not spec:
+        _polarity = None
+    elif _polarity is None or _polarity.spec != spec:
+        _polarity = ModelPolarity(spec)
+
+
+def extract_batch(texts, row0: int = 0, raws=None) -> dict:
+    """
+    Resultado columnar por (frase, aspecto): fila (row0 + posición en texts),
+    índice de la frase dentro del texto, id de aspecto (ASPECT_NAMES) y
+    polaridad (POLS). Una consulta al índice por token, no por palabra del léxico.
+    Con set_polarity(...) la polaridad sale del modelo, en un lote por llamada.
+    Si el modelo puntúa texto crudo (ONNX), raws[i] = texto_raw de texts[i]: se
+    usa la frase cruda k cuando ambos textos parten en las mismas frases y el
+    comentario crudo entero si no.
+    """
+    use_raw = _polarity is not None and _polarity.raw
+    if use_raw and raws is None:
+        raise ValueError("La polaridad ONNX necesita texto_raw (entrenada sobre él)")
+    rows, sents, asp, pol = array("i"), array("i"), array("b"), array("b")
+    pend = []  # (fila, frase, máscara, texto) a puntuar con el modelo
+    get = TOKEN_INDEX.get
+    for r, t in enumerate(texts, row0):
+        fs, rs = frases(t), None
+        for k, s in enumerate(fs):
+            m = 0
+            for w in s.split():
+                m |= get(w, 0)
+            if not m:
+                continue
+            if _polarity is not None:
+                if use_raw:
+                    if rs is None:
+                        raw = str(raws[r - row0])
+                        rs = frases(raw)
+                        rs = rs if len(rs) == len(fs) else [raw] * len(fs)
+                    s = rs[k]
+                pend.append((r, k, m, s))
+                continue
+            p = _POL_ID[rule_sentiment(s)]
+            for a in _MASK_IDS[m]:
+                rows.append(r)
+                sents.append(k)
+                asp.append(a)
+                pol.append(p)
+    if pend:
+        pols = _polarity([s for *_, s in pend])
+        for (r, k, m, _), p in zip(pend, pols):
+            for a in _MASK_IDS[m]:
+                rows.append(r)
+                sents.append(k)
+                asp.append(a)
+                pol.append(p)
+    return {
+        "row": np.frombuffer(rows, dtype=np.int32),
+        "sent": np.frombuffer(sents, dtype=np.int32),
+        "aspect": np.frombuffer(asp, dtype=np.int8),
+        "pol": np.frombuffer(pol, dtype=np.int8),
+    }
+
+
+def _extract_task(args):
+    return extract_batch(*args)
+
+
+def make_pool(workers: int, polarity=None):
+    """Pool de workers con léxico y modelo de polaridad ya cargados."""
+    ctx = mp.get_context("spawn" if os.name == "nt" else "fork")
+    return ctx.Pool(
+        workers, initializer=_init_worker, initargs=(polarity, _LEXICON_PATH)
+    )
+
+
+def extract(
+    texts, workers: int = 1, chunk: int = CHUNK, polarity=None, pool=None, raws=None
+) -> dict:
+    """
+    extract_batch por bloques, en paralelo si workers > 1 (orden estable).
+    polarity: spec de ModelPolarity; cada worker carga su propio modelo/caché.
+    pool: de make_pool, para reutilizarlo entre llamadas (count_chunks); sin
+    él se crea uno sólo para esta llamada.
+    """
+    tasks = [
+        (texts[i : i + chunk], i, None if raws is None else raws[i : i + chunk])
+        for i in range(0, len(texts), chunk)
+    ]
+    if workers <= 1 or len(tasks) <= 1:
+        set_polarity(polarity)
+        parts = [_extract_task(t) for t in tasks]
+    elif pool is not None:
+        parts = pool.map(_extract_task, tasks)
+    else:
+        with make_pool(workers, polarity) as pool:
+            parts = pool.map(_extract_task, tasks)
+    if not parts:
+        parts = [extract_batch([])]
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def aspect_hits(texto_proc: str):
+    """(frase, aspecto, polaridad) para cada aspecto presente en cada frase."""
+    res = extract_batch([texto_proc])
+    fs = frases(texto_proc)
+    return [
+        (fs[k], ASPECT_NAMES[a], POLS[p])
+        for k, a, p in zip(res["sent"], res["aspect"], res["pol"])
+    ]
+
+
+def _aspect_hits_lineal(texto_proc: str):
+    """Implementación previa (búsqueda lineal por léxico); sólo para --bench."""
+    hits = []
+    for s in frases(texto_proc):
+        toks = s.split()
+        presentes = [a for a, lex in ASPECTOS.items() if any(w in toks for w in lex)]
+        if presentes:
+            pred = rule_sentiment(s)
+            hits.extend((s, a, pred) for a in presentes)
+    return hits
+
+
 def infer_diet(text: str) -> str | None:
     if not isinstance(text, str):
         return None
@@ -130,7 +389,7 @@ def infer_diet(text: str) -> str | None:
     return None
 
 
-def load_input_df():
+def input_path():
     # preferencia de archivos
     candidates = [
         pjoin("data", "interim", "labeled.csv"),  # debería tener dieta_heuristica
@@ -139,14 +398,19 @@ def load_input_df():
     ]
     for path in candidates:
         if os.path.exists(path):
-            df = pd.read_csv(path)
-            log.info("Leyendo %s (%d filas)", path, len(df))
-            return df
+            return path
     raise FileNotFoundError(
         "No encontré ninguno de: labeled.csv, limpio_final.csv, limpio.csv en data/interim/"
     )
 
 
+def load_input_df():
+    path = input_path()
+    df = pd.read_csv(path)
+    log.info("Leyendo %s (%d filas)", path, len(df))
+    return df, path
+
+
 def ensure_columns(df: pd.DataFrame) -> pd.DataFrame:
     # Necesitamos texto_proc y dieta_heuristica
     if "texto_proc" not in df.columns:
@@ -169,58 +433,416 @@ def ensure_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def run():
-    df = load_input_df()
-    df = ensure_columns(df)
-
-    rows = []
-    for _, r in df.iterrows():
-        diet = r["dieta_heuristica"]
-        for s in frases(r["texto_proc"]):
-            toks = s.split()
-            presentes = [
-                a for a, lex in ASPECTOS.items() if any(w in toks for w in lex)
-            ]
-            if presentes:
-                pred = rule_sentiment(s)
-                for a in presentes:
-                    rows.append(
-                        {"dieta": diet, "frase": s, "aspecto": a, "pred_sent": pred}
-                    )
-
-    if not rows:
-        log.info(
-            "No se detectaron frases con aspectos. Revisa léxicos o columnas de entrada."
-        )
-        return
+def candidate_rows(path) -> np.ndarray:
+    """
+    Filas (posición en el CSV) con al menos un término de aspecto, según el
+    feature store "bow". Tolera el signo final que frases() recorta.
+    """
+    store = get_store(path, "bow")
+    lex = set().union(*ASPECTOS.values())
+    cols = [
+        j
+        for j, t in enumerate(store.vocab.tolist())
+        if t in lex or (t[-1:] in ".!?" and t[:-1] in lex)
+    ]
+    if not cols:
+        return np.zeros(0, dtype=int)
+    return np.flatnonzero(store.X[:, cols].getnnz(axis=1) > 0)
+
+
+class AbsaCounts:
+    """
+    Contadores enteros neg/neu/pos por (aspecto, dieta) + hasta N_EJEMPLOS
+    frases pos/neg por celda. Sumables entre chunks, workers y corridas
+    (merge), y persistibles en JSON; las matrices salen de aquí.
+    """
+
+    def __init__(self):
+        self.counts: dict[str, np.ndarray] = {}  # dieta -> (n_aspectos, 3)
+        self.examples: dict[tuple, dict] = {}  # (aspecto, dieta) -> {pos, neg}
+        self.rows = 0  # filas del CSV ya consumidas (marca de agua)
+        self.start = 0  # fila desde la que contó esta pasada (ver count_chunks)
+        self.source = None
+        self.prefix_sha1 = None  # huella de esas filas (ver count_chunks)
+        self.polarity = "reglas"  # origen de la polaridad: no se mezclan
+        self.lexicon = LEXICON_ID
+
+    def add(self, res: dict, diets, sentence):
+        """res de extract(); diets[i] = dieta de la fila i; sentence(r, k) -> frase."""
+        if not len(res["row"]):
+            return
+        d = np.asarray(diets, dtype=object)[res["row"]]
+        codes, uniq = pd.factorize(d)
+        A = len(ASPECT_NAMES)
+        key = (res["aspect"].astype(np.int64) * len(uniq) + codes) * 3 + res["pol"]
+        bc = np.bincount(key, minlength=A * len(uniq) * 3).reshape(A, len(uniq), 3)
+        for j, diet in enumerate(uniq):
+            self.counts[diet] = (
+                self.counts.get(diet, np.zeros((A, 3), np.int64)) + bc[:, j]
+            )
+
+        # ejemplos: primeras frases por celda, sólo donde aún faltan
+        for pol in ("pos", "neg"):
+            m = res["pol"] == _POL_ID[pol]
+            if not m.any():
+                continue
+            hits = pd.DataFrame(
+                {
+                    "a": res["aspect"][m],
+                    "d": d[m],
+                    "r": res["row"][m],
+                    "k": res["sent"][m],
+                }
+            )
+            for (a, diet), g in hits.groupby(["a", "d"], sort=False):
+                cell = self.examples.setdefault(
+                    (ASPECT_NAMES[a], diet), {"pos": [], "neg": []}
+                )
+                for r, k in zip(g["r"], g["k"]):
+                    if len(cell[pol]) >= N_EJEMPLOS:
+                        break
+                    cell[pol].append(sentence(r, k))
+
+    def merge(self, other: "AbsaCounts") -> "AbsaCounts":
+        mine, theirs = (self.polarity, self.lexicon), (other.polarity, other.lexicon)
+        if other.counts and self.counts and mine != theirs:
+            raise ValueError(
+                f"No se pueden sumar polaridades/léxicos distintos: {mine} vs {theirs}"
+            )
+        if other.counts:
+            self.polarity, self.lexicon = theirs
+        A = len(ASPECT_NAMES)
+        for diet, c in other.counts.items():
+            self.counts[diet] = self.counts.get(diet, np.zeros((A, 3), np.int64)) + c
+        for key, ex in other.examples.items():
+            cell = self.examples.setdefault(key, {"pos": [], "neg": []})
+            for pol in ("pos", "neg"):
+                cell[pol] = (cell[pol] + ex[pol])[:N_EJEMPLOS]
+        self.rows += other.rows
+        return self
 
-    absa = pd.DataFrame(rows)
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(str(path))), exist_ok=True)
+        state = {
+            "aspects": ASPECT_NAMES,
+            "pols": POLS,
+            "rows": self.rows,
+            "source": self.source,
+            "prefix_sha1": self.prefix_sha1,
+            "polarity": self.polarity,
+            "lexicon": self.lexicon,
+            "counts": {d: c.tolist() for d, c in self.counts.items()},
+            "examples": [[a, d, ex] for (a, d), ex in self.examples.items()],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
 
-    # score = %pos - %neg
-    def score_func(s):
-        s = list(s)
-        return np.mean(np.array(s) == "pos") - np.mean(np.array(s) == "neg")
+    @classmethod
+    def load(cls, path) -> "AbsaCounts":
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["aspects"] != ASPECT_NAMES or state["pols"] != POLS:
+            raise ValueError(
+                f"{path}: aspectos/polaridades distintos a los actuales; recalcula."
+            )
+        self = cls()
+        self.rows = state["rows"]
+        self.source = state.get("source")
+        self.prefix_sha1 = state.get("prefix_sha1")
+        self.polarity = state.get("polarity", "reglas")
+        self.lexicon = state.get("lexicon", "base")
+        self.counts = {d: np.array(c, np.int64) for d, c in state["counts"].items()}
+        self.examples = {(a, d): ex for a, d, ex in state["examples"]}
+        return self
 
-    pivot = absa.pivot_table(
-        index="aspecto", columns="dieta", values="pred_sent", aggfunc=score_func
-    ).fillna(0.0)
-    counts = absa.groupby(["aspecto", "dieta"]).size().unstack(fill_value=0)
+    def long(self) -> pd.DataFrame:
+        rows = [
+            (ASPECT_NAMES[a], diet, *c[a])
+            for diet, c in self.counts.items()
+            for a in range(len(ASPECT_NAMES))
+            if c[a].sum()
+        ]
+        return pd.DataFrame(rows, columns=["aspecto", "dieta", *POLS])
 
+    def matrices(self):
+        """(score = %pos - %neg, conteos) con aspecto en filas y dieta en columnas."""
+        df = self.long().set_index(["aspecto", "dieta"]).sort_index()
+        n = df[POLS].sum(axis=1)
+        pivot = (df["pos"] / n - df["neg"] / n).unstack().fillna(0.0)
+        counts = n.unstack(fill_value=0)
+        return pivot, counts
+
+
+def bench(texts, n: int, workers: int):
+    """Compara el bucle anterior (iterrows + léxico lineal) con el índice."""
+    rng = np.random.default_rng(42)
+    big = [texts[i] for i in rng.integers(len(texts), size=n)]
+    diets = pd.Series(["keto"] * n)
+    out = []
+
+    t0 = time.perf_counter()
+    n_hits = 0
+    for _, r in pd.DataFrame({"texto_proc": big, "dieta": diets}).iterrows():
+        n_hits += len(_aspect_hits_lineal(r["texto_proc"]))
+    out.append({"engine": "loop", "workers": 1, "s": time.perf_counter() - t0})
+
+    for w in sorted({1, workers}):
+        t0 = time.perf_counter()
+        res = extract(big, w)
+        out.append({"engine": "index", "workers": w, "s": time.perf_counter() - t0})
+        if len(res["row"]) != n_hits:
+            raise AssertionError(f"Resultados distintos: {len(res['row'])} vs {n_hits}")
+
+    rep = pd.DataFrame(out)
+    rep["n"] = n
+    rep["rows_s"] = (n / rep["s"]).round(0)
+    rep["speedup"] = (rep.loc[0, "s"] / rep["s"]).round(1)
+    rep["s"] = rep["s"].round(2)
+    os.makedirs("reports", exist_ok=True)
+    rep.to_csv(pjoin("reports", "absa_bench.csv"), index=False)
+    print(rep.to_string(index=False))
+    print("Bench -> reports/absa_bench.csv")
+
+
+def polarity_label(polarity=None) -> str:
+    if not polarity:
+        return "reglas"
+    if polarity.get("onnx"):
+        return f"onnx:{polarity['onnx']}"
+    return f"modelo:{os.path.basename(str(polarity['model']))}"
+
+
+# columnas que determinan los conteos: si cambian en el prefijo, se recuenta
+FP_COLS = ["id", "texto_raw", "texto_proc", "dieta_heuristica"]
+
+
+def _hash_rows(h, chunk: pd.DataFrame):
+    cols = [c for c in FP_COLS if c in chunk.columns]
+    h.update(pd.util.hash_pandas_object(chunk[cols], index=False).to_numpy().tobytes())
+
+
+def count_chunks(
+    path,
+    use_store=False,
+    workers=1,
+    chunksize=READ_CHUNK,
+    start=0,
+    polarity=None,
+    expect=None,
+):
+    """
+    Procesa el CSV por bloques desde la fila `start`; memoria acotada por
+    chunksize, no por número de hits. Las filas previas sólo se leen para
+    comparar su huella con `expect`: limpio_final se re-materializa por
+    particiones (filas nuevas intercaladas) y gold reescribe filas, así que
+    si la huella no coincide se recuenta desde la fila 0 (acc.start = 0).
+    """
+    keep = candidate_rows(path) if use_store else None
+    acc = AbsaCounts()
+    acc.source = os.path.abspath(path)
+    acc.polarity = polarity_label(polarity)
+    acc.lexicon = LEXICON_ID
+    acc.start = start
+    h, pos, restart = hashlib.sha1(), 0, False
+    # un solo pool por corrida: el modelo de polaridad y su LRU viven en cada
+    # worker entre bloques
+    pool = make_pool(workers, polarity) if workers > 1 else None
+    try:
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            n_raw = len(chunk)
+            cut = min(max(start - pos, 0), n_raw)
+            _hash_rows(h, chunk.iloc[:cut])
+            pos += n_raw
+            if cut and pos - n_raw + cut == start and h.hexdigest() != expect:
+                log.warning(
+                    "Cambiaron filas ya contadas de %s; recuento completo", path
+                )
+                restart = True
+                break
+            if cut == n_raw:
+                continue
+            chunk = chunk.iloc[cut:]
+            _hash_rows(h, chunk)
+            has_proc = "texto_proc" in chunk.columns
+            chunk = ensure_columns(chunk)
+            if keep is not None and has_proc:
+                # el índice sigue siendo la posición de fila en el CSV
+                chunk = chunk[chunk.index.isin(keep)]
+            texts = chunk["texto_proc"].astype(str).tolist()
+            raws = None
+            if "texto_raw" in chunk.columns:
+                raws = chunk["texto_raw"].fillna("").astype(str).tolist()
+            acc.add(
+                extract(texts, workers, polarity=polarity, pool=pool, raws=raws),
+                chunk["dieta_heuristica"].to_numpy(),
+                lambda r, k: frases(texts[r])[k],
+            )
+            acc.rows = pos - start
+            log.info("ABSA: %d filas procesadas", pos)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if not restart and pos < start:
+        log.warning(
+            "%s tiene menos filas que la marca de agua; recuento completo", path
+        )
+        restart = True
+    if restart:
+        return count_chunks(path, use_store, workers, chunksize, 0, polarity)
+    acc.prefix_sha1 = h.hexdigest()
+    return acc
+
+
+def write_reports(acc: AbsaCounts):
+    pivot, counts = acc.matrices()
     os.makedirs("reports", exist_ok=True)
     pivot.to_csv(pjoin("reports", "matriz_dieta_aspecto.csv"))
     counts.to_csv(pjoin("reports", "matriz_dieta_aspecto_counts.csv"))
     print("Scores  -> reports/matriz_dieta_aspecto.csv")
     print("Counts  -> reports/matriz_dieta_aspecto_counts.csv")
 
-    # ejemplos por celda (top 3 pos/neg)
+    # ejemplos por celda (primeros 3 pos/neg)
     examples = []
-    for (a, d), g in absa.groupby(["aspecto", "dieta"]):
-        gp = g[g["pred_sent"] == "pos"].head(3)["frase"].tolist()
-        gn = g[g["pred_sent"] == "neg"].head(3)["frase"].tolist()
-        examples.append({"aspecto": a, "dieta": d, "ej_pos": gp, "ej_neg": gn})
+    for a, d in (
+        acc.long().sort_values(["aspecto", "dieta"])[["aspecto", "dieta"]].to_numpy()
+    ):
+        ex = acc.examples.get((a, d), {"pos": [], "neg": []})
+        examples.append(
+            {"aspecto": a, "dieta": d, "ej_pos": ex["pos"], "ej_neg": ex["neg"]}
+        )
     pd.DataFrame(examples).to_csv(pjoin("reports", "absa_ejemplos.csv"), index=False)
     print("Ejemplos -> reports/absa_ejemplos.csv")
 
 
+def run(
+    use_store: bool = False,
+    workers: int = 1,
+    bench_n: int = 0,
+    state=None,
+    merge=(),
+    chunksize: int = READ_CHUNK,
+    polarity=None,
+    lexicon=None,
+):
+    """
+    state: JSON de contadores previos; se suman sólo las filas agregadas al
+    CSV desde la última corrida (marca de agua) y se reescribe.
+    merge: otros JSON parciales (p. ej. de otras máquinas) a sumar.
+    polarity: spec de ModelPolarity ({"model"|"onnx", "cache_size", "cache_db"});
+    None = reglas POS_KW/NEG_KW.
+    lexicon: JSON de src.features.lexicon (None = ASPECTOS de este módulo).
+    """
+    use_lexicon(lexicon)
+    if bench_n:
+        df, _ = load_input_df()
+        df = ensure_columns(df)
+        bench(df["texto_proc"].astype(str).tolist(), bench_n, workers)
+        return
+
+    acc = AbsaCounts.load(state) if state and os.path.exists(state) else AbsaCounts()
+    if acc.counts and (acc.polarity, acc.lexicon) != (
+        polarity_label(polarity),
+        LEXICON_ID,
+    ):
+        raise ValueError(
+            f"{state} se calculó con polaridad {acc.polarity} y léxico "
+            f"{acc.lexicon}; usa otro --state"
+        )
+    if not merge or state:
+        # marca de agua del estado, antes de sumar parciales (merge suma rows)
+        path = input_path()
+        start = acc.rows if acc.source == os.path.abspath(path) else 0
+        if acc.source and not start:
+            log.warning("El estado viene de %s; se suma %s completo", acc.source, path)
+        log.info("Leyendo %s desde la fila %d (bloques de %d)", path, start, chunksize)
+        new = count_chunks(
+            path, use_store, workers, chunksize, start, polarity, acc.prefix_sha1
+        )
+        if new.start != start:
+            # conteos previos de este archivo ya no valen (ni parciales sumados
+            # en corridas anteriores: vuelve a pasarlos con --merge)
+            log.warning("Se descartan los contadores de %s", state)
+            acc = AbsaCounts()
+        for p in merge:
+            acc.merge(AbsaCounts.load(p))
+        acc.merge(new)
+        acc.rows = new.start + new.rows
+        acc.source, acc.prefix_sha1 = new.source, new.prefix_sha1
+        if _polarity is not None and _polarity.cache is not None:
+            log.info("Caché de polaridad: %s", _polarity.cache.stats())
+    else:
+        for p in merge:
+            acc.merge(AbsaCounts.load(p))
+    if state:
+        acc.save(state)
+        log.info("Contadores -> %s", state)
+
+    if not acc.counts:
+        log.info(
+            "No se detectaron frases con aspectos. Revisa léxicos o columnas de entrada."
+        )
+        return
+    write_reports(acc)
+
+
 if __name__ == "__main__":
-    run()
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--feature-store",
+        action="store_true",
+        help="descarta de entrada las filas sin términos de aspecto (src.features.store)",
+    )
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument(
+        "--bench",
+        type=int,
+        default=0,
+        help="N comentarios (muestreados con reemplazo): bucle anterior vs índice",
+    )
+    ap.add_argument("--chunksize", type=int, default=READ_CHUNK)
+    ap.add_argument(
+        "--state",
+        default=None,
+        help="JSON de contadores: se carga, se suma la entrada y se guarda",
+    )
+    ap.add_argument(
+        "--merge",
+        nargs="*",
+        default=[],
+        help="JSON de contadores parciales a sumar (sin --state: sólo fusiona)",
+    )
+    ap.add_argument(
+        "--polarity-model",
+        default=None,
+        help="baseline (models/*.joblib o *.compact/) para la polaridad de frases",
+    )
+    ap.add_argument(
+        "--polarity-onnx",
+        default=None,
+        help="<ts> exportado con src.models.onnx_infer (puntúa las frases de texto_raw)",
+    )
+    ap.add_argument(
+        "--lexicon", default=None, help="léxico expandido (src.features.lexicon)"
+    )
+    ap.add_argument("--cache-size", type=int, default=200_000)
+    ap.add_argument("--cache-db", default=None, help="SQLite para caché en disco")
+    args = ap.parse_args()
+    polarity = None
+    if args.polarity_model or args.polarity_onnx:
+        polarity = {
+            "model": args.polarity_model,
+            "onnx": args.polarity_onnx,
+            "cache_size": args.cache_size,
+            "cache_db": args.cache_db,
+        }
+    run(
+        use_store=args.feature_store,
+        workers=args.workers,
+        bench_n=args.bench,
+        state=args.state,
+        merge=args.merge,
+        chunksize=args.chunksize,
+        polarity=polarity,
+        lexicon=args.lexicon,
+    )
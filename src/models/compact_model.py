@@ -0,0 +1,248 @@
+# src/models/compact_model.py
+# Formato compacto para los Pipeline de train_baseline (tfidf|hash + lineal).
+# En vez del Pipeline entero (vocabulary_ dict, stop_words_, coef float64) se
+# guarda un directorio <modelo>.compact/ con arrays .npy memory-mappeables:
+#   keys.npy        uint64 ordenado: hash de cada término (columna = posición)
+#   idf.npy         float32, alineado con keys
+#   W.npy | W_data/W_indices/W_indptr.npy  coef^T (n_features × n_scores) float32,
+#                   denso o CSR según cuántos coeficientes sobrevivan a --prune
+#   meta.json       clases, intercepto y parámetros del analizador
+#
+#   python -m src.models.compact_model models/baseline_lr_X.joblib --prune 1e-4 --check data/interim/limpio_final.csv
+import argparse, json, os, shutil, time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+from src.common.logging import get_logger
+
+log = get_logger("models.compact")
+
+VEC_PARAMS = [
+    "lowercase",
+    "strip_accents",
+    "token_pattern",
+    "ngram_range",
+    "analyzer",
+    "stop_words",
+]
+
+
+def term_hash(terms) -> np.ndarray:
+    """Hash de 64 bits determinista (SipHash de pandas) para una lista de términos."""
+    return pd.util.hash_array(np.asarray(terms, dtype=object))
+
+
+def _analyzer_params(vec) -> dict:
+    p = {k: getattr(vec, k) for k in VEC_PARAMS}
+    p["ngram_range"] = list(p["ngram_range"])
+    if vec.tokenizer is not None:
+        if vec.tokenizer is not str.split:
+            raise ValueError(
+                "Tokenizer personalizado no soportado en formato compacto."
+            )
+        p["tokenizer"] = "split"
+    return p
+
+
+def export(pipe, out_dir, prune: float = 0.0) -> dict:
+    """
+    Convierte un Pipeline([("tfidf"|"hash", vec), ("clf", lineal)]) al formato
+    compacto. prune>0 descarta coeficientes con |w| < prune.
+    """
+    vec, clf = pipe.steps[0][1], pipe.steps[-1][1]
+    W = np.asarray(clf.coef_, dtype=np.float64).T  # (n_features, n_scores)
+    meta = {
+        "classes": [str(c) for c in clf.classes_],
+        "intercept": np.atleast_1d(clf.intercept_).astype(float).tolist(),
+        "clf": type(clf).__name__,
+        "prune": prune,
+    }
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+
+    if isinstance(vec, HashingVectorizer):
+        meta["kind"] = "hash"
+        meta["vec"] = {
+            **_analyzer_params(vec),
+            "n_features": vec.n_features,
+            "alternate_sign": vec.alternate_sign,
+            "norm": vec.norm,
+        }
+    else:
+        # Tfidf/CountVectorizer: vocabulario → hashes ordenados
+        terms = np.empty(len(vec.vocabulary_), dtype=object)
+        for t, j in vec.vocabulary_.items():
+            terms[j] = t
+        keys = term_hash(terms)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        if len(keys) > 1 and (np.diff(keys) == 0).any():
+            raise ValueError(
+                "Colisión de hash en el vocabulario; no se puede compactar."
+            )
+        W = W[order]
+        idf = getattr(vec, "idf_", None) if getattr(vec, "use_idf", False) else None
+        np.save(os.path.join(out_dir, "keys.npy"), keys)
+        if idf is not None:
+            np.save(os.path.join(out_dir, "idf.npy"), idf[order].astype(np.float32))
+        meta["kind"] = "vocab"
+        meta["vec"] = {
+            **_analyzer_params(vec),
+            "sublinear_tf": bool(getattr(vec, "sublinear_tf", False)),
+            "norm": getattr(vec, "norm", None),
+            "use_idf": idf is not None,
+            "binary": bool(vec.binary),
+        }
+
+    if prune > 0:
+        W[np.abs(W) < prune] = 0.0
+    Ws = sparse.csr_matrix(W.astype(np.float32))
+    Ws.eliminate_zeros()
+    # CSR cuesta 8 bytes por coef (float32 + int32): sólo compensa si es disperso
+    meta["dense"] = bool(Ws.nnz * 2 >= W.size)
+    if meta["dense"]:
+        np.save(os.path.join(out_dir, "W.npy"), W.astype(np.float32))
+    else:
+        np.save(os.path.join(out_dir, "W_data.npy"), Ws.data)
+        np.save(os.path.join(out_dir, "W_indices.npy"), Ws.indices.astype(np.int32))
+        np.save(os.path.join(out_dir, "W_indptr.npy"), Ws.indptr.astype(np.int64))
+    meta["shape"] = list(Ws.shape)
+    meta["nnz"] = int(Ws.nnz)
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    log.info(
+        "Compacto %s | features=%d | coef no nulos=%d/%d",
+        out_dir,
+        Ws.shape[0],
+        Ws.nnz,
+        Ws.shape[0] * Ws.shape[1],
+    )
+    return meta
+
+
+class CompactModel:
+    """Cargador del formato compacto; misma interfaz predict/decision_function."""
+
+    def __init__(self, path, mmap: bool = True):
+        self.path = str(path)
+        with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        mode = "r" if mmap else None
+        load = lambda n: np.load(os.path.join(self.path, f"{n}.npy"), mmap_mode=mode)
+        if self.meta.get("dense"):
+            self.W = load("W")
+        else:
+            self.W = sparse.csr_matrix(
+                (load("W_data"), load("W_indices"), load("W_indptr")),
+                shape=tuple(self.meta["shape"]),
+                copy=False,
+            )
+        self.b = np.asarray(self.meta["intercept"], dtype=np.float32)
+        self.classes_ = np.asarray(self.meta["classes"], dtype=object)
+        p = dict(self.meta["vec"])
+        p["ngram_range"] = tuple(p["ngram_range"])
+        if p.pop("tokenizer", None) == "split":
+            p.update(tokenizer=str.split, token_pattern=None)
+        if self.meta["kind"] == "hash":
+            self._hash = HashingVectorizer(**p)
+        else:
+            self.keys = load("keys")
+            self.idf = load("idf") if p["use_idf"] else None
+            self.vec_params = p
+            cv = {k: p[k] for k in VEC_PARAMS + ["tokenizer"] if k in p}
+            self._analyze = CountVectorizer(**cv).build_analyzer()
+
+    def transform(self, texts) -> sparse.csr_matrix:
+        if self.meta["kind"] == "hash":
+            return self._hash.transform(texts)
+        rows, toks = [], []
+        for i, t in enumerate(texts):
+            tt = self._analyze(t)
+            toks.extend(tt)
+            rows.append(len(tt))
+        n = len(rows)
+        if not toks:
+            return sparse.csr_matrix((n, len(self.keys)), dtype=np.float32)
+        h = term_hash(toks)
+        j = np.searchsorted(self.keys, h)
+        j = np.minimum(j, len(self.keys) - 1)
+        hit = self.keys[j] == h
+        r = np.repeat(np.arange(n), rows)
+        X = sparse.csr_matrix(
+            (np.ones(hit.sum(), dtype=np.float32), (r[hit], j[hit])),
+            shape=(n, len(self.keys)),
+        )  # suma duplicados = conteos
+        p = self.vec_params
+        if p["binary"]:
+            X.data[:] = 1.0
+        if p["sublinear_tf"]:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.idf is not None:
+            X = X @ sparse.diags(self.idf)
+        if p["norm"]:
+            X = normalize(X, norm=p["norm"], copy=False)
+        return X.tocsr()
+
+    def decision_function(self, texts) -> np.ndarray:
+        s = self.transform(texts) @ self.W
+        s = (s.toarray() if sparse.issparse(s) else np.asarray(s)) + self.b
+        return s[:, 0] if s.shape[1] == 1 else s
+
+    def predict(self, texts) -> np.ndarray:
+        s = self.decision_function(texts)
+        if s.ndim == 1:
+            return self.classes_[(s > 0).astype(int)]
+        return self.classes_[s.argmax(axis=1)]
+
+
+def compact_path(joblib_path) -> str:
+    return os.path.splitext(str(joblib_path))[0] + ".compact"
+
+
+def _dir_size(path) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main():
+    from joblib import load
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("model", help="models/<nombre>.joblib")
+    ap.add_argument("--prune", type=float, default=0.0)
+    ap.add_argument("--check", default=None, help="CSV con texto_proc para paridad")
+    ap.add_argument("--n-check", type=int, default=20_000)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    pipe = load(args.model)
+    t_joblib = time.perf_counter() - t0
+    out = compact_path(args.model)
+    export(pipe, out, prune=args.prune)
+
+    t0 = time.perf_counter()
+    cm = CompactModel(out)
+    t_compact = time.perf_counter() - t0
+    print(
+        f"Carga joblib: {t_joblib * 1e3:.1f} ms ({_dir_size(args.model) / 1e6:.1f} MB)"
+        f" | compacto: {t_compact * 1e3:.1f} ms ({_dir_size(out) / 1e6:.1f} MB)"
+    )
+    if args.check:
+        texts = (
+            pd.read_csv(args.check, usecols=["texto_proc"], nrows=args.n_check)[
+                "texto_proc"
+            ]
+            .fillna("")
+            .astype(str)
+        )
+        agree = np.mean(pipe.predict(texts) == cm.predict(texts))
+        print(f"Acuerdo de predicciones: {agree:.4%} ({len(texts)} textos)")
+    print(f"Compacto -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# src/models/distill.py
+# Destilación transformer → estudiante TF-IDF + regresión logística.
+# 1) El maestro (corrida out/<ts> de train_transformer, vía ONNX si se exportó)
+#    etiqueta todo el corpus con probabilidades; se cachean en data/processed.
+# 2) El estudiante se entrena con objetivos blandos: cada fila se replica una
+#    vez por clase con peso = prob del maestro (entropía cruzada blanda exacta
+#    para la LR), mezclada con la etiqueta dura vía --alpha.
+# 3) Maestro, estudiante y baseline duro se evalúan en el mismo split de test
+#    que train_transformer: macro-F1 y filas/s → reports/distill_<ts>.csv
+#
+#   python -m src.models.distill 20250101-120000 --extra data/interim/limpio.csv
+import argparse, hashlib, json, os, time
+import numpy as np
+import pandas as pd
+from joblib import dump
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.metrics import accuracy_score, f1_score
+from src.common.paths import pjoin, load_config
+from src.common.logging import get_logger
+from src.models.onnx_infer import (
+    ONNX_DIR,
+    OnnxScorer,
+    best_checkpoint,
+    run_labels,
+    run_split,
+)
+
+log = get_logger("models.distill")
+
+
+class TorchTeacher:
+    """Maestro en PyTorch cuando no hay export ONNX de la corrida."""
+
+    def __init__(self, ts, batch_size=64):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        ckpt = best_checkpoint(ts)
+        self.torch = torch
+        self.tok = AutoTokenizer.from_pretrained(ckpt, use_fast=True)
+        self.model = AutoModelForSequenceClassification.from_pretrained(ckpt).eval()
+        self.labels = run_labels(ts)
+        self.max_length = int(load_config()["model"].get("max_length", 256))
+        self.batch_size = batch_size
+
+    def __call__(self, texts) -> np.ndarray:
+        out = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        with self.torch.inference_mode():
+            for i in range(0, len(order), self.batch_size):
+                idx = order[i : i + self.batch_size]
+                enc = self.tok(
+                    [texts[j] for j in idx],
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors="pt",
+                )
+                out[idx] = self.model(**enc).logits.softmax(-1).numpy()
+        return out
+
+
+def load_teacher(ts, threads=0):
+    if os.path.exists(os.path.join(str(ONNX_DIR), ts, "meta.json")):
+        log.info("Maestro: ONNX int8 (%s)", ts)
+        return OnnxScorer(ts, quantized=True, threads=threads)
+    log.info("Maestro: PyTorch (sin export ONNX; ver src.models.onnx_infer)")
+    return TorchTeacher(ts)
+
+
+def teacher_probs(teacher, ts, df, name) -> np.ndarray:
+    """Probabilidades del maestro sobre df["texto_raw"], cacheadas por datos."""
+    h = pd.util.hash_pandas_object(df["texto_raw"], index=False).to_numpy()
+    key = hashlib.sha1(h.tobytes()).hexdigest()[:16]
+    path = pjoin("data", "processed", f"teacher_{ts}_{name}_{key}.npy")
+    if os.path.exists(path):
+        log.info("Probabilidades del maestro en caché: %s", path)
+        return np.load(path)
+    t0 = time.perf_counter()
+    P = teacher(df["texto_raw"].astype(str).tolist())
+    log.info("Maestro: %d filas en %.1fs", len(df), time.perf_counter() - t0)
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    np.save(path, P)
+    return P
+
+
+def make_student(ngram=2, min_df=2, max_df=0.9):
+    vec = TfidfVectorizer(
+        min_df=min_df,
+        max_df=max_df,
+        ngram_range=(1, ngram),
+        sublinear_tf=True,
+        strip_accents="unicode",
+    )
+    return Pipeline([("tfidf", vec), ("clf", LogisticRegression(max_iter=1000))])
+
+
+def fit_soft(pipe, texts, P, y_hard, alpha, T=1.0, classes=None):
+    """
+    LR con objetivos blandos: q = alpha * P^(1/T) + (1 - alpha) * onehot(y).
+    Replicar cada fila por clase con peso q[:, c] da exactamente la entropía
+    cruzada blanda. y_hard = -1 para filas sin etiqueta (sólo maestro).
+    classes: nombre de la columna c de P; el alumno predice esos nombres.
+    """
+    n, C = P.shape
+    Q = P ** (1.0 / T)
+    Q /= Q.sum(axis=1, keepdims=True)
+    has = y_hard >= 0
+    Q[has] *= alpha
+    Q[has, y_hard[has]] += 1.0 - alpha
+    X = pipe.named_steps["tfidf"].fit_transform(texts)
+    Xr = sparse.vstack([X] * C, format="csr")
+    classes = np.arange(C) if classes is None else np.asarray(classes)
+    yr = np.repeat(classes, n)
+    w = Q.T.reshape(-1)
+    keep = w > 1e-4  # filas con peso ~0 no aportan
+    pipe.named_steps["clf"].fit(Xr[keep], yr[keep], sample_weight=w[keep])
+    return pipe
+
+
+def rows_per_s(fn, texts, reps=1) -> float:
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        fn(texts)
+    return round(reps * len(texts) / (time.perf_counter() - t0), 1)
+
+
+def run(args):
+    # mismo dropna y split que la corrida del maestro (verificado contra sus
+    # test_preds): ninguna fila de su test entra a la transferencia
+    df, y, labels, tr, te, split_note = run_split(args.ts)
+    df["texto_proc"] = df["texto_proc"].fillna("")
+    if labels != run_labels(args.ts):
+        raise ValueError(f"Clases {labels} ≠ clases de la corrida {args.ts}")
+
+    teacher = load_teacher(args.ts, args.threads)
+    P = teacher_probs(teacher, args.ts, df, "final")
+
+    # conjunto de transferencia: train etiquetado + corpus extra sin etiqueta
+    texts = df["texto_proc"].astype(str).to_numpy()[tr].tolist()
+    P_tr, y_tr = P[tr], y[tr]
+    if args.extra:
+        ex = pd.read_csv(args.extra, usecols=["texto_raw", "texto_proc"]).dropna()
+        # sin filas de limpio_final (test incluido)
+        ex = ex[~ex["texto_raw"].isin(set(df["texto_raw"]))]
+        if len(ex):
+            texts += ex["texto_proc"].astype(str).tolist()
+            P_tr = np.vstack([P_tr, teacher_probs(teacher, args.ts, ex, "extra")])
+            y_tr = np.concatenate([y_tr, np.full(len(ex), -1)])
+    log.info(
+        "Transferencia: %d filas (%d con etiqueta) | split=%s",
+        len(texts),
+        int((y_tr >= 0).sum()),
+        split_note,
+    )
+
+    t0 = time.perf_counter()
+    names = np.array(labels)
+    student = fit_soft(
+        make_student(args.ngram), texts, P_tr, y_tr, args.alpha, args.T, names
+    )
+    student_s = time.perf_counter() - t0
+    hard = make_student(args.ngram)
+    hard.fit(df["texto_proc"].astype(str).to_numpy()[tr], names[y[tr]])
+
+    # evaluación en el mismo test
+    te_raw = df["texto_raw"].astype(str).to_numpy()[te].tolist()
+    te_proc = df["texto_proc"].astype(str).to_numpy()[te].tolist()
+    y_te = names[y[te]]
+    rows = []
+    for name, fn, X in (
+        ("teacher", lambda t: names[teacher(t).argmax(axis=1)], te_raw),
+        ("student_soft", student.predict, te_proc),
+        ("baseline_hard", hard.predict, te_proc),
+    ):
+        pred = fn(X)
+        rows.append(
+            {
+                "model": name,
+                "macro_f1": round(f1_score(y_te, pred, average="macro"), 4),
+                "accuracy": round(accuracy_score(y_te, pred), 4),
+                "agree_teacher": None,
+                "rows_s": rows_per_s(fn, X, reps=1 if name == "teacher" else 3),
+                "_pred": pred,
+            }
+        )
+    t_pred = rows[0]["_pred"]
+    for r in rows:
+        r["agree_teacher"] = round(float(np.mean(r.pop("_pred") == t_pred)), 4)
+    rep = pd.DataFrame(rows)
+    rep["speedup_vs_teacher"] = (rep["rows_s"] / rep.loc[0, "rows_s"]).round(1)
+
+    os.makedirs("reports", exist_ok=True)
+    os.makedirs("models", exist_ok=True)
+    out = pjoin("reports", f"distill_{args.ts}.csv")
+    rep.to_csv(out, index=False)
+    dump(student, pjoin("models", f"distill_student_{args.ts}.joblib"))
+    with open(
+        pjoin("reports", f"distill_{args.ts}_meta.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(
+            {
+                "ts": args.ts,
+                "labels": labels,
+                "split": split_note,
+                "alpha": args.alpha,
+                "T": args.T,
+                "transfer_rows": len(texts),
+                "student_fit_s": round(student_s, 2),
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(rep.to_string(index=False))
+    print(f"Reporte -> {out}")
+    print(f"Estudiante -> models/distill_student_{args.ts}.joblib")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("ts", help="corrida de train_transformer (out/<ts>)")
+    ap.add_argument(
+        "--extra", default=None, help="CSV sin etiqueta (texto_raw, texto_proc)"
+    )
+    ap.add_argument("--alpha", type=float, default=0.7, help="peso del maestro")
+    ap.add_argument("--T", type=float, default=2.0, help="temperatura (suaviza P)")
+    ap.add_argument("--ngram", type=int, default=2)
+    ap.add_argument("--threads", type=int, default=0)
+    args = ap.parse_args()
+    run(args)
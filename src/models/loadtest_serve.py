@@ -0,0 +1,90 @@
+# src/models/loadtest_serve.py
+# Prueba de carga para src.models.serve: N conexiones keep-alive concurrentes
+# mandando POST /predict; reporta p50/p95/p99 de latencia y throughput.
+#   python -m src.models.loadtest_serve --concurrency 32 --requests 2000
+import argparse, asyncio, json, time
+import numpy as np
+import pandas as pd
+
+DEFAULT_TEXTS = [
+    "excelente app, el ayuno intermitente me quitó el hambre",
+    "la dieta keto es carísima y me da mareo",
+    "muy buena",
+    "no lo recomiendo, abandoné a la semana",
+    "con la flexible puedo salir con amigos sin culpa",
+]
+
+
+async def _worker(host, port, texts, n, lat, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n):
+            body = json.dumps({"text": texts[rng.integers(len(texts))]}).encode()
+            req = (
+                f"POST /predict HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            ).encode() + body
+            t0 = time.perf_counter()
+            writer.write(req)
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b""):
+                    break
+                if h.lower().startswith(b"content-length:"):
+                    length = int(h.split(b":", 1)[1])
+            await reader.readexactly(length)
+            lat.append((time.perf_counter() - t0, b" 200 " in status))
+    finally:
+        writer.close()
+
+
+async def main(args):
+    texts = DEFAULT_TEXTS
+    if args.texts:
+        texts = (
+            pd.read_csv(args.texts, usecols=[args.text_col], nrows=args.n_texts)[
+                args.text_col
+            ]
+            .dropna()
+            .astype(str)
+            .tolist()
+        )
+    per = [args.requests // args.concurrency] * args.concurrency
+    for i in range(args.requests % args.concurrency):
+        per[i] += 1
+    lat = []
+    t0 = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _worker(args.host, args.port, texts, n, lat, np.random.default_rng(i))
+            for i, n in enumerate(per)
+        )
+    )
+    wall = time.perf_counter() - t0
+    ms = np.array([l for l, _ in lat]) * 1e3
+    ok = sum(1 for _, good in lat if good)
+    print(
+        f"requests={len(lat)} ok={ok} concurrency={args.concurrency} wall={wall:.2f}s"
+    )
+    print(f"throughput={len(lat) / wall:.1f} req/s")
+    print(
+        "latencia ms: "
+        + " ".join(f"p{q}={np.percentile(ms, q):.1f}" for q in (50, 95, 99))
+        + f" max={ms.max():.1f}"
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--texts", default=None, help="CSV opcional con textos reales")
+    ap.add_argument("--text-col", default="texto_raw")
+    ap.add_argument("--n-texts", type=int, default=5000)
+    args = ap.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,295 @@
+# src/models/onnx_infer.py
+# Ruta de inferencia desplegable para el transformer de train_transformer:
+#   export  -> mejor checkpoint de out/<ts> a ONNX + cuantización dinámica int8
+#   score   -> puntúa CSV grandes en CPU con lotes por longitud (onnxruntime)
+#   parity  -> macro-F1 del int8 vs transformer_test_preds_<ts>.csv y speedup
+#
+#   python -m src.models.onnx_infer export 20250101-120000
+#   python -m src.models.onnx_infer parity 20250101-120000
+#   python -m src.models.onnx_infer score 20250101-120000 data/interim/limpio.csv
+import argparse, glob, json, os, shutil, time
+import numpy as np
+import pandas as pd
+from src.common.paths import pjoin, load_config
+from src.common.logging import get_logger
+
+log = get_logger("models.onnx")
+
+ONNX_DIR = pjoin("models", "onnx")
+MAX_TOKENS = 16_384  # tokens (con padding) por lote
+MAX_BATCH = 128
+CHUNKSIZE = 20_000
+
+
+def best_checkpoint(ts) -> str:
+    """best_model_checkpoint del trainer_state más reciente; si no, el último."""
+    ckpts = sorted(
+        glob.glob(os.path.join(str(pjoin("out", ts)), "checkpoint-*")),
+        key=lambda p: int(p.rsplit("-", 1)[-1]),
+    )
+    if not ckpts:
+        raise FileNotFoundError(f"No hay checkpoints en out/{ts}")
+    state_path = os.path.join(ckpts[-1], "trainer_state.json")
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            best = json.load(f).get("best_model_checkpoint")
+        if best and os.path.isdir(best):
+            return best
+    return ckpts[-1]
+
+
+def run_labels(ts) -> list:
+    with open(pjoin("reports", f"transformer_meta_{ts}.json"), encoding="utf-8") as f:
+        return json.load(f)["labels"]
+
+
+def export(ts, quantize=True, opset=17) -> str:
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    ckpt = best_checkpoint(ts)
+    out_dir = os.path.join(str(ONNX_DIR), ts)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    tok = AutoTokenizer.from_pretrained(ckpt, use_fast=True)
+    model = AutoModelForSequenceClassification.from_pretrained(ckpt).eval()
+    model.config.return_dict = False
+    dummy = tok(["texto de ejemplo"], return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+    axes = {n: {0: "batch", 1: "seq"} for n in names}
+    axes["logits"] = {0: "batch"}
+    fp32 = os.path.join(out_dir, "model.onnx")
+    kw = {"dynamo": False} if "dynamo" in torch.onnx.export.__code__.co_varnames else {}
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            tuple(dummy[n] for n in names),
+            fp32,
+            input_names=names,
+            output_names=["logits"],
+            dynamic_axes=axes,
+            opset_version=opset,
+            **kw,
+        )
+    path = fp32
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        path = os.path.join(out_dir, "model.int8.onnx")
+        quantize_dynamic(fp32, path, weight_type=QuantType.QInt8)
+    tok.save_pretrained(out_dir)
+    meta = {
+        "ts": ts,
+        "checkpoint": ckpt,
+        "labels": run_labels(ts),
+        "inputs": names,
+        "max_length": int(load_config()["model"].get("max_length", 256)),
+        "quantized": quantize,
+        "size_mb": {
+            os.path.basename(p): round(os.path.getsize(p) / 2**20, 2)
+            for p in (fp32, path)
+        },
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    log.info("ONNX %s <- %s | %s", out_dir, ckpt, meta["size_mb"])
+    return out_dir
+
+
+def length_batches(lengths, max_tokens=MAX_TOKENS, max_batch=MAX_BATCH):
+    """
+    Índices ordenados por longitud y cortados en lotes adaptativos: el lote
+    crece mientras len(lote) * longitud_máxima no pase max_tokens.
+    """
+    order = np.argsort(lengths, kind="stable")
+    batch, longest = [], 0
+    for i in order:
+        l = max(int(lengths[i]), 1)
+        if batch and (
+            (len(batch) + 1) * max(longest, l) > max_tokens or len(batch) >= max_batch
+        ):
+            yield batch
+            batch, longest = [], 0
+        batch.append(i)
+        longest = max(longest, l)
+    if batch:
+        yield batch
+
+
+class OnnxScorer:
+    """Probabilidades softmax con onnxruntime en CPU, lotes por longitud."""
+
+    def __init__(self, ts_or_dir, quantized=True, threads=0, max_tokens=MAX_TOKENS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        d = (
+            ts_or_dir
+            if os.path.isdir(ts_or_dir)
+            else os.path.join(str(ONNX_DIR), ts_or_dir)
+        )
+        with open(os.path.join(d, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            so.intra_op_num_threads = threads
+        name = (
+            "model.int8.onnx" if quantized and self.meta["quantized"] else "model.onnx"
+        )
+        self.sess = ort.InferenceSession(
+            os.path.join(d, name), so, providers=["CPUExecutionProvider"]
+        )
+        self.tok = AutoTokenizer.from_pretrained(d, use_fast=True)
+        self.labels = self.meta["labels"]
+        self.max_length = self.meta["max_length"]
+        self.max_tokens = max_tokens
+
+    def __call__(self, texts) -> np.ndarray:
+        texts = [str(t) for t in texts]
+        ids = self.tok(texts, truncation=True, max_length=self.max_length)["input_ids"]
+        out = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        for idx in length_batches([len(x) for x in ids], self.max_tokens):
+            enc = self.tok.pad(
+                {"input_ids": [ids[i] for i in idx]}, return_tensors="np"
+            )
+            feed = {"input_ids": enc["input_ids"].astype(np.int64)}
+            feed["attention_mask"] = enc["attention_mask"].astype(np.int64)
+            if "token_type_ids" in self.meta["inputs"]:
+                feed["token_type_ids"] = np.zeros_like(feed["input_ids"])
+            logits = self.sess.run(None, feed)[0]
+            e = np.exp(logits - logits.max(axis=1, keepdims=True))
+            out[idx] = e / e.sum(axis=1, keepdims=True)
+        return out
+
+
+def run_split(ts):
+    """
+    limpio_final.csv con el mismo dropna que train_transformer y el split de la
+    corrida ts, verificado contra transformer_test_preds_<ts>.csv (mismo orden
+    y etiquetas). Devuelve (df, y, labels, idx_train, idx_test, nota).
+    """
+    from sklearn.preprocessing import LabelEncoder
+    from src.models.train_transformer import split_idx
+
+    df = pd.read_csv(pjoin("data", "interim", "limpio_final.csv")).dropna(
+        subset=["texto_raw", "sentimiento"]
+    )
+    le = LabelEncoder()
+    y = le.fit_transform(df["sentimiento"])
+    tr, te, note = split_idx(y, list(le.classes_))
+    preds = pd.read_csv(pjoin("reports", f"transformer_test_preds_{ts}.csv"))
+    if len(te) != len(preds) or not np.array_equal(y[te], preds["y_true"].to_numpy()):
+        raise RuntimeError(
+            "El split reconstruido no coincide con transformer_test_preds "
+            "(¿cambió limpio_final.csv desde la corrida?)"
+        )
+    return df, y, list(le.classes_), tr, te, note
+
+
+def test_texts(ts):
+    """Textos del split de test de la corrida ts, en el orden de test_preds."""
+    df, y, _, _, te, _ = run_split(ts)
+    return df["texto_raw"].astype(str).to_numpy()[te].tolist(), y[te]
+
+
+def parity(ts, threads=0):
+    import torch
+    from sklearn.metrics import f1_score
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    preds = pd.read_csv(pjoin("reports", f"transformer_test_preds_{ts}.csv"))
+    texts, y = test_texts(ts)
+
+    # referencia: PyTorch fp32 con el mismo esquema de lotes
+    ckpt = best_checkpoint(ts)
+    tok = AutoTokenizer.from_pretrained(ckpt, use_fast=True)
+    model = AutoModelForSequenceClassification.from_pretrained(ckpt).eval()
+    max_len = int(load_config()["model"].get("max_length", 256))
+    if threads:
+        torch.set_num_threads(threads)
+    ids = tok(texts, truncation=True, max_length=max_len)["input_ids"]
+    t0 = time.perf_counter()
+    pt = np.zeros(len(texts), dtype=int)
+    with torch.inference_mode():
+        for idx in length_batches([len(x) for x in ids]):
+            enc = tok.pad({"input_ids": [ids[i] for i in idx]}, return_tensors="pt")
+            pt[idx] = model(**enc).logits.argmax(-1).numpy()
+    pt_s = time.perf_counter() - t0
+
+    res = {"ts": ts, "n": len(texts)}
+    ref = preds["y_pred"].to_numpy()
+    res["f1_trainer"] = round(f1_score(y, ref, average="macro"), 4)
+    res["f1_torch"] = round(f1_score(y, pt, average="macro"), 4)
+    res["torch_rows_s"] = round(len(texts) / pt_s, 1)
+    for name, q in (("fp32", False), ("int8", True)):
+        scorer = OnnxScorer(ts, quantized=q, threads=threads)
+        t0 = time.perf_counter()
+        p = scorer(texts).argmax(axis=1)
+        dt = time.perf_counter() - t0
+        res[f"f1_onnx_{name}"] = round(f1_score(y, p, average="macro"), 4)
+        res[f"agree_onnx_{name}"] = round(float(np.mean(p == ref)), 4)
+        res[f"onnx_{name}_rows_s"] = round(len(texts) / dt, 1)
+        res[f"speedup_{name}"] = round(pt_s / dt, 2)
+
+    os.makedirs("reports", exist_ok=True)
+    out = pjoin("reports", f"transformer_onnx_parity_{ts}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(res, f, ensure_ascii=False, indent=2)
+    print(
+        f"Macro-F1 trainer={res['f1_trainer']} | onnx int8={res['f1_onnx_int8']} "
+        f"(acuerdo {res['agree_onnx_int8']:.1%}) | speedup int8 x{res['speedup_int8']}"
+    )
+    print(f"Paridad -> {out}")
+    return res
+
+
+def score(args):
+    scorer = OnnxScorer(args.ts, quantized=not args.fp32, threads=args.threads)
+    out = args.out or pjoin("data", "processed", f"preds_transformer_{args.ts}.csv")
+    os.makedirs(os.path.dirname(str(out)), exist_ok=True)
+    t0, total = time.perf_counter(), 0
+    reader = pd.read_csv(
+        args.input, usecols=[args.id_col, args.text_col], chunksize=args.chunksize
+    )
+    for i, chunk in enumerate(reader):
+        probs = scorer(chunk[args.text_col].fillna("").astype(str).tolist())
+        res = pd.DataFrame({args.id_col: chunk[args.id_col].to_numpy()})
+        res["pred"] = np.array(scorer.labels)[probs.argmax(axis=1)]
+        for k, c in enumerate(scorer.labels):
+            res[f"prob_{c}"] = probs[:, k].round(5)
+        res.to_csv(out, index=False, mode="w" if i == 0 else "a", header=i == 0)
+        total += len(res)
+        dt = time.perf_counter() - t0
+        log.info("Puntuadas %d filas | %.0f filas/s", total, total / max(dt, 1e-9))
+    dt = time.perf_counter() - t0
+    print(f"Filas: {total} | {dt:.1f}s | {total / max(dt, 1e-9):.0f} filas/s")
+    print(f"Predicciones -> {out}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    e = sub.add_parser("export")
+    e.add_argument("ts", help="corrida de train_transformer (out/<ts>)")
+    e.add_argument("--no-quantize", action="store_true")
+    e.add_argument("--opset", type=int, default=17)
+    p = sub.add_parser("parity")
+    p.add_argument("ts")
+    p.add_argument("--threads", type=int, default=0)
+    s = sub.add_parser("score")
+    s.add_argument("ts")
+    s.add_argument("input", help="CSV con texto crudo")
+    s.add_argument("--out", default=None)
+    s.add_argument("--text-col", default="texto_raw")
+    s.add_argument("--id-col", default="id")
+    s.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    s.add_argument("--threads", type=int, default=0)
+    s.add_argument("--fp32", action="store_true", help="usa el ONNX sin cuantizar")
+    args = ap.parse_args()
+    if args.cmd == "export":
+        export(args.ts, quantize=not args.no_quantize, opset=args.opset)
+    elif args.cmd == "parity":
+        parity(args.ts, args.threads)
+    else:
+        score(args)
@@ -0,0 +1,127 @@
+# src/models/pred_cache.py
+# Caché de predicciones delante del baseline/transformer.
+# Clave = hash(model_id + texto normalizado); valor = vector de scores float32.
+# La normalización depende del modelo: espacios siempre; minúsculas sólo si el
+# modelo no distingue mayúsculas (baseline TF-IDF sí, transformer cased no).
+# Nivel 1: LRU en memoria acotado por número de entradas.
+# Nivel 2 (opcional): SQLite en disco, compartible entre procesos y corridas.
+import hashlib, os, sqlite3
+from collections import OrderedDict
+import numpy as np
+
+MAX_ITEMS = 200_000
+
+
+def normalize(text, lowercase: bool = True) -> str:
+    text = " ".join(str(text).split())
+    return text.lower() if lowercase else text
+
+
+def tokenizer_lowercases(tok) -> bool:
+    """¿El tokenizer HF pasa a minúsculas? (BETO cased: no)."""
+    return bool(getattr(tok, "do_lower_case", False))
+
+
+class PredictionCache:
+    def __init__(
+        self,
+        model_id: str,
+        max_items: int = MAX_ITEMS,
+        disk_path=None,
+        lowercase: bool = True,
+    ):
+        self.model_id = str(model_id)
+        self.lowercase = lowercase
+        # claves cased aparte: no chocan con las de un caché en minúsculas
+        self._tag = self.model_id if lowercase else f"{self.model_id}\0cased"
+        self.max_items = max_items
+        self._mem: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(str(disk_path))), exist_ok=True)
+            # check_same_thread=False: serve la usa desde su hilo de inferencia
+            self._db = sqlite3.connect(
+                str(disk_path), timeout=30, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS preds (k BLOB PRIMARY KEY, v BLOB NOT NULL)"
+            )
+        self.hits = self.disk_hits = self.misses = 0
+
+    def key(self, text) -> bytes:
+        raw = f"{self._tag}\0{normalize(text, self.lowercase)}".encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).digest()
+
+    def _put_mem(self, k, v):
+        self._mem[k] = v
+        self._mem.move_to_end(k)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def scores(self, texts, fn) -> np.ndarray:
+        """
+        Devuelve fn(texts) usando la caché: deduplica dentro del lote, busca
+        en memoria y luego en disco, y llama a fn una sola vez con los textos
+        únicos que faltan.
+        """
+        keys = [self.key(t) for t in texts]
+        found: dict[bytes, np.ndarray] = {}
+        todo: dict[bytes, str] = {}
+        for k, t in zip(keys, texts):
+            if k in found or k in todo:
+                continue
+            v = self._mem.get(k)
+            if v is not None:
+                self._mem.move_to_end(k)
+                found[k] = v
+            else:
+                todo[k] = t
+
+        if todo and self._db is not None:
+            ks = list(todo)
+            for i in range(0, len(ks), 900):  # límite de parámetros de SQLite
+                part = ks[i : i + 900]
+                q = f"SELECT k, v FROM preds WHERE k IN ({','.join('?' * len(part))})"
+                for k, v in self._db.execute(q, part):
+                    arr = np.frombuffer(v, dtype=np.float32)
+                    found[k] = arr
+                    self._put_mem(k, arr)
+                    del todo[k]
+                    self.disk_hits += 1
+
+        if todo:
+            out = np.asarray(fn(list(todo.values())), dtype=np.float32)
+            out = out.reshape(len(todo), -1)
+            for k, v in zip(todo, out):
+                # copia: una vista de fila retendría todo el lote en memoria
+                v = v.copy()
+                found[k] = v
+                self._put_mem(k, v)
+            if self._db is not None:
+                with self._db:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO preds VALUES (?, ?)",
+                        [(k, v.tobytes()) for k, v in zip(todo, out)],
+                    )
+
+        n_new = len(todo)
+        self.misses += n_new
+        self.hits += len(keys) - n_new
+        res = np.stack([found[k] for k in keys]) if keys else np.zeros((0, 1))
+        return res[:, 0] if res.shape[1] == 1 else res
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "mem_items": len(self._mem),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,181 @@
+# src/models/score_baseline.py
+# Puntuación por lotes con un baseline guardado sobre CSV/Parquet grandes.
+# El modelo se usa en formato compacto (src.models.compact_model): cada worker
+# lo abre con mmap, así que las páginas de coef/idf se comparten entre procesos.
+#   python -m src.models.score_baseline models/baseline_lr_X.joblib data/interim/limpio.csv --workers 4
+import argparse, os, time
+import multiprocessing as mp
+from collections import deque
+import numpy as np
+import pandas as pd
+from src.common.paths import pjoin
+from src.common.logging import get_logger
+from src.models.compact_model import CompactModel, compact_path, export
+from src.models.pred_cache import PredictionCache
+
+log = get_logger("models.score")
+
+CHUNKSIZE = 20_000
+
+_model = None  # un CompactModel por worker
+_cache = None  # PredictionCache opcional por worker
+
+
+def resolve_model(path) -> str:
+    """Acepta .joblib o .compact/; exporta el compacto si aún no existe."""
+    path = str(path)
+    if os.path.isdir(path):
+        return path
+    out = compact_path(path)
+    if not os.path.exists(os.path.join(out, "meta.json")):
+        from joblib import load
+
+        log.info("Exportando formato compacto de %s", path)
+        export(load(path), out)
+    return out
+
+
+def iter_input(path, text_col, id_col, chunksize):
+    """Lee CSV o Parquet por bloques devolviendo sólo (id, texto)."""
+    cols = [id_col, text_col]
+    if str(path).endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Para Parquet instala pyarrow: pip install pyarrow"
+            ) from e
+        pf = pq.ParquetFile(path)
+        for b in pf.iter_batches(batch_size=chunksize, columns=cols):
+            yield b.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=cols, chunksize=chunksize)
+
+
+def _init(model_dir, cache_size=0, cache_db=None):
+    global _model, _cache
+    _model = CompactModel(model_dir)
+    if cache_size > 0 or cache_db:
+        _cache = PredictionCache(
+            os.path.basename(model_dir), max(cache_size, 1), cache_db
+        )
+
+
+def _columns(model, id_col: str) -> list:
+    """Cabecera del CSV de salida; la misma que produce _score."""
+    classes = model.classes_[1:] if model.W.shape[1] == 1 else model.classes_
+    return [id_col, "pred"] + [f"score_{c}" for c in classes]
+
+
+def _score(
+    chunk: pd.DataFrame, text_col: str, id_col: str
+) -> tuple[pd.DataFrame, tuple[int, int]]:
+    texts = chunk[text_col].fillna("").astype(str).tolist()
+    if _cache is not None:
+        before = _cache.stats()
+        s = _cache.scores(texts, _model.decision_function)
+        after = _cache.stats()
+        hits = (after["hits"] - before["hits"], after["misses"] - before["misses"])
+    else:
+        s = _model.decision_function(texts)
+        hits = (0, len(texts))
+    if s.ndim == 1:
+        scores = {f"score_{_model.classes_[1]}": s}
+        pred = _model.classes_[(s > 0).astype(int)]
+    else:
+        scores = {f"score_{c}": s[:, k] for k, c in enumerate(_model.classes_)}
+        pred = _model.classes_[s.argmax(axis=1)]
+    out = pd.DataFrame({id_col: chunk[id_col].to_numpy(), "pred": pred})
+    for k, v in scores.items():
+        out[k] = np.round(v, 5)
+    return out, hits
+
+
+def _score_task(args):
+    return _score(*args)
+
+
+def _imap_bounded(pool, tasks, max_inflight):
+    """Como pool.imap pero sin leer más de max_inflight chunks por adelantado."""
+    pending = deque()
+    for t in tasks:
+        pending.append(pool.apply_async(_score, t))
+        if len(pending) >= max_inflight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def run(args):
+    model_dir = resolve_model(args.model)
+    out = args.out or pjoin(
+        "data",
+        "processed",
+        f"preds_{os.path.basename(model_dir).replace('.compact', '')}.csv",
+    )
+    os.makedirs(os.path.dirname(str(out)), exist_ok=True)
+    tasks = (
+        (c, args.text_col, args.id_col)
+        for c in iter_input(args.input, args.text_col, args.id_col, args.chunksize)
+    )
+
+    t0 = time.perf_counter()
+    total = 0
+    cache_args = (args.cache_size, args.cache_db)
+    n_hits = n_miss = 0
+    if args.workers <= 1:
+        _init(model_dir, *cache_args)
+        results = map(_score_task, tasks)
+        pool = None
+    else:
+        ctx = mp.get_context("spawn" if os.name == "nt" else "fork")
+        pool = ctx.Pool(
+            args.workers, initializer=_init, initargs=(model_dir, *cache_args)
+        )
+        results = _imap_bounded(pool, tasks, 2 * args.workers)
+    try:
+        for i, (res, (h, m)) in enumerate(results):
+            n_hits, n_miss = n_hits + h, n_miss + m
+            res.to_csv(out, index=False, mode="w" if i == 0 else "a", header=i == 0)
+            total += len(res)
+            dt = time.perf_counter() - t0
+            log.info("Puntuadas %d filas | %.0f filas/s", total, total / max(dt, 1e-9))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if total == 0:
+        # entrada vacía: CSV sólo con cabecera, no un archivo viejo o ausente
+        pd.DataFrame(columns=_columns(CompactModel(model_dir), args.id_col)).to_csv(
+            out, index=False
+        )
+        log.warning("Entrada sin filas: %s", args.input)
+
+    dt = time.perf_counter() - t0
+    print(f"Filas: {total} | {dt:.1f}s | {total / max(dt, 1e-9):.0f} filas/s")
+    if args.cache_size > 0 or args.cache_db:
+        print(
+            f"Caché: hits={n_hits} misses={n_miss} hit_rate={n_hits / max(total, 1):.2%}"
+        )
+    print(f"Predicciones -> {out}")
+    return total / max(dt, 1e-9)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("model", help="models/<nombre>.joblib o <nombre>.compact/")
+    ap.add_argument("input", help="CSV o .parquet con texto preprocesado")
+    ap.add_argument("--out", default=None)
+    ap.add_argument("--text-col", default="texto_proc")
+    ap.add_argument("--id-col", default="id")
+    ap.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument(
+        "--cache-size",
+        type=int,
+        default=0,
+        help="entradas del LRU de predicciones por worker (0 = sin caché)",
+    )
+    ap.add_argument("--cache-db", default=None, help="SQLite para caché en disco")
+    args = ap.parse_args()
+    run(args)
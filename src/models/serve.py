@@ -0,0 +1,302 @@
+# src/models/serve.py
+# Servicio HTTP local (sólo stdlib + asyncio) para sentimiento + dieta + ABSA.
+# Carga una vez el baseline (y opcionalmente un transformer) y agrupa las
+# peticiones concurrentes en micro-lotes a través de una asyncio.Queue con
+# deadline (--max-wait-ms), para pasar por spaCy y el modelo en lote.
+#
+#   python -m src.models.serve models/baseline_lr_X.joblib --port 8000
+#   curl -s localhost:8000/predict -d '{"text": "el ayuno me quita el hambre"}'
+import argparse, asyncio, json, os, time
+from concurrent.futures import ThreadPoolExecutor
+import spacy
+from src.common.paths import load_config
+from src.common.logging import get_logger
+from src.common.utils import basic_clean, replace_emojis, marcar_negacion_spacy
+from src.preprocess.label_diet import match_diets
+from src.models.absa_extract import aspect_hits
+from src.models.compact_model import CompactModel
+from src.models.score_baseline import resolve_model
+from src.models.pred_cache import PredictionCache, tokenizer_lowercases
+
+log = get_logger("models.serve")
+
+MAX_BATCH = 64
+MAX_WAIT_MS = 5.0
+MAX_BODY = 1 << 20
+
+
+class TransformerScorer:
+    """Probabilidades softmax de un checkpoint de train_transformer (opcional)."""
+
+    def __init__(self, path, labels, max_length=256):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        self.torch = torch
+        self.tok = AutoTokenizer.from_pretrained(path, use_fast=True)
+        self.model = AutoModelForSequenceClassification.from_pretrained(path).eval()
+        self.labels = labels
+        self.max_length = max_length
+
+    def __call__(self, texts):
+        with self.torch.inference_mode():
+            enc = self.tok(
+                texts,
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="pt",
+            )
+            return self.model(**enc).logits.softmax(-1).numpy()
+
+
+class Analyzer:
+    """Pipeline completo por lote: clean_es → label_diet → baseline → ABSA."""
+
+    def __init__(
+        self, model_path, transformer=None, labels=None, cache_size=0, cache_db=None
+    ):
+        cfg = load_config()
+        self.window = cfg["preprocess"]["negation_window"]
+        self.nlp = spacy.load("es_core_news_md", disable=["ner", "textcat"])
+        self.model = CompactModel(resolve_model(model_path))
+        self.model_id = os.path.basename(str(model_path))
+        self.tf = None
+        if transformer:
+            self.tf = TransformerScorer(
+                transformer, labels, int(cfg["model"].get("max_length", 256))
+            )
+        self.caches = {}
+        if cache_size > 0 or cache_db:
+            size = max(cache_size, 1)
+            self.caches["baseline"] = PredictionCache(self.model_id, size, cache_db)
+            if transformer:
+                self.caches["transformer"] = PredictionCache(
+                    f"tf:{os.path.abspath(transformer)}",
+                    size,
+                    cache_db,
+                    lowercase=tokenizer_lowercases(self.tf.tok),
+                )
+
+    def _cached(self, name, fn, texts):
+        c = self.caches.get(name)
+        return c.scores(texts, fn) if c is not None else fn(texts)
+
+    def __call__(self, texts):
+        raw = [replace_emojis(basic_clean(str(t))) for t in texts]
+        proc = [
+            marcar_negacion_spacy(doc, self.window)
+            for doc in self.nlp.pipe(raw, batch_size=len(raw))
+        ]
+        s = self._cached("baseline", self.model.decision_function, proc)
+        classes = self.model.classes_
+        if s.ndim == 1:
+            preds = classes[(s > 0).astype(int)]
+            s = s[:, None]
+            names = [classes[1]]
+        else:
+            preds = classes[s.argmax(axis=1)]
+            names = list(classes)
+        probs = self._cached("transformer", self.tf, raw) if self.tf else None
+
+        out = []
+        for i, (r, p) in enumerate(zip(raw, proc)):
+            dieta, dietas = match_diets(r)
+            res = {
+                "texto_proc": p,
+                "sentimiento": str(preds[i]),
+                "scores": {str(c): round(float(v), 5) for c, v in zip(names, s[i])},
+                "dieta": dieta,
+                "dietas": dietas,
+                "aspectos": [
+                    {"frase": f, "aspecto": a, "sent": pol}
+                    for f, a, pol in aspect_hits(p)
+                ],
+                "model": self.model_id,
+            }
+            if probs is not None:
+                k = int(probs[i].argmax())
+                res["transformer"] = {
+                    "sentimiento": self.tf.labels[k],
+                    "probs": {
+                        l: round(float(v), 5) for l, v in zip(self.tf.labels, probs[i])
+                    },
+                }
+            out.append(res)
+        return out
+
+
+class MicroBatcher:
+    """
+    Acumula textos de peticiones concurrentes hasta max_batch o hasta que
+    vence el deadline (max_wait_ms desde el primero) y los procesa juntos
+    en un hilo aparte para no bloquear el event loop.
+    """
+
+    def __init__(self, fn, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.n_batches = 0
+        self.n_items = 0
+
+    async def submit(self, text):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, fut))
+        return await fut
+
+    async def loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [t for t, _ in batch]
+            try:
+                res = await loop.run_in_executor(self.pool, self.fn, texts)
+            except Exception as e:
+                log.exception("Fallo procesando lote de %d", len(batch))
+                for _, f in batch:
+                    if not f.done():
+                        f.set_exception(e)
+                continue
+            self.n_batches += 1
+            self.n_items += len(batch)
+            for (_, f), r in zip(batch, res):
+                if not f.done():
+                    f.set_result(r)
+
+
+class Server:
+    def __init__(self, batcher: MicroBatcher, analyzer: Analyzer):
+        self.batcher = batcher
+        self.analyzer = analyzer
+        self.t0 = time.time()
+
+    async def route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/stats":
+            b = self.batcher
+            return 200, {
+                "uptime_s": round(time.time() - self.t0, 1),
+                "batches": b.n_batches,
+                "items": b.n_items,
+                "avg_batch": round(b.n_items / b.n_batches, 2) if b.n_batches else 0,
+                "queue": b.queue.qsize(),
+                "cache": {k: c.stats() for k, c in self.analyzer.caches.items()},
+            }
+        if method == "POST" and path == "/predict":
+            try:
+                req = json.loads(body or b"{}")
+            except json.JSONDecodeError:
+                return 400, {"error": "JSON inválido"}
+            if isinstance(req.get("texts"), list):
+                res = await asyncio.gather(
+                    *(self.batcher.submit(t) for t in req["texts"])
+                )
+                return 200, {"results": list(res)}
+            if isinstance(req.get("text"), str):
+                return 200, await self.batcher.submit(req["text"])
+            return 400, {"error": "Falta 'text' o 'texts'"}
+        return 404, {"error": "no encontrado"}
+
+    async def handle(self, reader, writer):
+        # HTTP/1.1 mínimo con keep-alive; suficiente para uso local
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                n = int(headers.get("content-length", 0) or 0)
+                if n > MAX_BODY:
+                    status, payload = 413, {"error": "cuerpo demasiado grande"}
+                    body = b""
+                else:
+                    body = await reader.readexactly(n)
+                    try:
+                        status, payload = await self.route(method, path, body)
+                    except Exception as e:
+                        status, payload = 500, {"error": str(e)}
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'ERR'}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close" or n > MAX_BODY:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    analyzer = Analyzer(
+        args.model,
+        args.transformer,
+        args.transformer_labels.split(","),
+        args.cache_size,
+        args.cache_db,
+    )
+    analyzer(["calentamiento"])  # precarga spaCy/modelo antes de aceptar tráfico
+    batcher = MicroBatcher(analyzer, args.max_batch, args.max_wait_ms)
+    srv = Server(batcher, analyzer)
+    task = asyncio.create_task(batcher.loop())
+    server = await asyncio.start_server(srv.handle, args.host, args.port)
+    log.info(
+        "Escuchando en http://%s:%d | max_batch=%d | max_wait=%.1fms",
+        args.host,
+        args.port,
+        args.max_batch,
+        args.max_wait_ms,
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        task.cancel()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("model", help="models/<nombre>.joblib o <nombre>.compact/")
+    ap.add_argument("--transformer", default=None, help="out/<ts>/checkpoint-N")
+    ap.add_argument(
+        "--transformer-labels",
+        default="neg,neu,pos",
+        help="orden de clases del transformer (LabelEncoder → alfabético)",
+    )
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    ap.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    ap.add_argument("--cache-size", type=int, default=100_000, help="0 = sin caché")
+    ap.add_argument("--cache-db", default=None, help="SQLite para caché en disco")
+    args = ap.parse_args()
+    asyncio.run(serve(args))
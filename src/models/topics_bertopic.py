@@ -0,0 +1,219 @@
+# src/models/topics_bertopic.py
+# Tópicos por embeddings (BERTopic) junto a topics_lda.
+# 1) Embeddings de oración de texto_raw con el encoder del config, cacheados
+#    por hash de texto en memmap (src.features.embeddings.EmbeddingCache): se
+#    comparten con train_transformer --frozen y nunca se recalculan.
+# 2) Reducción (UMAP, o PCA en la ruta rápida) cacheada por datos + parámetros.
+# 3) Clustering (HDBSCAN, o MiniBatchKMeans en la ruta rápida).
+# 4) BERTopic sólo para la representación c-TF-IDF sobre texto_proc.
+# Salidas con el mismo esquema que topics_global*.csv:
+#   python -m src.models.topics_bertopic                 # UMAP + HDBSCAN
+#   python -m src.models.topics_bertopic --fast          # PCA + MiniBatchKMeans
+#   python -m src.models.topics_bertopic --min-cluster-size 50   # re-clustering
+import argparse, hashlib, json, os, time
+import numpy as np
+import pandas as pd
+from src.common.paths import pjoin, load_config
+from src.common.logging import get_logger
+from src.features.embeddings import EmbeddingCache
+from src.models.topics_lda import pick_input, NUM_TOPICS
+
+log = get_logger("models.bertopic")
+
+RED_DIR = pjoin("data", "processed", "bertopic_reduced")
+MODEL_DIR = pjoin("models", "bertopic")
+DOC_TOPIC = pjoin("data", "processed", "bertopic_doc_topic.npy")
+N_COMPONENTS = {"umap": 5, "pca": 50}
+N_NEIGHBORS = 15
+MIN_CLUSTER_SIZE = 30
+
+
+def load_docs(path):
+    df = pd.read_csv(path, usecols=lambda c: c in ("texto_raw", "texto_proc"))
+    if "texto_proc" not in df.columns:
+        raise KeyError(f"{path} no tiene columna texto_proc")
+    raw = df["texto_raw"] if "texto_raw" in df.columns else df["texto_proc"]
+    return raw.fillna("").astype(str), df["texto_proc"].fillna("").astype(str)
+
+
+def reduce(E: np.ndarray, method: str, n_components: int, key: str) -> np.ndarray:
+    """
+    Embeddings normalizados (coseno = euclídea) → n_components dims. Se guarda
+    en data/processed/bertopic_reduced/<clave>.npy: cambiar sólo el clustering
+    no repite UMAP.
+    """
+    raw = json.dumps([key, method, n_components, N_NEIGHBORS])
+    path = os.path.join(str(RED_DIR), hashlib.sha1(raw.encode()).hexdigest()[:16])
+    path += ".npy"
+    if os.path.exists(path):
+        log.info("Reducción en caché: %s", path)
+        return np.load(path)
+    E = E / np.linalg.norm(E, axis=1, keepdims=True).clip(min=1e-12)
+    if method == "umap":
+        from umap import UMAP
+
+        Z = UMAP(
+            n_neighbors=N_NEIGHBORS,
+            n_components=n_components,
+            min_dist=0.0,
+            metric="euclidean",
+            low_memory=True,
+            n_jobs=-1,
+        ).fit_transform(E)
+    else:
+        from sklearn.decomposition import PCA
+
+        Z = PCA(n_components=n_components, random_state=42).fit_transform(E)
+    Z = np.asarray(Z, dtype=np.float32)
+    os.makedirs(str(RED_DIR), exist_ok=True)
+    np.save(path, Z)
+    return Z
+
+
+def cluster(Z: np.ndarray, method: str, k: int, min_cluster_size: int):
+    """Etiquetas por doc; -1 = sin tópico (sólo HDBSCAN)."""
+    if method == "hdbscan":
+        from hdbscan import HDBSCAN
+
+        model = HDBSCAN(
+            min_cluster_size=min_cluster_size,
+            metric="euclidean",
+            cluster_selection_method="eom",
+            core_dist_n_jobs=-1,
+        )
+    else:
+        from sklearn.cluster import MiniBatchKMeans
+
+        model = MiniBatchKMeans(
+            n_clusters=k, batch_size=4096, n_init=3, random_state=42
+        )
+    return model.fit(Z).labels_.astype(np.int32)
+
+
+def represent(docs, Z, labels, top_n: int = 10):
+    """BERTopic con reducción y clusters ya calculados: sólo c-TF-IDF."""
+    from bertopic import BERTopic
+    from bertopic.cluster import BaseCluster
+    from bertopic.dimensionality import BaseDimensionalityReduction
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    model = BERTopic(
+        embedding_model=None,
+        umap_model=BaseDimensionalityReduction(),
+        hdbscan_model=BaseCluster(),
+        vectorizer_model=CountVectorizer(min_df=2, token_pattern=r"(?u)\S+"),
+        top_n_words=top_n,
+        calculate_probabilities=False,
+    )
+    model.fit_transform(list(docs), embeddings=Z, y=labels)
+    return model
+
+
+def export(model, prefix="topics_bertopic"):
+    """
+    Mismo esquema que topics_global.csv / topics_global_examples.csv.
+    BERTopic renumera los clusters por frecuencia al ajustar: términos,
+    ejemplos y etiquetas por doc salen todos de model.topics_.
+    """
+    labels = np.asarray(model.topics_, dtype=np.int32)
+    topics = sorted(t for t in set(labels.tolist()) if t != -1)
+    rows, examples = [], []
+    for t in topics:
+        terms = ", ".join(w for w, _ in (model.get_topic(t) or [])[:10])
+        rows.append({"topic": t, "terms": terms})
+        for rank, doc in enumerate((model.get_representative_docs(t) or [])[:2], 1):
+            examples.append({"topic": t, "rank": rank, "texto_proc": doc[:300]})
+    os.makedirs("reports", exist_ok=True)
+    out_terms = pjoin("reports", f"{prefix}.csv")
+    out_ex = pjoin("reports", f"{prefix}_examples.csv")
+    pd.DataFrame(rows, columns=["topic", "terms"]).to_csv(out_terms, index=False)
+    pd.DataFrame(examples, columns=["topic", "rank", "texto_proc"]).to_csv(
+        out_ex, index=False
+    )
+    os.makedirs(os.path.dirname(str(DOC_TOPIC)), exist_ok=True)
+    np.save(DOC_TOPIC, labels)
+    print(f"Tópicos -> {out_terms}")
+    print(f"Ejemplos -> {out_ex}")
+    print(f"Doc-tópico -> {DOC_TOPIC}")
+    return labels
+
+
+def run(args):
+    path = pick_input()
+    raw, proc = load_docs(path)
+    cfg = load_config()["model"]
+    model_id = args.model_id or cfg["transformer_model"]
+    max_len = int(cfg.get("max_length", 256))
+    log.info("Archivo: %s | docs=%d | encoder=%s", path, len(raw), model_id)
+    timing = {}
+
+    t0 = time.perf_counter()
+    cache = EmbeddingCache(model_id, max_len, dtype=args.emb_dtype)
+    E = cache.embed(raw.tolist())
+    timing["embed_s"] = round(time.perf_counter() - t0, 2)
+
+    h = pd.util.hash_pandas_object(raw, index=False).to_numpy()
+    key = cache.path + hashlib.sha1(h.tobytes()).hexdigest()
+    t0 = time.perf_counter()
+    n_comp = min(args.n_components or N_COMPONENTS[args.reduce], E.shape[1])
+    Z = reduce(E, args.reduce, n_comp, key)
+    timing["reduce_s"] = round(time.perf_counter() - t0, 2)
+
+    t0 = time.perf_counter()
+    labels = cluster(Z, args.cluster, args.k, args.min_cluster_size)
+    timing["cluster_s"] = round(time.perf_counter() - t0, 2)
+    n_topics = len(set(labels.tolist()) - {-1})
+    log.info("Clusters: %d | sin tópico: %.1f%%", n_topics, 100 * np.mean(labels == -1))
+
+    t0 = time.perf_counter()
+    model = represent(proc, Z, labels)
+    timing["represent_s"] = round(time.perf_counter() - t0, 2)
+    labels = export(model)
+
+    os.makedirs(str(MODEL_DIR), exist_ok=True)
+    model.save(os.path.join(str(MODEL_DIR), "model"), save_embedding_model=False)
+    meta = {
+        "input": path,
+        "docs": len(raw),
+        "encoder": model_id,
+        "emb_cache": cache.path,
+        "reduce": args.reduce,
+        "n_components": n_comp,
+        "cluster": args.cluster,
+        "k": args.k if args.cluster == "kmeans" else None,
+        "min_cluster_size": args.min_cluster_size,
+        "topics": n_topics,
+        "outliers": int(np.sum(labels == -1)),
+        **timing,
+    }
+    out_meta = pjoin("reports", "topics_bertopic_meta.json")
+    with open(out_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    print(
+        " | ".join(f"{k}={v}" for k, v in timing.items())
+        + f" | tópicos={n_topics} -> {out_meta}"
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--model-id", default=None, help="encoder HF (por defecto el del config)"
+    )
+    ap.add_argument("--emb-dtype", default="float16", choices=["float16", "float32"])
+    ap.add_argument("--reduce", default="umap", choices=["umap", "pca"])
+    ap.add_argument("--cluster", default="hdbscan", choices=["hdbscan", "kmeans"])
+    ap.add_argument(
+        "--fast",
+        action="store_true",
+        help="ruta rápida en CPU: PCA + MiniBatchKMeans",
+    )
+    ap.add_argument(
+        "--n-components", type=int, default=None, help="por defecto 5 (UMAP) / 50 (PCA)"
+    )
+    ap.add_argument("--k", type=int, default=NUM_TOPICS, help="clusters de KMeans")
+    ap.add_argument("--min-cluster-size", type=int, default=MIN_CLUSTER_SIZE)
+    args = ap.parse_args()
+    if args.fast:
+        args.reduce, args.cluster = "pca", "kmeans"
+    run(args)
@@ -1,9 +1,12 @@
 # src/models/topics_lda.py
-import os, sys, math
+import argparse, hashlib, json, os, pickle, time
+from functools import partial
+import numpy as np
 import pandas as pd
-from gensim import corpora, models
+from gensim import corpora, models, matutils
 from src.common.paths import pjoin
 from src.common.logging import get_logger
+from src.features.store import get_store, doc_freq, data_version
 
 log = get_logger("models.lda")
 
@@ -13,6 +16,12 @@ PASSES = 6
 NO_BELOW = 5  # palabra debe aparecer en ≥ 5 docs
 NO_ABOVE = 0.30  # y en ≤ 30% de docs
 KEEP_N = 50000
+INFER_CHUNK = 2000
+DOC_TOPIC = pjoin("data", "processed", "lda_doc_topic.npy")
+MM_DIR = pjoin("data", "processed", "lda_corpus")
+CHUNKSIZE = 50_000
+LDA_DIR = pjoin("models", "lda")
+DRIFT = 0.15  # caída relativa del bound por palabra que fuerza reconstrucción
 
 
 def pick_input():
@@ -25,77 +34,622 @@ def pick_input():
     )
 
 
-def run():
-    path = pick_input()
-    df = pd.read_csv(path)
-    if "texto_proc" not in df.columns:
-        raise KeyError(f"{path} no tiene columna texto_proc")
-    texts = [str(t).split() for t in df["texto_proc"].fillna("")]
-    n_docs = len(texts)
-    non_empty = sum(1 for t in texts if len(t) > 0)
-    log.info("Archivo: %s | docs=%d | docs_no_vacios=%d", path, n_docs, non_empty)
-    if non_empty == 0:
-        raise RuntimeError("Todos los textos están vacíos para LDA (revisa clean_es).")
-
+def bow_from_texts(texts):
     # Diccionario y filtro
     dic = corpora.Dictionary(texts)
     log.info("Vocabulario inicial: %d términos", len(dic))
     dic.filter_extremes(no_below=NO_BELOW, no_above=NO_ABOVE, keep_n=KEEP_N)
-    log.info("Vocabulario tras filtro: %d términos", len(dic))
-    if len(dic) == 0:
-        raise RuntimeError(
-            "Vocabulario quedó vacío tras filter_extremes. Baja NO_BELOW o sube NO_ABOVE."
-        )
+    return dic, [dic.doc2bow(t) for t in texts]
 
-    corpus = [dic.doc2bow(t) for t in texts]
-    nnz_docs = sum(1 for bow in corpus if len(bow) > 0)
-    if nnz_docs == 0:
-        raise RuntimeError(
-            "Todos los bow están vacíos. Revisa los parámetros de filtro."
-        )
 
-    # Entrena LDA (silencioso pero rápido)
-    lda = models.LdaModel(
-        corpus=corpus,
+def bow_from_store(path):
+    """
+    Mismo filtro que Dictionary.filter_extremes pero sobre la matriz de
+    conteos del feature store (sin re-tokenizar).
+    """
+    store = get_store(path, "bow")
+    dfs = doc_freq(store.X)
+    log.info("Vocabulario inicial: %d términos (feature store)", len(dfs))
+    no_above_abs = int(NO_ABOVE * store.X.shape[0])
+    keep = np.flatnonzero((dfs >= NO_BELOW) & (dfs <= no_above_abs))
+    if len(keep) > KEEP_N:
+        keep = np.sort(keep[np.argsort(-dfs[keep], kind="stable")[:KEEP_N]])
+    id2word = dict(enumerate(store.vocab[keep].tolist()))
+    corpus = matutils.Sparse2Corpus(store.X[:, keep], documents_columns=False)
+    return corpora.Dictionary.from_corpus(corpus, id2word), corpus
+
+
+def iter_tokens(path, chunksize: int = CHUNKSIZE):
+    for chunk in pd.read_csv(path, usecols=["texto_proc"], chunksize=chunksize):
+        for t in chunk["texto_proc"].fillna(""):
+            yield str(t).split()
+
+
+def texts_at(path, idx, chunksize: int = CHUNKSIZE) -> dict:
+    """texto_proc de las filas idx leyendo el CSV por bloques."""
+    want, out, start = set(int(i) for i in idx), {}, 0
+    for chunk in pd.read_csv(path, usecols=["texto_proc"], chunksize=chunksize):
+        col = chunk["texto_proc"].fillna("").astype(str).to_numpy()
+        for i in want.intersection(range(start, start + len(col))):
+            out[i] = " ".join(col[i - start].split())
+        start += len(col)
+    return out
+
+
+def mm_corpus(path, use_store: bool = False):
+    """
+    BOW serializado una vez en Matrix Market (MmCorpus, lectura en streaming)
+    + Dictionary, en data/processed/lda_corpus/<clave de datos y filtro>/.
+    """
+    raw = json.dumps([data_version(path), NO_BELOW, NO_ABOVE, KEEP_N, use_store])
+    out = os.path.join(str(MM_DIR), hashlib.sha1(raw.encode()).hexdigest()[:12])
+    mm, dpath = os.path.join(out, "corpus.mm"), os.path.join(out, "dictionary.dict")
+    if os.path.exists(mm) and os.path.exists(dpath):
+        log.info("Corpus serializado en caché: %s", out)
+        return corpora.Dictionary.load(dpath), corpora.MmCorpus(mm), out
+
+    os.makedirs(out, exist_ok=True)
+    if use_store:
+        dic, corpus = bow_from_store(path)
+    else:
+        # dos pasadas por bloques: vocabulario y luego bow, sin listas en memoria
+        dic = corpora.Dictionary(iter_tokens(path))
+        log.info("Vocabulario inicial: %d términos", len(dic))
+        dic.filter_extremes(no_below=NO_BELOW, no_above=NO_ABOVE, keep_n=KEEP_N)
+        corpus = (dic.doc2bow(t) for t in iter_tokens(path))
+    corpora.MmCorpus.serialize(mm, corpus, id2word=dic)
+    dic.save(dpath)
+    log.info("Corpus serializado -> %s", out)
+    return dic, corpora.MmCorpus(mm), out
+
+
+def peak_rss_mb(children: bool = False) -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def train_multicore(dic, corpus, workers: int, passes: int = PASSES):
+    """
+    LdaMulticore pasada a pasada (para medir tiempo por pasada). No soporta
+    alpha="auto": usa alpha/eta simétricos.
+    """
+    lda = models.LdaMulticore(
         id2word=dic,
         num_topics=NUM_TOPICS,
-        passes=PASSES,
+        workers=workers,
         random_state=42,
-        alpha="auto",
-        eta="auto",
-        eval_every=None,  # quita cálculo de perplexidad en cada pass
+        eval_every=None,
         minimum_probability=0.0,
         minimum_phi_value=0.0,
     )
+    pass_s = []
+    for p in range(passes):
+        t0 = time.perf_counter()
+        lda.update(corpus)
+        pass_s.append(round(time.perf_counter() - t0, 2))
+        log.info("Pasada %d/%d: %.1fs", p + 1, passes, pass_s[-1])
+    return lda, pass_s
+
+
+def doc_topic_matrix(lda, corpus, chunk: int = INFER_CHUNK) -> np.ndarray:
+    """
+    θ (N × K, float32) en una sola pasada: lda.inference por lotes y
+    normalización de gamma por fila (lo mismo que get_document_topics).
+    """
+    theta = np.zeros((len(corpus), lda.num_topics), dtype=np.float32)
+    batch, start = [], 0
+    for bow in corpus:
+        batch.append(bow)
+        if len(batch) == chunk:
+            gamma, _ = lda.inference(batch)
+            theta[start : start + len(batch)] = gamma / gamma.sum(axis=1)[:, None]
+            start += len(batch)
+            batch = []
+    if batch:
+        gamma, _ = lda.inference(batch)
+        theta[start : start + len(batch)] = gamma / gamma.sum(axis=1)[:, None]
+    return theta
+
+
+def top_docs(theta: np.ndarray, n: int = 2) -> np.ndarray:
+    """Índices (K × n) de los docs con mayor probabilidad de cada tópico."""
+    n = min(n, theta.shape[0])
+    part = np.argpartition(-theta, n - 1, axis=0)[:n].T  # K × n, sin ordenar
+    order = np.argsort(-np.take_along_axis(theta.T, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
 
-    # Exporta términos top
+
+def export_topics(lda, theta, get_text):
+    """topics_global.csv + ejemplos (2 por tópico) + matriz doc-tópico."""
     rows = []
-    for k in range(NUM_TOPICS):
+    for k in range(lda.num_topics):
         terms = ", ".join(w for w, _ in lda.show_topic(k, topn=10))
         rows.append({"topic": k, "terms": terms})
     out_terms = pjoin("reports", "topics_global.csv")
     pd.DataFrame(rows).to_csv(out_terms, index=False)
 
-    # 2 ejemplos por tópico (docs con mayor probabilidad del tópico)
+    os.makedirs(os.path.dirname(str(DOC_TOPIC)), exist_ok=True)
+    np.save(DOC_TOPIC, theta)
+
     examples = []
-    for k in range(NUM_TOPICS):
-        scores = []
-        for i, bow in enumerate(corpus):
-            dist = lda.get_document_topics(bow, minimum_probability=0.0)
-            prob_k = dict(dist).get(k, 0.0)
-            scores.append((prob_k, i))
-        scores.sort(reverse=True)
-        top_idx = [i for _, i in scores[:2]]
+    for k, top_idx in enumerate(top_docs(theta, 2)):
         for rank, idx in enumerate(top_idx, 1):
             examples.append(
-                {"topic": k, "rank": rank, "texto_proc": " ".join(texts[idx])[:300]}
+                {"topic": k, "rank": rank, "texto_proc": get_text(idx)[:300]}
             )
     out_ex = pjoin("reports", "topics_global_examples.csv")
     pd.DataFrame(examples).to_csv(out_ex, index=False)
 
     print(f"Tópicos -> {out_terms}")
     print(f"Ejemplos -> {out_ex}")
+    print(f"Doc-tópico -> {DOC_TOPIC}")
+
+
+def _sample(corpus, n=2000):
+    return corpus[:: max(1, len(corpus) // n)][:n]
+
+
+def grow_vocab(lda, dic, new_texts) -> int:
+    """
+    Agrega al diccionario (y al modelo) términos nuevos frecuentes en los docs
+    nuevos, sin reindexar los existentes y sin pasar de KEEP_N. Las columnas
+    nuevas arrancan con sstats=0 (sólo el prior eta).
+    """
+    room = KEEP_N - len(dic)
+    if room <= 0:
+        return 0
+    nd = corpora.Dictionary(new_texts)
+    max_df = NO_ABOVE * len(new_texts)
+    cand = sorted(
+        (
+            (-nd.dfs[i], t)
+            for t, i in nd.token2id.items()
+            if t not in dic.token2id and NO_BELOW <= nd.dfs[i] <= max_df
+        )
+    )[:room]
+    if not cand:
+        return 0
+    dic.add_documents([[t] for _, t in cand])  # ids nuevos al final
+    n_new = len(dic) - lda.num_terms
+    K = lda.num_topics
+    eta_new = np.full(n_new, float(np.mean(lda.eta)), dtype=lda.dtype)
+    lda.eta = np.concatenate([lda.eta, eta_new])
+    lda.state.eta = np.concatenate([lda.state.eta, eta_new])
+    lda.state.sstats = np.hstack(
+        [lda.state.sstats, np.zeros((K, n_new), dtype=lda.state.sstats.dtype)]
+    )
+    lda.num_terms = len(dic)
+    lda.id2word = dic
+    lda.sync_state()
+    return n_new
+
+
+def scan_prefix(path, rows=None, chunksize: int = CHUNKSIZE):
+    """
+    Huella (sha1 del hash por fila de id + texto_proc) de las primeras `rows`
+    filas del CSV y tokens de las filas siguientes. Detecta filas insertadas,
+    reordenadas o reescritas dentro del prefijo ya consumido (limpio_final se
+    re-materializa por particiones). rows=None: huella de todo el archivo.
+    Devuelve (huella del prefijo, filas del prefijo, tokens del resto, huella
+    del archivo completo).
+    """
+    h, h_all, seen, tail = hashlib.sha1(), hashlib.sha1(), 0, []
+    cols = lambda c: c in ("id", "texto_proc")
+    for chunk in pd.read_csv(path, usecols=cols, chunksize=chunksize):
+        chunk = chunk.fillna({"texto_proc": ""})
+        cut = len(chunk) if rows is None else max(0, min(len(chunk), rows - seen))
+        rh = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        h.update(rh[:cut].tobytes())
+        h_all.update(rh.tobytes())
+        seen += cut
+        tail += [str(t).split() for t in chunk["texto_proc"].iloc[cut:]]
+    return h.hexdigest(), seen, tail, h_all.hexdigest()
+
+
+def full_build(path, state_dir):
+    texts = list(iter_tokens(path))
+    if not any(texts):
+        raise RuntimeError("Todos los textos están vacíos para LDA (revisa clean_es).")
+    dic, corpus = bow_from_texts(texts)
+    if len(dic) == 0:
+        raise RuntimeError(
+            "Vocabulario quedó vacío tras filter_extremes. Baja NO_BELOW o sube NO_ABOVE."
+        )
+    lda = models.LdaModel(
+        corpus=corpus,
+        id2word=dic,
+        num_topics=NUM_TOPICS,
+        passes=PASSES,
+        random_state=42,
+        alpha="auto",
+        eta="auto",
+        eval_every=None,
+        minimum_probability=0.0,
+        minimum_phi_value=0.0,
+    )
+    theta = doc_topic_matrix(lda, corpus)
+    fp, _, _, _ = scan_prefix(path)
+    state = {
+        "source": os.path.abspath(path),
+        "rows": len(texts),
+        "prefix_sha1": fp,
+        "base_bound": float(lda.log_perplexity(_sample(corpus))),
+        "built": time.strftime("%Y%m%d-%H%M%S"),
+        "updates": [],
+    }
+    return lda, dic, theta, state
+
+
+def run_incremental(drift_threshold: float = DRIFT, rebuild: bool = False):
+    """
+    Modelo + diccionario persistidos en models/lda con marca de agua (filas del
+    CSV ya vistas + huella de esas filas). Sólo las filas nuevas pasan por
+    lda.update (online); se reconstruye todo si no hay estado, cambió el
+    archivo fuente, cambió la huella del prefijo (filas nuevas intercaladas o
+    reescritas), o el bound por palabra de los docs nuevos cae más de
+    drift_threshold.
+
+    θ de las filas viejas queda con el modelo con que se infirió; sólo se
+    re-infieren los candidatos a ejemplo (top 10 por tópico) con el modelo
+    actualizado. Una reconstrucción recalcula θ completo.
+    """
+    path = pick_input()
+    state_dir = str(LDA_DIR)
+    state_path = os.path.join(state_dir, "state.json")
+    state = None
+    if os.path.exists(state_path) and not rebuild:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["source"] != os.path.abspath(path):
+            log.info("Fuente distinta (%s); reconstruyo", state["source"])
+            state = None
+
+    t0 = time.perf_counter()
+    reason = "sin estado" if state is None else None
+    if state is not None:
+        fp, seen, new_texts, fp_all = scan_prefix(path, state["rows"])
+        if seen < state["rows"] or fp != state.get("prefix_sha1"):
+            reason = "cambiaron filas ya consumidas"
+        elif not new_texts:
+            log.info("Sin filas nuevas desde la marca de agua (%d)", state["rows"])
+            return
+    if not reason:
+        lda = models.LdaModel.load(os.path.join(state_dir, "lda.model"))
+        dic = corpora.Dictionary.load(os.path.join(state_dir, "dictionary.dict"))
+        n_tok = sum(len(t) for t in new_texts)
+        oov = sum(1 for t in new_texts for w in t if w not in dic.token2id)
+        added = grow_vocab(lda, dic, new_texts)
+        new_corpus = [dic.doc2bow(t) for t in new_texts]
+        bound = float(lda.log_perplexity(_sample(new_corpus)))
+        drift = (state["base_bound"] - bound) / abs(state["base_bound"])
+        log.info(
+            "Nuevos: %d docs | OOV=%.1f%% | +%d términos | bound %.3f (base %.3f) | drift=%.3f",
+            len(new_texts),
+            100 * oov / max(n_tok, 1),
+            added,
+            bound,
+            state["base_bound"],
+            drift,
+        )
+        if drift > drift_threshold:
+            reason = f"drift {drift:.3f} > {drift_threshold}"
+
+    if reason:
+        log.info("Reconstrucción completa (%s)", reason)
+        lda, dic, theta, state = full_build(path, state_dir)
+    else:
+        lda.update(new_corpus)
+        theta_old = np.load(os.path.join(state_dir, "doc_topic.npy"))
+        cand = np.unique(top_docs(theta_old, 10).ravel())
+        old = texts_at(path, cand)
+        theta_old[cand] = doc_topic_matrix(
+            lda, [dic.doc2bow(old[i].split()) for i in cand]
+        )
+        theta = np.vstack([theta_old, doc_topic_matrix(lda, new_corpus)])
+        state["updates"].append(
+            {
+                "ts": time.strftime("%Y%m%d-%H%M%S"),
+                "docs": len(new_texts),
+                "new_terms": added,
+                "drift": round(drift, 4),
+                "s": round(time.perf_counter() - t0, 2),
+            }
+        )
+        state["rows"] += len(new_texts)
+        state["prefix_sha1"] = fp_all
+
+    os.makedirs(state_dir, exist_ok=True)
+    lda.save(os.path.join(state_dir, "lda.model"))
+    dic.save(os.path.join(state_dir, "dictionary.dict"))
+    np.save(os.path.join(state_dir, "doc_topic.npy"), theta)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+    cache = texts_at(path, top_docs(theta, 2).ravel())
+    export_topics(lda, theta, cache.__getitem__)
+    print(
+        f"{'Reconstrucción' if reason else 'Actualización'} en "
+        f"{time.perf_counter() - t0:.1f}s | marca de agua: {state['rows']} filas"
+    )
+
+
+def _fit_k(job):
+    """Proceso hijo del barrido: entrena K sobre el corpus serializado compartido."""
+    mm_dir, k, passes, topn = job
+    dic = corpora.Dictionary.load(os.path.join(mm_dir, "dictionary.dict"))
+    corpus = corpora.MmCorpus(os.path.join(mm_dir, "corpus.mm"))
+    t0 = time.perf_counter()
+    lda = models.LdaModel(
+        corpus=corpus,
+        id2word=dic,
+        num_topics=k,
+        passes=passes,
+        random_state=42,
+        alpha="auto",
+        eta="auto",
+        eval_every=None,
+        minimum_probability=0.0,
+        minimum_phi_value=0.0,
+    )
+    train_s = time.perf_counter() - t0
+    lda.save(os.path.join(mm_dir, "sweep", f"lda_k{k}.model"))
+    topics = [[w for w, _ in lda.show_topic(t, topn=topn)] for t in range(k)]
+    return k, topics, round(train_s, 2)
+
+
+def coherence_cache(measure, topics, dic, corpus, texts_fn, cache_dir, topn):
+    """
+    CoherenceModel con co-ocurrencias estimadas una sola vez para la unión de
+    los tópicos de todos los K (y persistidas en cache_dir); cada K sólo
+    re-segmenta y confirma sobre el acumulador ya calculado.
+    """
+    from gensim.models.coherencemodel import CoherenceModel
+
+    path = os.path.join(cache_dir, f"coh_{measure}.pkl")
+    need = {dic.token2id[w] for t in topics for w in t}
+    acc = None
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            cached = pickle.load(f)
+        # {"texts": "raw", "acc": ...}; otro formato = caché anterior, se recalcula
+        if isinstance(cached, dict) and cached.get("texts") == "raw":
+            if cached["acc"].relevant_ids.issuperset(need):
+                acc = cached["acc"]
+    make = partial(
+        CoherenceModel,
+        topics=topics,
+        dictionary=dic,
+        coherence=measure,
+        topn=topn,
+        processes=1,
+    )
+    # _accumulator es privado de CoherenceModel (gensim 4.x, fijado en
+    # requirements.txt); si una versión lo quita, se estima como sin caché
+    if acc is not None:
+        log.info("Co-ocurrencias %s en caché: %s", measure, path)
+        # con acumulador ya estimado no hace falta leer textos ni corpus;
+        # texts=[] también para u_mass: gensim no acepta corpus=[] como corpus
+        cm = make(texts=[])
+        if hasattr(cm, "_accumulator"):
+            cm._accumulator = acc
+            return cm
+        log.warning("CoherenceModel sin _accumulator: se ignora la caché")
+    cm = make(**({"corpus": corpus} if measure == "u_mass" else {"texts": texts_fn()}))
+    t0 = time.perf_counter()
+    acc = cm.estimate_probabilities()
+    log.info("Co-ocurrencias %s en %.1fs", measure, time.perf_counter() - t0)
+    with open(path, "wb") as f:
+        pickle.dump({"texts": "raw", "acc": acc}, f)
+    return cm
+
+
+def sweep(ks, workers: int = 0, passes: int = PASSES, use_store: bool = False):
+    """
+    Barrido de K en procesos paralelos sobre el mismo MmCorpus + Dictionary
+    serializados. Coherencia c_v y u_mass por K → tabla y gráfico.
+    """
+    path = pick_input()
+    dic, corpus, mm_dir = mm_corpus(path, use_store)
+    ks = sorted(set(ks))
+    workers = workers or min(len(ks), max(1, (os.cpu_count() or 2) - 1))
+    log.info("Barrido K=%s | %d procesos | corpus %s", ks, workers, mm_dir)
+    os.makedirs(os.path.join(mm_dir, "sweep"), exist_ok=True)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    topn, results = 10, {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        jobs = [(mm_dir, k, passes, topn) for k in ks]
+        for k, topics, train_s in ex.map(_fit_k, jobs):
+            results[k] = (topics, train_s)
+            log.info("K=%d entrenado en %.1fs", k, train_s)
+    wall_s = time.perf_counter() - t0
+
+    # tokens sin filtrar: las ventanas deslizantes de c_v cuentan también las
+    # palabras fuera del diccionario (gensim las trata como relleno)
+    def texts_fn():
+        return list(iter_tokens(path))
+
+    union = [t for k in ks for t in results[k][0]]
+    rows = {k: {"k": k, "train_s": results[k][1]} for k in ks}
+    for measure in ("c_v", "u_mass"):
+        cm = coherence_cache(measure, union, dic, corpus, texts_fn, mm_dir, topn)
+        for k in ks:
+            t1 = time.perf_counter()
+            cm.topics = results[k][0]
+            per_topic = cm.get_coherence_per_topic()
+            rows[k][measure] = round(float(np.mean(per_topic)), 4)
+            rows[k][f"{measure}_min"] = round(float(np.min(per_topic)), 4)
+            rows[k][f"{measure}_s"] = round(time.perf_counter() - t1, 3)
+
+    rep = pd.DataFrame([rows[k] for k in ks])
+    os.makedirs("reports", exist_ok=True)
+    out = pjoin("reports", "topics_lda_sweep.csv")
+    rep.to_csv(out, index=False)
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 4))
+    ax1.plot(rep["k"], rep["c_v"], "o-", label="c_v")
+    ax1.set_xlabel("K")
+    ax1.set_ylabel("c_v")
+    ax1b = ax1.twinx()
+    ax1b.plot(rep["k"], rep["u_mass"], "s--", color="tab:orange", label="u_mass")
+    ax1b.set_ylabel("u_mass")
+    ax1.set_title("Coherencia por K")
+    ax2.bar(rep["k"].astype(str), rep["train_s"])
+    ax2.set_xlabel("K")
+    ax2.set_ylabel("Entrenamiento (s)")
+    ax2.set_title(f"Tiempo por K ({workers} procesos, {wall_s:.0f}s total)")
+    fig.tight_layout()
+    out_png = pjoin("reports", "topics_lda_sweep.png")
+    fig.savefig(out_png, dpi=200)
+    plt.close(fig)
+
+    print(rep.to_string(index=False))
+    best = rep.loc[rep["c_v"].idxmax(), "k"]
+    print(f"Mejor K por c_v: {best} (modelos en {os.path.join(mm_dir, 'sweep')})")
+    print(f"Barrido -> {out}")
+    print(f"Figura -> {out_png}")
+    return rep
+
+
+def run(use_store: bool = False, streaming: bool = False, workers: int = 0):
+    path = pick_input()
+    t_start = time.perf_counter()
+    if streaming:
+        dic, corpus, mm_dir = mm_corpus(path, use_store)
+        log.info("Archivo: %s | docs=%d | nnz=%d", path, len(corpus), corpus.num_nnz)
+        texts = None
+    else:
+        df = pd.read_csv(path)
+        if "texto_proc" not in df.columns:
+            raise KeyError(f"{path} no tiene columna texto_proc")
+        texts = [str(t).split() for t in df["texto_proc"].fillna("")]
+        n_docs = len(texts)
+        non_empty = sum(1 for t in texts if len(t) > 0)
+        log.info("Archivo: %s | docs=%d | docs_no_vacios=%d", path, n_docs, non_empty)
+        if non_empty == 0:
+            raise RuntimeError(
+                "Todos los textos están vacíos para LDA (revisa clean_es)."
+            )
+
+        if use_store:
+            dic, corpus = bow_from_store(path)
+        else:
+            dic, corpus = bow_from_texts(texts)
+    log.info("Vocabulario tras filtro: %d términos", len(dic))
+    if len(dic) == 0:
+        raise RuntimeError(
+            "Vocabulario quedó vacío tras filter_extremes. Baja NO_BELOW o sube NO_ABOVE."
+        )
+
+    nnz_docs = sum(1 for bow in corpus if len(bow) > 0)
+    if nnz_docs == 0:
+        raise RuntimeError(
+            "Todos los bow están vacíos. Revisa los parámetros de filtro."
+        )
+
+    if streaming:
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        t0 = time.perf_counter()
+        lda, pass_s = train_multicore(dic, corpus, workers)
+        bench = {
+            "docs": len(corpus),
+            "vocab": len(dic),
+            "workers": workers,
+            "corpus_dir": mm_dir,
+            "prep_s": round(t0 - t_start, 2),
+            "pass_s": pass_s,
+            "train_s": round(time.perf_counter() - t0, 2),
+        }
+    else:
+        # Entrena LDA (silencioso pero rápido)
+        lda = models.LdaModel(
+            corpus=corpus,
+            id2word=dic,
+            num_topics=NUM_TOPICS,
+            passes=PASSES,
+            random_state=42,
+            alpha="auto",
+            eta="auto",
+            eval_every=None,  # quita cálculo de perplexidad en cada pass
+            minimum_probability=0.0,
+            minimum_phi_value=0.0,
+        )
+
+    # Matriz doc-tópico una sola vez; se guarda para otros reportes
+    t0 = time.perf_counter()
+    theta = doc_topic_matrix(lda, corpus)
+    log.info("Doc-tópico %s en %.1fs", theta.shape, time.perf_counter() - t0)
+
+    # 2 ejemplos por tópico (docs con mayor probabilidad del tópico)
+    if texts is not None:
+        get = lambda i: " ".join(texts[i])
+    else:
+        get = texts_at(path, top_docs(theta, 2).ravel()).__getitem__
+    export_topics(lda, theta, get)
+    if streaming:
+        bench["peak_rss_mb"] = peak_rss_mb()
+        bench["peak_rss_workers_mb"] = peak_rss_mb(children=True)
+        out_b = pjoin("reports", "topics_lda_bench.json")
+        with open(out_b, "w", encoding="utf-8") as f:
+            json.dump(bench, f, ensure_ascii=False, indent=2)
+        print(
+            f"Pasadas: {bench['pass_s']} s | RSS pico: {bench['peak_rss_mb']} MB "
+            f"(workers {bench['peak_rss_workers_mb']} MB) -> {out_b}"
+        )
 
 
 if __name__ == "__main__":
-    run()
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--feature-store",
+        action="store_true",
+        help="usa los conteos de src.features.store en vez de re-tokenizar",
+    )
+    ap.add_argument(
+        "--streaming",
+        action="store_true",
+        help="corpus serializado (MmCorpus) + LdaMulticore; no carga textos en memoria",
+    )
+    ap.add_argument(
+        "--workers", type=int, default=0, help="workers de LdaMulticore (0 = núcleos-1)"
+    )
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help="actualiza online el modelo de models/lda sólo con filas nuevas",
+    )
+    ap.add_argument("--drift-threshold", type=float, default=DRIFT)
+    ap.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="con --incremental: fuerza reconstrucción",
+    )
+    ap.add_argument(
+        "--sweep",
+        type=int,
+        nargs="+",
+        default=None,
+        metavar="K",
+        help="barrido de K en paralelo con coherencia c_v/u_mass (p.ej. --sweep 6 8 10 12)",
+    )
+    ap.add_argument("--passes", type=int, default=PASSES)
+    args = ap.parse_args()
+    if args.sweep:
+        sweep(args.sweep, args.workers, args.passes, args.feature_store)
+    elif args.incremental:
+        run_incremental(args.drift_threshold, args.rebuild)
+    else:
+        run(
+            use_store=args.feature_store, streaming=args.streaming, workers=args.workers
+        )
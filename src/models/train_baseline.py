@@ -1,11 +1,21 @@
 # src/models/train_baseline.py
-import argparse, json, os
+import argparse, json, os, shutil, tempfile, time
 from datetime import datetime
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import GroupShuffleSplit, StratifiedShuffleSplit
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import (
+    GroupShuffleSplit,
+    StratifiedShuffleSplit,
+    GroupKFold,
+    GridSearchCV,
+    RandomizedSearchCV,
+)
+from sklearn.feature_extraction.text import (
+    TfidfVectorizer,
+    TfidfTransformer,
+    HashingVectorizer,
+)
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.svm import LinearSVC
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report, confusion_matrix
@@ -16,15 +26,45 @@ matplotlib.use("Agg")  # evitar backends interactivos
 import matplotlib.pyplot as plt
 from src.common.paths import pjoin
 from src.common.logging import get_logger
+from src.features.store import get_store, doc_freq
+from src.models.compact_model import export as export_compact, compact_path
 
 log = get_logger("models.baseline")
 
+# Espacio de búsqueda para --search (TF-IDF × clasificador)
+SEARCH_VEC = {
+    "tfidf__min_df": [1, 2, 3, 5, 10],
+    "tfidf__max_df": [0.9, 0.95, 0.99],
+    "tfidf__ngram_range": [(1, 1), (1, 2), (1, 3)],
+}
+SEARCH_CLF = [
+    {
+        "clf": [LogisticRegression(max_iter=500, class_weight="balanced")],
+        "clf__C": [0.3, 1.0, 3.0, 10.0],
+    },
+    {"clf": [LinearSVC(class_weight="balanced")], "clf__C": [0.1, 0.3, 1.0, 3.0]},
+]
 
-def make_groups(df: pd.DataFrame) -> pd.Series:
+
+ERR_COLS = [
+    "id",
+    "fuente",
+    "dieta_heuristica",
+    "video_id",
+    "package",
+    "url",
+    "texto_proc",
+    "sentimiento",
+    "pred",
+]
+
+
+def make_groups(df: pd.DataFrame, offset: int = 0) -> pd.Series:
     """
     Construye un vector de grupos sin NaN para GroupShuffleSplit
     usando, en orden: video_id → package → url → fuente → id → índice de fila.
     Normaliza strings vacíos a NaN y fuerza dtype str.
+    `offset` desplaza el índice de fila (para leer por chunks sin colisiones).
     """
     cols = ["video_id", "package", "url", "fuente", "id"]
     g = pd.Series(pd.NA, index=df.index, dtype="object")
@@ -33,7 +73,9 @@ def make_groups(df: pd.DataFrame) -> pd.Series:
             s = df[c].astype("string").replace({"": pd.NA, "nan": pd.NA, "None": pd.NA})
             g = g.fillna(s)
     # Fallback final: índice de fila
-    g = g.fillna(pd.Series([f"row_{i}" for i in range(len(df))], index=df.index))
+    g = g.fillna(
+        pd.Series([f"row_{i}" for i in range(offset, offset + len(df))], index=df.index)
+    )
     return g.astype(str)
 
 
@@ -51,7 +93,244 @@ def plot_confusion(cm, labels, out_png):
     plt.close()
 
 
+def save_reports(reports_dir, model_name, rep_dict, cm, labels):
+    pd.DataFrame(rep_dict).to_csv(pjoin(reports_dir, f"{model_name}_report.csv"))
+    with open(
+        pjoin(reports_dir, f"{model_name}_report.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(rep_dict, f, ensure_ascii=False, indent=2)
+
+    pd.DataFrame(cm, index=labels, columns=labels).to_csv(
+        pjoin(reports_dir, f"{model_name}_confusion.csv")
+    )
+    plot_confusion(cm, labels, pjoin(reports_dir, f"{model_name}_confusion.png"))
+
+
+def hash_split(groups: pd.Series, test_size: float, seed: int) -> np.ndarray:
+    """
+    Asignación train/test sin estado: un grupo va a test si el hash (con
+    semilla) de su clave cae por debajo de test_size. Estable entre chunks.
+    """
+    h = pd.util.hash_pandas_object(
+        groups, index=False, hash_key=f"{seed:016d}"[-16:]
+    ).to_numpy()
+    return (h / np.float64(2**64)) < test_size
+
+
+def iter_chunks(path, chunksize):
+    offset = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        groups = make_groups(chunk, offset=offset)
+        offset += len(chunk)
+        keep = chunk["texto_proc"].notna() & chunk["sentimiento"].notna()
+        yield chunk[keep], groups[keep]
+
+
+def run_streaming(args):
+    """
+    Entrenamiento out-of-core: HashingVectorizer (sin estado) + SGDClassifier
+    con partial_fit sobre chunks de texto_proc. La memoria depende de
+    --chunksize y --n-features, no del tamaño del corpus.
+    """
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    reports_dir = "reports"
+    models_dir = "models"
+    os.makedirs(reports_dir, exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
+    path = pjoin("data", "interim", "limpio_final.csv")
+    model_name = f"baseline_stream_{args.model}_{ts}"
+
+    # Pre-pasada barata (una columna) para clases y pesos balanceados
+    counts = pd.Series(dtype="int64")
+    for c in pd.read_csv(path, usecols=["sentimiento"], chunksize=args.chunksize):
+        counts = counts.add(c["sentimiento"].value_counts(), fill_value=0)
+    labels = sorted(counts.index.tolist())
+    if len(labels) < 2:
+        raise RuntimeError("Se necesitan al menos 2 clases en limpio_final.csv.")
+    weights = (counts.sum() / (len(labels) * counts)).to_dict()
+
+    vec = HashingVectorizer(
+        n_features=2**args.n_features,
+        ngram_range=(1, args.ngram),
+        strip_accents="unicode",  # normaliza tildes (español)
+        alternate_sign=False,
+    )
+    clf = SGDClassifier(
+        loss="log_loss" if args.model == "lr" else "hinge",
+        alpha=1e-5,
+        random_state=args.seed,
+    )
+
+    rng = np.random.default_rng(args.seed)
+    n_tr = n_te = 0
+    for epoch in range(args.epochs):
+        for chunk, groups in iter_chunks(path, args.chunksize):
+            tr = chunk[~hash_split(groups, args.test_size, args.seed)]
+            if tr.empty:
+                continue
+            tr = tr.iloc[rng.permutation(len(tr))]
+            y = tr["sentimiento"].to_numpy()
+            clf.partial_fit(
+                vec.transform(tr["texto_proc"].astype(str)),
+                y,
+                classes=labels,
+                sample_weight=np.array([weights[v] for v in y]),
+            )
+            if epoch == 0:
+                n_tr += len(tr)
+        log.info("Época %d/%d | train=%d", epoch + 1, args.epochs, n_tr)
+
+    # Evaluación en streaming: sólo guardamos códigos de etiqueta (int8)
+    pipe = Pipeline([("hash", vec), ("clf", clf)])
+    code = {l: i for i, l in enumerate(labels)}
+    y_true, y_pred = [], []
+    err_path = pjoin(reports_dir, f"{model_name}_errors.csv")
+    wrote_err = False
+    for chunk, groups in iter_chunks(path, args.chunksize):
+        te = chunk[hash_split(groups, args.test_size, args.seed)]
+        if te.empty:
+            continue
+        n_te += len(te)
+        preds = pipe.predict(te["texto_proc"].astype(str))
+        y_true.append(te["sentimiento"].map(code).to_numpy(np.int8))
+        y_pred.append(pd.Series(preds).map(code).to_numpy(np.int8))
+        err = te.assign(pred=preds)
+        err = err[err["pred"] != err["sentimiento"]]
+        err[[c for c in ERR_COLS if c in err.columns]].to_csv(
+            err_path, index=False, mode="a" if wrote_err else "w", header=not wrote_err
+        )
+        wrote_err = True
+    if n_te == 0:
+        raise RuntimeError("Ningún grupo cayó en test; sube --test-size.")
+
+    y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+    idx = list(range(len(labels)))
+    cm = confusion_matrix(y_true, y_pred, labels=idx)
+    rep_dict = classification_report(
+        y_true, y_pred, labels=idx, target_names=labels, digits=3, output_dict=True
+    )
+    save_reports(reports_dir, model_name, rep_dict, cm, labels)
+    dump(pipe, pjoin(models_dir, f"{model_name}.joblib"))
+    if args.compact:
+        export_compact(
+            pipe, compact_path(pjoin(models_dir, f"{model_name}.joblib")), args.prune
+        )
+
+    log.info("Split=hash_group | train=%d | test=%d", n_tr, n_te)
+    log.info("Listo. Reportes en %s, modelo en %s", reports_dir, models_dir)
+    print("Split: hash_group")
+    print(f"Macro-F1: {rep_dict['macro avg']['f1-score']:.3f}")
+    print(f"Reporte  -> {pjoin(reports_dir, f'{model_name}_report.csv')}")
+    print(f"Matriz   -> {pjoin(reports_dir, f'{model_name}_confusion.png')}")
+
+
+def search(args, tr, ts, reports_dir):
+    """
+    Búsqueda grid/random con GroupKFold sobre make_groups (sólo en train).
+    Los folds corren en paralelo (n_jobs) y el TF-IDF transformado se cachea
+    en disco por (parámetros del vectorizador, fold) vía Pipeline(memory=...),
+    así que las variantes del clasificador no re-vectorizan.
+    Escribe un leaderboard y devuelve el mejor Pipeline reentrenado en train.
+    """
+    space = [{**SEARCH_VEC, **c} for c in SEARCH_CLF]
+    groups = make_groups(tr)
+    n_splits = min(args.folds, groups.nunique())
+    cache = args.cache_dir or tempfile.mkdtemp(prefix="tfidf_cache_")
+    pipe = Pipeline(
+        [
+            ("tfidf", TfidfVectorizer(sublinear_tf=True, strip_accents="unicode")),
+            ("clf", LogisticRegression()),
+        ],
+        memory=cache,
+    )
+    common = dict(
+        scoring="f1_macro",
+        cv=GroupKFold(n_splits=n_splits),
+        n_jobs=args.n_jobs,
+        refit=True,
+        error_score=np.nan,
+    )
+    if args.search == "grid":
+        sr = GridSearchCV(pipe, space, **common)
+    else:
+        sr = RandomizedSearchCV(
+            pipe, space, n_iter=args.n_iter, random_state=args.seed, **common
+        )
+
+    t0 = time.perf_counter()
+    try:
+        sr.fit(tr["texto_proc"], tr["sentimiento"], groups=groups)
+    finally:
+        if not args.cache_dir:
+            shutil.rmtree(cache, ignore_errors=True)
+    elapsed = time.perf_counter() - t0
+
+    res = pd.DataFrame(sr.cv_results_)
+    board = pd.DataFrame(
+        {
+            "rank": res["rank_test_score"],
+            "f1_macro_mean": res["mean_test_score"],
+            "f1_macro_std": res["std_test_score"],
+            "fit_time_mean": res["mean_fit_time"],
+            "score_time_mean": res["mean_score_time"],
+            "clf": [type(p["clf"]).__name__ for p in res["params"]],
+            "params": [
+                json.dumps({k: v for k, v in p.items() if k != "clf"}, default=str)
+                for p in res["params"]
+            ],
+        }
+    ).sort_values("rank")
+    out = pjoin(reports_dir, f"baseline_search_{ts}_leaderboard.csv")
+    board.to_csv(out, index=False)
+    log.info(
+        "Búsqueda %s | configs=%d | folds=%d | %.1fs | mejor F1=%.3f",
+        args.search,
+        len(res),
+        n_splits,
+        elapsed,
+        sr.best_score_,
+    )
+    print(f"Leaderboard -> {out}")
+    return sr.best_estimator_.set_params(memory=None)
+
+
+def fit_from_store(args, tr, te, clf):
+    """
+    Equivalente a Pipeline(TfidfVectorizer, clf).fit sobre tr, pero partiendo
+    de los conteos del feature store (sin re-tokenizar): filtra columnas por
+    min_df/max_df en train y aplica idf. Devuelve (pipe, X_test).
+    """
+    store = get_store(pjoin("data", "interim", "limpio_final.csv"), "tfidf", args.ngram)
+    Xtr = store.slice(tr.index.to_numpy()).astype(np.float64)
+    dfs = doc_freq(Xtr)
+    max_doc = (
+        args.max_df if isinstance(args.max_df, int) else args.max_df * Xtr.shape[0]
+    )
+    keep = np.flatnonzero((dfs >= args.min_df) & (dfs <= max_doc))
+    if len(keep) == 0:
+        raise ValueError("Ningún término sobrevive a min_df/max_df. Baja --min-df.")
+    Xtr = Xtr[:, keep]
+
+    tt = TfidfTransformer(sublinear_tf=True).fit(Xtr)
+    clf.fit(tt.transform(Xtr), tr["sentimiento"])
+
+    # Vectorizador equivalente para puntuar texto crudo con el modelo guardado
+    vec = TfidfVectorizer(
+        vocabulary=store.vocab[keep].tolist(),
+        ngram_range=(1, args.ngram),
+        sublinear_tf=True,
+        strip_accents="unicode",
+    )
+    vec.fit(tr["texto_proc"].iloc[:1])  # sólo fija vocabulary_ (vocabulario dado)
+    vec.idf_ = tt.idf_
+
+    Xte = store.slice(te.index.to_numpy()).astype(np.float64)[:, keep]
+    return Pipeline([("tfidf", vec), ("clf", clf)]), tt.transform(Xte)
+
+
 def run(args):
+    if args.streaming:
+        return run_streaming(args)
     ts = datetime.now().strftime("%Y%m%d-%H%M%S")
     reports_dir = "reports"
     models_dir = "models"
@@ -111,11 +390,19 @@ def run(args):
         clf = LogisticRegression(max_iter=500, class_weight="balanced")
         model_name = f"baseline_lr_{ts}"
 
-    pipe = Pipeline([("tfidf", vec), ("clf", clf)])
-    pipe.fit(tr["texto_proc"], tr["sentimiento"])
+    if args.search:
+        pipe = search(args, tr, ts, reports_dir)
+        model_name = f"baseline_search_{ts}"
+        preds = pipe.predict(te["texto_proc"])
+    elif args.feature_store:
+        pipe, Xte = fit_from_store(args, tr, te, clf)
+        preds = pipe.named_steps["clf"].predict(Xte)
+    else:
+        pipe = Pipeline([("tfidf", vec), ("clf", clf)])
+        pipe.fit(tr["texto_proc"], tr["sentimiento"])
+        preds = pipe.predict(te["texto_proc"])
 
     # === Evaluación ===
-    preds = pipe.predict(te["texto_proc"])
     labels = sorted(df["sentimiento"].dropna().unique().tolist())
     cm = confusion_matrix(te["sentimiento"], preds, labels=labels)
 
@@ -124,40 +411,21 @@ def run(args):
     )
 
     # === Guardados ===
-    pd.DataFrame(rep_dict).to_csv(pjoin(reports_dir, f"{model_name}_report.csv"))
-    with open(
-        pjoin(reports_dir, f"{model_name}_report.json"), "w", encoding="utf-8"
-    ) as f:
-        json.dump(rep_dict, f, ensure_ascii=False, indent=2)
-
-    pd.DataFrame(cm, index=labels, columns=labels).to_csv(
-        pjoin(reports_dir, f"{model_name}_confusion.csv")
-    )
-    plot_confusion(cm, labels, pjoin(reports_dir, f"{model_name}_confusion.png"))
+    save_reports(reports_dir, model_name, rep_dict, cm, labels)
 
     # Errores (misclasificaciones)
     err = te.copy()
     err["pred"] = preds
     err_err = err[err["pred"] != err["sentimiento"]]
-    cols = [
-        c
-        for c in [
-            "id",
-            "fuente",
-            "dieta_heuristica",
-            "video_id",
-            "package",
-            "url",
-            "texto_proc",
-            "sentimiento",
-            "pred",
-        ]
-        if c in err_err.columns
-    ]
+    cols = [c for c in ERR_COLS if c in err_err.columns]
     err_err[cols].to_csv(pjoin(reports_dir, f"{model_name}_errors.csv"), index=False)
 
     # Modelo persistido
     dump(pipe, pjoin(models_dir, f"{model_name}.joblib"))
+    if args.compact:
+        export_compact(
+            pipe, compact_path(pjoin(models_dir, f"{model_name}.joblib")), args.prune
+        )
 
     log.info("Listo. Reportes en %s, modelo en %s", reports_dir, models_dir)
     print(f"Split: {split_note}")
@@ -174,5 +442,43 @@ if __name__ == "__main__":
     ap.add_argument("--ngram", type=int, default=2, help="1=unigram, 2=uni+bi")
     ap.add_argument("--test-size", type=float, default=0.2)
     ap.add_argument("--seed", type=int, default=42)
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--feature-store",
+        action="store_true",
+        help="usa los conteos de src.features.store en vez de re-tokenizar",
+    )
+    mode.add_argument(
+        "--streaming",
+        action="store_true",
+        help="out-of-core: HashingVectorizer + SGDClassifier.partial_fit por chunks",
+    )
+    ap.add_argument("--chunksize", type=int, default=50_000)
+    ap.add_argument("--epochs", type=int, default=3, help="pasadas (sólo --streaming)")
+    ap.add_argument(
+        "--n-features", type=int, default=20, help="2**n columnas hash (--streaming)"
+    )
+    mode.add_argument(
+        "--search",
+        choices=["grid", "random"],
+        default=None,
+        help="búsqueda de hiperparámetros con GroupKFold (ignora --model/--min-df/...)",
+    )
+    ap.add_argument(
+        "--n-iter", type=int, default=50, help="configs para --search random"
+    )
+    ap.add_argument("--folds", type=int, default=5)
+    ap.add_argument("--n-jobs", type=int, default=-1)
+    ap.add_argument(
+        "--cache-dir", default=None, help="caché persistente del TF-IDF (--search)"
+    )
+    ap.add_argument(
+        "--compact",
+        action="store_true",
+        help="exporta además <modelo>.compact/ (ver src.models.compact_model)",
+    )
+    ap.add_argument(
+        "--prune", type=float, default=0.0, help="|coef| mínimo en --compact"
+    )
     args = ap.parse_args()
     run(args)
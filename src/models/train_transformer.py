@@ -1,22 +1,56 @@
 # src/models/train_transformer.py
-import os, json
+import argparse, glob, inspect, os, re, json, hashlib, shutil, time
 import numpy as np, pandas as pd
+import torch
 from datetime import datetime
-from datasets import Dataset, Features, ClassLabel, Value
+from datasets import Dataset, Features, ClassLabel, Value, load_from_disk
 from transformers import (
     AutoTokenizer,
     AutoModelForSequenceClassification,
     TrainingArguments,
     Trainer,
     EarlyStoppingCallback,
+    DataCollatorWithPadding,
+    TrainerCallback,
 )
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, confusion_matrix
 from src.common.paths import pjoin, load_config
 from src.common.logging import get_logger
+from src.features.embeddings import EmbeddingCache
 
 log = get_logger("models.transformer")
 
+TOK_CACHE = pjoin("data", "processed", "tok_cache")
+OUT_DIR = "out"
+LR = 2e-5
+WEIGHT_DECAY = 0.01
+RUN_RE = re.compile(r"^\d{8}-\d{6}$")
+
+
+class EpochBench(TrainerCallback):
+    """Mide tiempo por época y tokens reales (sin padding) por segundo."""
+
+    def __init__(self, train_tokens: int):
+        self.train_tokens = train_tokens
+        self.epochs = []
+        self._t0 = None
+
+    def on_epoch_begin(self, args, state, control, **kw):
+        self._t0 = time.perf_counter()
+
+    def on_epoch_end(self, args, state, control, **kw):
+        dt = time.perf_counter() - self._t0
+        self.epochs.append(
+            {"epoch_s": round(dt, 2), "tokens_per_s": round(self.train_tokens / dt, 1)}
+        )
+        log.info(
+            "Época %d: %.1fs | %.0f tokens/s",
+            len(self.epochs),
+            dt,
+            self.train_tokens / dt,
+        )
+
 
 def f1_macro(eval_pred):
     from sklearn.metrics import f1_score
@@ -26,16 +60,282 @@ def f1_macro(eval_pred):
     return {"f1": f1_score(labels, preds, average="macro")}
 
 
-def make_training_args(ts, epochs, batch):
+def data_hash(df: pd.DataFrame) -> str:
+    h = pd.util.hash_pandas_object(df[["texto_raw", "sentimiento"]], index=False)
+    return hashlib.sha1(h.to_numpy().tobytes()).hexdigest()[:16]
+
+
+def tokenized_splits(df, y, class_names, model_id, max_len, tok):
+    """
+    Split + tokenización cacheados en disco por (model_id, max_length, datos).
+    Sin padding aquí: se rellena por batch en el collator, y se guarda la
+    longitud de cada ejemplo para group_by_length.
+    """
+    key = hashlib.sha1(
+        json.dumps([model_id, max_len, data_hash(df), class_names, 0.2, 42]).encode(
+            "utf-8"
+        )
+    ).hexdigest()[:16]
+    cache_dir = os.path.join(str(TOK_CACHE), key)
+    meta_path = os.path.join(cache_dir, "split.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            split_note = json.load(f)["split"]
+        log.info("Tokenización en caché: %s", cache_dir)
+        return load_from_disk(os.path.join(cache_dir, "ds")), split_note
+
+    ds_full = Dataset.from_dict(
+        {"text": df["texto_raw"].astype(str).tolist(), "label": y.astype(int).tolist()}
+    )
+    features = Features(
+        {"text": Value("string"), "label": ClassLabel(names=class_names)}
+    )
+    ds_full = ds_full.cast(features)
+
+    # Split estratificado con fallback
+    try:
+        ds = ds_full.train_test_split(
+            test_size=0.2, stratify_by_column="label", seed=42
+        )
+        split_note = "stratified(ClassLabel)"
+    except Exception as e:
+        log.warning("Fallo split estratificado: %s. Uso split aleatorio.", e)
+        ds = ds_full.train_test_split(test_size=0.2, seed=42)
+        split_note = "random(fallback)"
+
+    def tok_fn(batch):
+        enc = tok(batch["text"], truncation=True, max_length=max_len)
+        enc["length"] = [len(ids) for ids in enc["input_ids"]]
+        return enc
+
+    ds = ds.map(tok_fn, batched=True, remove_columns=["text"])
+    ds.save_to_disk(os.path.join(cache_dir, "ds"))
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"split": split_note, "model_id": model_id, "max_length": max_len}, f)
+    log.info("Tokenización guardada en %s", cache_dir)
+    return ds, split_note
+
+
+def cpu_supports_bf16() -> bool:
+    """bf16 nativo en CPU (AVX512-BF16 o AMX); sin él, autocast bf16 es más lento."""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def setup_cpu(args) -> dict:
+    """
+    Perfil CPU: hilos intra/inter-op (repartidos entre procesos locales si se
+    lanza con torchrun) y decide bf16. Devuelve kwargs extra para
+    TrainingArguments.
+    """
+    world = int(os.environ.get("WORLD_SIZE", 1))
+    local = int(os.environ.get("LOCAL_WORLD_SIZE", world))
+    threads = args.threads or max(1, (os.cpu_count() or 1) // local)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(args.interop_threads)
+    except RuntimeError:
+        pass  # ya fijado (sólo se puede una vez por proceso)
+    bf16 = args.bf16 == "on" or (args.bf16 == "auto" and cpu_supports_bf16())
+    extra = {
+        "use_cpu": True,
+        "no_cuda": True,  # nombre viejo de use_cpu
+        "bf16": bf16,
+        "dataloader_num_workers": 0,
+    }
+    if world > 1:
+        extra["ddp_backend"] = "gloo"
+    log.info(
+        "Perfil CPU | hilos=%d | interop=%d | bf16=%s | grad_ckpt=%s | procesos=%d",
+        threads,
+        args.interop_threads,
+        bf16,
+        args.grad_checkpointing,
+        world,
+    )
+    return extra
+
+
+def checkpointing_kwargs(args) -> dict:
+    """Gradient checkpointing (con o sin --cpu)."""
+    if not args.grad_checkpointing:
+        return {}
+    # no reentrante: con capas congeladas el modo reentrante no propaga
+    # gradientes a los bloques recalculados
+    return {
+        "gradient_checkpointing": True,
+        "gradient_checkpointing_kwargs": {"use_reentrant": False},
+    }
+
+
+def freeze_lower_layers(model, n: int) -> int:
+    """
+    Congela embeddings + las n primeras capas del encoder. Devuelve #params.
+    Marca la salida de embeddings con requires_grad para que gradient
+    checkpointing (aun en modo reentrante) siga entrenando las capas altas.
+    """
+    base = getattr(model, model.base_model_prefix, None)
+    if n <= 0 or base is None or not hasattr(base, "encoder"):
+        return 0
+    mods = [base.embeddings] + list(base.encoder.layer[:n])
+    frozen = 0
+    for m in mods:
+        for p in m.parameters():
+            p.requires_grad = False
+            frozen += p.numel()
+    if hasattr(model, "enable_input_require_grads"):
+        model.enable_input_require_grads()
+    return frozen
+
+
+def shared_ts() -> str:
+    """Mismo timestamp en todos los procesos cuando se lanza con torchrun."""
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if int(os.environ.get("WORLD_SIZE", 1)) > 1:
+        import torch.distributed as dist
+
+        if not dist.is_initialized():
+            dist.init_process_group(backend="gloo")
+        obj = [ts]
+        dist.broadcast_object_list(obj, src=0)
+        ts = obj[0]
+    return ts
+
+
+def run_signature(model_id, max_len, df, class_names, hparams: dict) -> dict:
+    """
+    Lo que debe coincidir para reanudar: modelo, datos, clases y todo lo que
+    define optimizador y schedule (épocas, batch efectivo, lr, capas congeladas).
+    """
+    return {
+        "model_id": model_id,
+        "max_length": max_len,
+        "data_hash": data_hash(df),
+        "labels": class_names,
+        "hparams": hparams,
+    }
+
+
+def last_checkpoint(run_dir) -> str | None:
+    """Último checkpoint completo (con trainer_state.json) de una corrida."""
+    ckpts = [
+        c
+        for c in glob.glob(os.path.join(run_dir, "checkpoint-*"))
+        if os.path.exists(os.path.join(c, "trainer_state.json"))
+    ]
+    if not ckpts:
+        return None
+    return max(ckpts, key=lambda c: int(c.rsplit("-", 1)[-1]))
+
+
+def run_finished(ts, ckpt) -> bool:
+    """Terminó si ya escribió su meta final o su último checkpoint llegó a max_steps."""
+    if os.path.exists(pjoin("reports", f"transformer_meta_{ts}.json")):
+        return True
+    try:
+        with open(os.path.join(ckpt, "trainer_state.json"), encoding="utf-8") as f:
+            st = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return bool(st.get("max_steps")) and st.get("global_step", 0) >= st["max_steps"]
+
+
+def find_resumable(sig: dict):
+    """
+    Corrida más reciente en out/ con el mismo modelo, max_length, datos y
+    clases, y al menos un checkpoint completo, que no haya terminado.
+    Devuelve (ts, checkpoint).
+    """
+    for ts in sorted(
+        os.listdir(OUT_DIR) if os.path.isdir(OUT_DIR) else [], reverse=True
+    ):
+        run_dir = os.path.join(OUT_DIR, ts)
+        try:
+            with open(os.path.join(run_dir, "run.json"), encoding="utf-8") as f:
+                if json.load(f) != sig:
+                    continue
+        except (OSError, ValueError):
+            continue  # corridas viejas sin manifiesto: no se reanudan
+        ckpt = last_checkpoint(run_dir)
+        if ckpt and not run_finished(ts, ckpt):
+            return ts, ckpt
+    return None
+
+
+def dir_size(path) -> int:
+    return sum(
+        os.path.getsize(os.path.join(d, f))
+        for d, _, files in os.walk(path)
+        for f in files
+    )
+
+
+def prune_runs(keep: int, max_gb: float | None = None, protect=()) -> list:
+    """
+    Retención de out/: conserva las `keep` corridas más recientes y, si se
+    da max_gb, sigue borrando las más viejas hasta bajar de ese tamaño.
+    Las corridas en `protect` nunca se borran.
+    """
+    if not os.path.isdir(OUT_DIR):
+        return []
+    runs = sorted(
+        (d for d in os.listdir(OUT_DIR) if RUN_RE.match(d)), reverse=True
+    )  # más reciente primero (ts ordenable)
+    sizes = {d: dir_size(os.path.join(OUT_DIR, d)) for d in runs}
+    total = sum(sizes.values())
+    limit = None if max_gb is None else max_gb * 2**30
+    removed = []
+    for i, d in reversed(list(enumerate(runs))):
+        if d in protect:
+            continue
+        if (keep and i >= keep) or (limit is not None and total > limit):
+            shutil.rmtree(os.path.join(OUT_DIR, d), ignore_errors=True)
+            total -= sizes[d]
+            removed.append(d)
+    if removed:
+        log.info(
+            "Retención out/: borradas %d corridas | quedan %.1f MB",
+            len(removed),
+            total / 2**20,
+        )
+    return removed
+
+
+def _supported_kwargs(extra: dict) -> dict:
+    fields = set(inspect.signature(TrainingArguments.__init__).parameters)
+    if "use_cpu" in fields:
+        extra = {k: v for k, v in extra.items() if k != "no_cuda"}
+    ok = {k: v for k, v in extra.items() if k in fields}
+    dropped = sorted(set(extra) - set(ok) - {"no_cuda", "use_cpu"})
+    if dropped:
+        log.warning("TrainingArguments no soporta: %s (ignorados)", dropped)
+    return ok
+
+
+def make_training_args(ts, epochs, batch, extra=None):
     """
     Construye TrainingArguments compatible con versiones nuevas y viejas.
     Si tu transformers es viejo, cae a un set mínimo de argumentos.
+    `extra` (p. ej. el perfil CPU) se filtra a lo que soporte la versión.
     """
+    extra = _supported_kwargs(extra or {})
     try:
         # API moderna
         return (
             TrainingArguments(
-                output_dir=f"out/{ts}",
+                output_dir=f"{OUT_DIR}/{ts}",
                 evaluation_strategy="epoch",
                 save_strategy="epoch",
                 num_train_epochs=epochs,
@@ -43,12 +343,14 @@ def make_training_args(ts, epochs, batch):
                 per_device_eval_batch_size=max(8, batch),
                 load_best_model_at_end=True,
                 metric_for_best_model="f1",
-                weight_decay=0.01,
-                learning_rate=2e-5,
+                weight_decay=WEIGHT_DECAY,
+                learning_rate=LR,
                 save_total_limit=2,
                 logging_steps=50,
                 report_to="none",
                 seed=42,
+                group_by_length=True,  # batches de longitud similar → menos padding
+                **extra,
             ),
             True,
             "new_api",
@@ -58,18 +360,20 @@ def make_training_args(ts, epochs, batch):
         try:
             return (
                 TrainingArguments(
-                    output_dir=f"out/{ts}",
+                    output_dir=f"{OUT_DIR}/{ts}",
                     do_eval=True,
                     num_train_epochs=epochs,
                     per_device_train_batch_size=batch,
                     per_device_eval_batch_size=max(8, batch),
-                    weight_decay=0.01,
-                    learning_rate=2e-5,
+                    weight_decay=WEIGHT_DECAY,
+                    learning_rate=LR,
                     save_total_limit=2,
                     logging_steps=50,
                     seed=42,
                     save_steps=500,
                     eval_steps=500,
+                    group_by_length=True,
+                    **extra,
                 ),
                 False,
                 "old_api",
@@ -78,22 +382,26 @@ def make_training_args(ts, epochs, batch):
             # Mínimo-mínimo
             return (
                 TrainingArguments(
-                    output_dir=f"out/{ts}",
+                    output_dir=f"{OUT_DIR}/{ts}",
                     num_train_epochs=epochs,
                     per_device_train_batch_size=batch,
                     per_device_eval_batch_size=max(8, batch),
-                    weight_decay=0.01,
-                    learning_rate=2e-5,
+                    weight_decay=WEIGHT_DECAY,
+                    learning_rate=LR,
                     logging_steps=50,
                     seed=42,
+                    **extra,
                 ),
                 False,
                 "minimal_api",
             )
 
 
-def run():
-    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+def run(args=None):
+    args = args or parse_args([])
+    extra = setup_cpu(args) if args.cpu else {}
+    extra.update(checkpointing_kwargs(args))
+    ts = shared_ts()
     cfg = load_config()
     model_id = cfg["model"].get(
         "transformer_model", "dccuchile/bert-base-spanish-wwm-cased"
@@ -114,40 +422,47 @@ def run():
     class_names = list(le.classes_)
     log.info("Clases: %s", class_names)
 
-    ds_full = Dataset.from_dict(
-        {"text": df["texto_raw"].astype(str).tolist(), "label": y.astype(int).tolist()}
-    )
-    features = Features(
-        {"text": Value("string"), "label": ClassLabel(names=class_names)}
-    )
-    ds_full = ds_full.cast(features)
+    # Reanudación: misma corrida (out/<ts>) si coinciden modelo, datos e hiperparámetros
+    hparams = {
+        "epochs": epochs,
+        "batch_size": batch,
+        "world_size": int(os.environ.get("WORLD_SIZE", 1)),
+        "learning_rate": LR,
+        "weight_decay": WEIGHT_DECAY,
+        "freeze_layers": args.freeze_layers,
+        "seed": 42,
+    }
+    sig = run_signature(model_id, max_len, df, class_names, hparams)
+    resume_from = None
+    if args.resume:
+        found = find_resumable(sig)
+        if found:
+            ts, resume_from = found
+            log.info("Reanudando %s desde %s", ts, resume_from)
+        else:
+            log.info("Sin checkpoint compatible en %s/; corrida nueva", OUT_DIR)
 
-    # Split estratificado con fallback
-    try:
-        ds = ds_full.train_test_split(
-            test_size=0.2, stratify_by_column="label", seed=42
-        )
-        split_note = "stratified(ClassLabel)"
-    except Exception as e:
-        log.warning("Fallo split estratificado: %s. Uso split aleatorio.", e)
-        ds = ds_full.train_test_split(test_size=0.2, seed=42)
-        split_note = "random(fallback)"
+    # TrainingArguments compatibles
+    targs, can_early_stop, api_note = make_training_args(ts, epochs, batch, extra)
 
-    # Tokenización
+    # Tokenización (cacheada; padding dinámico por batch)
     tok = AutoTokenizer.from_pretrained(model_id, use_fast=True)
-
-    def tok_fn(batch):
-        return tok(batch["text"], padding=True, truncation=True, max_length=max_len)
-
-    ds = ds.map(tok_fn, batched=True)
+    with targs.main_process_first(desc="tokenización"):
+        ds, split_note = tokenized_splits(df, y, class_names, model_id, max_len, tok)
+    collator = DataCollatorWithPadding(tok)
+    train_tokens = int(np.sum(ds["train"]["length"]))
+    bench = EpochBench(train_tokens)
 
     # Modelo
     model = AutoModelForSequenceClassification.from_pretrained(
         model_id, num_labels=len(class_names)
     )
+    frozen = freeze_lower_layers(model, args.freeze_layers)
+    if frozen:
+        log.info(
+            "Congeladas %d capas inferiores (%d parámetros)", args.freeze_layers, frozen
+        )
 
-    # TrainingArguments compatibles
-    targs, can_early_stop, api_note = make_training_args(ts, epochs, batch)
     callbacks = (
         [EarlyStoppingCallback(early_stopping_patience=2)] if can_early_stop else []
     )
@@ -159,16 +474,29 @@ def run():
         eval_dataset=ds["test"],
         compute_metrics=f1_macro,
         tokenizer=tok,
-        callbacks=callbacks,
+        data_collator=collator,
+        callbacks=callbacks + [bench],
     )
 
+    if trainer.is_world_process_zero():
+        os.makedirs(targs.output_dir, exist_ok=True)
+        with open(
+            os.path.join(targs.output_dir, "run.json"), "w", encoding="utf-8"
+        ) as f:
+            json.dump(sig, f, ensure_ascii=False, indent=2)
+
     log.info("Entrenando… API=%s | split=%s", api_note, split_note)
-    trainer.train()
+    t0 = time.perf_counter()
+    # Trainer restaura optimizador, scheduler, RNG y paso global del checkpoint
+    trainer.train(resume_from_checkpoint=resume_from)
+    train_s = time.perf_counter() - t0
 
     # Evaluación
     logits = trainer.predict(ds["test"]).predictions
     y_pred = logits.argmax(axis=1)
     y_true = np.array(ds["test"]["label"])
+    if not trainer.is_world_process_zero():
+        return
 
     from sklearn.metrics import classification_report, confusion_matrix
 
@@ -194,6 +522,22 @@ def run():
         "max_length": max_len,
         "split": split_note,
         "api": api_note,
+        "resumed_from": resume_from,
+        "bench": {
+            "train_tokens": train_tokens,
+            "train_s": round(train_s, 2),
+            "epochs": bench.epochs,
+            "peak_rss_mb": peak_rss_mb(),
+            "profile": {
+                "cpu": args.cpu,
+                "threads": torch.get_num_threads(),
+                "interop_threads": torch.get_num_interop_threads(),
+                "freeze_layers": args.freeze_layers,
+                "grad_checkpointing": args.grad_checkpointing,
+                "bf16": bool(extra.get("bf16", False)),
+                "world_size": int(os.environ.get("WORLD_SIZE", 1)),
+            },
+        },
     }
     with open(
         pjoin("reports", f"transformer_meta_{ts}.json"), "w", encoding="utf-8"
@@ -203,7 +547,150 @@ def run():
     log.info("Listo. Reportes en reports/. Split=%s | API=%s", split_note, api_note)
     print("Macro-F1:", round(rep["macro avg"]["f1-score"], 3))
     print("Split:", split_note, "| API:", api_note)
+    if args.keep_runs or args.max_out_gb is not None:
+        prune_runs(args.keep_runs, args.max_out_gb, protect={ts})
+    print(
+        f"Época(s): {[e['epoch_s'] for e in bench.epochs]} s | RSS pico: {peak_rss_mb()} MB"
+    )
+
+
+def split_idx(y, class_names):
+    """Mismo split (índices) que tokenized_splits: misma semilla y ClassLabel."""
+    ds = Dataset.from_dict(
+        {"idx": list(range(len(y))), "label": y.astype(int).tolist()}
+    ).cast(Features({"idx": Value("int64"), "label": ClassLabel(names=class_names)}))
+    try:
+        ds = ds.train_test_split(test_size=0.2, stratify_by_column="label", seed=42)
+        note = "stratified(ClassLabel)"
+    except Exception as e:
+        log.warning("Fallo split estratificado: %s. Uso split aleatorio.", e)
+        ds = ds.train_test_split(test_size=0.2, seed=42)
+        note = "random(fallback)"
+    return np.array(ds["train"]["idx"]), np.array(ds["test"]["idx"]), note
+
+
+def run_frozen(args):
+    """
+    Encoder congelado: embeddings en caché (src.features.embeddings) + cabeza
+    lineal o MLP de sklearn. Útil cuando sólo cambian etiquetas o la cabeza.
+    """
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neural_network import MLPClassifier
+
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    cfg = load_config()
+    model_id = cfg["model"].get(
+        "transformer_model", "dccuchile/bert-base-spanish-wwm-cased"
+    )
+    max_len = int(cfg["model"].get("max_length", 256))
+
+    df = pd.read_csv(pjoin("data", "interim", "limpio_final.csv")).dropna(
+        subset=["texto_raw", "sentimiento"]
+    )
+    if df.empty:
+        raise RuntimeError("limpio_final.csv está vacío o sin columnas necesarias.")
+    le = LabelEncoder()
+    y = le.fit_transform(df["sentimiento"])
+    class_names = list(le.classes_)
+
+    t0 = time.perf_counter()
+    cache = EmbeddingCache(model_id, max_len, dtype=args.emb_dtype)
+    X = cache.embed(df["texto_raw"].astype(str).tolist())
+    embed_s = time.perf_counter() - t0
+
+    tr, te, split_note = split_idx(y, class_names)
+    if args.frozen == "mlp":
+        head = MLPClassifier(
+            hidden_layer_sizes=(256,),
+            early_stopping=True,
+            max_iter=200,
+            random_state=42,
+        )
+    else:
+        head = LogisticRegression(max_iter=2000, class_weight="balanced")
+    t0 = time.perf_counter()
+    head.fit(X[tr], y[tr])
+    head_s = time.perf_counter() - t0
+    y_pred = head.predict(X[te])
+
+    name = f"transformer_frozen_{args.frozen}_{ts}"
+    rep = classification_report(
+        y[te], y_pred, target_names=class_names, digits=3, output_dict=True
+    )
+    cm = confusion_matrix(y[te], y_pred, labels=list(range(len(class_names))))
+    os.makedirs("reports", exist_ok=True)
+    os.makedirs("models", exist_ok=True)
+    pd.DataFrame(rep).to_csv(pjoin("reports", f"{name}_report.csv"))
+    pd.DataFrame(cm, index=class_names, columns=class_names).to_csv(
+        pjoin("reports", f"{name}_confusion.csv")
+    )
+    joblib.dump(
+        {
+            "head": head,
+            "labels": class_names,
+            "model_id": model_id,
+            "max_length": max_len,
+        },
+        pjoin("models", f"{name}.joblib"),
+    )
+    meta = {
+        "model_id": model_id,
+        "labels": class_names,
+        "max_length": max_len,
+        "split": split_note,
+        "head": args.frozen,
+        "emb_cache": cache.path,
+        "bench": {"embed_s": round(embed_s, 2), "head_s": round(head_s, 2)},
+    }
+    with open(pjoin("reports", f"{name}_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    log.info("Listo. Cabeza %s en models/%s.joblib", args.frozen, name)
+    print("Macro-F1:", round(rep["macro avg"]["f1-score"], 3))
+    print(f"Embeddings: {embed_s:.1f}s | cabeza: {head_s:.1f}s | split: {split_note}")
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--cpu",
+        action="store_true",
+        help="perfil CPU (hilos, bf16 si hay soporte, gloo con torchrun)",
+    )
+    ap.add_argument("--threads", type=int, default=0, help="0 = núcleos/procesos")
+    ap.add_argument("--interop-threads", type=int, default=1)
+    ap.add_argument(
+        "--freeze-layers", type=int, default=0, help="capas inferiores congeladas"
+    )
+    ap.add_argument("--grad-checkpointing", action="store_true")
+    ap.add_argument("--bf16", choices=["auto", "on", "off"], default="auto")
+    ap.add_argument(
+        "--frozen",
+        choices=["linear", "mlp"],
+        default=None,
+        help="encoder congelado + embeddings en caché; entrena sólo la cabeza",
+    )
+    ap.add_argument("--emb-dtype", choices=["float16", "float32"], default="float16")
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="continúa la última corrida compatible (mismo modelo y datos) en out/",
+    )
+    ap.add_argument(
+        "--keep-runs",
+        type=int,
+        default=0,
+        help="retención: corridas más recientes a conservar en out/ (0 = todas)",
+    )
+    ap.add_argument(
+        "--max-out-gb", type=float, default=None, help="tope de tamaño de out/"
+    )
+    return ap.parse_args(argv)
 
 
 if __name__ == "__main__":
-    run()
+    # Multi-proceso en CPU:
+    #   torchrun --nproc_per_node 4 -m src.models.train_transformer --cpu
+    args = parse_args()
+    run_frozen(args) if args.frozen else run(args)
@@ -1,32 +1,264 @@
-import pandas as pd, sys
-
-df = pd.read_csv("data/interim/limpio_sent.csv")  # viene del paso 6.1 previo
-gold = pd.read_csv("data/interim/para_anotar_gold.csv")
-
-if "sentimiento_gold" not in gold.columns:
-    print("Falta 'sentimiento_gold' en el CSV de oro.")
-    sys.exit(1)
-
-m = gold[["id", "sentimiento_gold"]].dropna()
-ok = {"pos", "neg", "neu"}
-bad = m[~m["sentimiento_gold"].isin(ok)]
-if len(bad):
-    print("Hay etiquetas fuera de {pos,neg,neu}:")
-    print(bad["sentimiento_gold"].value_counts())
-    sys.exit(1)
-
-df = df.merge(m, on="id", how="left")
-df["sentimiento"] = df["sentimiento_gold"].fillna(df["sentimiento"])
-df.drop(columns=["sentimiento_gold"], inplace=True)
-df.to_csv("data/interim/limpio_final.csv", index=False)
-
-# Resumen útil
-print("Etiquetas de sentimiento listas -> data/interim/limpio_final.csv")
-print(df["sentimiento"].value_counts(dropna=False))
-if "dieta_heuristica" in df.columns:
-    print("\nPor dieta:")
-    print(
-        df.groupby("dieta_heuristica")["sentimiento"]
-        .value_counts()
-        .unstack(fill_value=0)
+# src/preprocess/fussion_gold.py
+# Las etiquetas de oro viven en un almacén SQLite indexado por id.
+# limpio_sent.csv se parte por hash de id y limpio_final.csv se re-materializa
+# reconstruyendo sólo las particiones con etiquetas nuevas o cambiadas.
+# Cada fila lleva su posición en limpio_sent.csv (_row): limpio_final.csv sale
+# en el mismo orden que la fuente, no en orden de partición.
+#   python -m src.preprocess.fussion_gold --gold data/interim/para_anotar_gold.csv --annotator ana
+import argparse, os, shutil, sqlite3, sys
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from src.common.paths import pjoin
+from src.common.logging import get_logger
+
+log = get_logger("preprocess.fussion_gold")
+
+SENT_IN = pjoin("data", "interim", "limpio_sent.csv")  # viene del paso 6.1 previo
+GOLD_IN = pjoin("data", "interim", "para_anotar_gold.csv")
+GOLD_DB = pjoin("data", "interim", "gold.sqlite")
+PARTS_BASE = pjoin("data", "interim", "limpio_sent_parts")
+PARTS_FINAL = pjoin("data", "interim", "limpio_final_parts")
+FINAL_OUT = pjoin("data", "interim", "limpio_final.csv")
+
+OK = {"pos", "neg", "neu"}
+N_PARTS = 64
+CHUNKSIZE = 50_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS gold (
+    id TEXT PRIMARY KEY,
+    sentimiento TEXT NOT NULL CHECK (sentimiento IN ('pos', 'neg', 'neu')),
+    annotator TEXT,
+    ts TEXT NOT NULL,
+    part INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS gold_part ON gold(part);
+CREATE TABLE IF NOT EXISTS dirty_parts (part INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def particion(ids: pd.Series, n_parts: int = N_PARTS) -> np.ndarray:
+    """Partición estable por hash del id (como string)."""
+    h = pd.util.hash_pandas_object(ids.astype(str), index=False).to_numpy()
+    return (h % np.uint64(n_parts)).astype(int)
+
+
+def connect(db=GOLD_DB) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(str(db)), exist_ok=True)
+    con = sqlite3.connect(str(db))
+    con.executescript(SCHEMA)
+    return con
+
+
+def import_gold(con, gold: pd.DataFrame, annotator: str | None = None) -> int:
+    """
+    Valida e inserta/actualiza anotaciones (id, sentimiento_gold) en el almacén.
+    Marca como sucias sólo las particiones cuyas etiquetas cambiaron.
+    Devuelve el número de ids nuevos o modificados.
+    """
+    if "sentimiento_gold" not in gold.columns:
+        raise KeyError("Falta 'sentimiento_gold' en el CSV de oro.")
+    m = gold[["id", "sentimiento_gold"]].dropna()
+    m = m[m["sentimiento_gold"].astype(str).str.strip() != ""]
+    bad = m[~m["sentimiento_gold"].isin(OK)]
+    if len(bad):
+        raise ValueError(
+            "Hay etiquetas fuera de {pos,neg,neu}:\n"
+            + bad["sentimiento_gold"].value_counts().to_string()
+        )
+    if m.empty:
+        return 0
+
+    m = m.drop_duplicates("id", keep="last")
+    ids = m["id"].astype(str)
+    parts = particion(ids)
+    ts = datetime.now(timezone.utc).isoformat()
+    if annotator is None and "annotator" in gold.columns:
+        ann = [None if pd.isna(a) else str(a) for a in gold.loc[m.index, "annotator"]]
+    else:
+        ann = [annotator] * len(m)
+    rows = [
+        (i, s, a, ts, int(p))
+        for i, s, a, p in zip(ids, m["sentimiento_gold"], ann, parts)
+    ]
+
+    with con:
+        con.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS incoming (id TEXT, s TEXT, part INT)"
+        )
+        con.execute("DELETE FROM incoming")
+        con.executemany(
+            "INSERT INTO incoming VALUES (?, ?, ?)", [(r[0], r[1], r[4]) for r in rows]
+        )
+        changed = con.execute(
+            """SELECT i.part FROM incoming i LEFT JOIN gold g ON g.id = i.id
+               WHERE g.sentimiento IS NULL OR g.sentimiento != i.s"""
+        ).fetchall()
+        con.executemany(
+            "INSERT OR IGNORE INTO dirty_parts VALUES (?)", {(p,) for (p,) in changed}
+        )
+        con.executemany(
+            """INSERT INTO gold (id, sentimiento, annotator, ts, part)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET
+                   sentimiento = excluded.sentimiento,
+                   annotator = COALESCE(excluded.annotator, gold.annotator),
+                   ts = excluded.ts
+               WHERE gold.sentimiento != excluded.sentimiento""",
+            rows,
+        )
+    return len(changed)
+
+
+def _firma(path) -> str:
+    st = os.stat(path)
+    # sufijo de formato: particiones de versiones sin _row se rehacen
+    return f"{st.st_size}:{st.st_mtime_ns}:row"
+
+
+def _part_path(d, k) -> str:
+    return os.path.join(str(d), f"part_{k:03d}.csv")
+
+
+def particionar_base(con, sent_path=SENT_IN) -> bool:
+    """
+    Parte limpio_sent.csv en N_PARTS por hash de id, sólo si cambió desde la
+    última vez (tamaño + mtime). Si lo hace, marca todas las particiones sucias.
+    """
+    firma = _firma(sent_path)
+    prev = con.execute("SELECT value FROM meta WHERE key = 'sent_firma'").fetchone()
+    if prev and prev[0] == firma and os.path.isdir(str(PARTS_BASE)):
+        return False
+
+    shutil.rmtree(str(PARTS_BASE), ignore_errors=True)
+    os.makedirs(str(PARTS_BASE))
+    header, start = set(), 0
+    # id como texto: 123 y 123.0 (columna float con NaN) no deben diferir
+    for chunk in pd.read_csv(sent_path, chunksize=CHUNKSIZE, dtype={"id": str}):
+        chunk["_row"] = np.arange(start, start + len(chunk))
+        start += len(chunk)
+        chunk["_part"] = particion(chunk["id"])
+        for k, g in chunk.groupby("_part"):
+            g.drop(columns="_part").to_csv(
+                _part_path(PARTS_BASE, k), index=False, mode="a", header=k not in header
+            )
+            header.add(k)
+    with con:
+        con.execute("DELETE FROM dirty_parts")
+        con.executemany(
+            "INSERT INTO dirty_parts VALUES (?)", [(k,) for k in range(N_PARTS)]
+        )
+        con.execute("INSERT OR REPLACE INTO meta VALUES ('sent_firma', ?)", (firma,))
+    log.info("limpio_sent particionado en %d partes (%s)", len(header), PARTS_BASE)
+    return True
+
+
+def reconstruir_parte(con, k: int):
+    base = _part_path(PARTS_BASE, k)
+    out = _part_path(PARTS_FINAL, k)
+    if not os.path.exists(base):
+        if os.path.exists(out):
+            os.remove(out)
+        return
+    df = pd.read_csv(base, dtype={"id": str})
+    gold = dict(
+        con.execute("SELECT id, sentimiento FROM gold WHERE part = ?", (k,)).fetchall()
     )
+    if gold:
+        g = df["id"].astype(str).map(gold)
+        df["sentimiento"] = g.fillna(df["sentimiento"])
+    df.to_csv(out, index=False)
+
+
+def materializar(out=FINAL_OUT):
+    """Une las particiones finales en el orden de limpio_sent.csv (por _row)."""
+    files = [
+        _part_path(PARTS_FINAL, k)
+        for k in range(N_PARTS)
+        if os.path.exists(_part_path(PARTS_FINAL, k))
+    ]
+    tmp = f"{out}.tmp"
+    if files:
+        df = pd.concat([pd.read_csv(f, dtype={"id": str}) for f in files])
+        df = df.sort_values("_row", kind="stable").drop(columns="_row")
+        df.to_csv(tmp, index=False)
+    else:
+        open(tmp, "w").close()
+    os.replace(tmp, out)
+
+
+def fusionar(
+    gold_path=None, annotator: str | None = None, sent_path=SENT_IN, db=GOLD_DB
+) -> list[int]:
+    """
+    Importa el CSV de oro al almacén y actualiza limpio_final.csv
+    reconstruyendo sólo las particiones afectadas. Devuelve esas particiones.
+    gold_path=None: GOLD_IN si existe; una ruta explícita debe existir.
+    """
+    if gold_path is None:
+        gold_path = GOLD_IN if os.path.exists(GOLD_IN) else None
+    elif not os.path.exists(gold_path):
+        raise FileNotFoundError(f"No existe el CSV de oro: {gold_path}")
+    con = connect(db)
+    try:
+        if gold_path is not None:
+            n = import_gold(con, pd.read_csv(gold_path, dtype={"id": str}), annotator)
+            log.info("Oro importado de %s: %d ids nuevos/cambiados", gold_path, n)
+        particionar_base(con, sent_path)
+
+        dirty = [
+            p for (p,) in con.execute("SELECT part FROM dirty_parts ORDER BY part")
+        ]
+        if dirty or not os.path.exists(FINAL_OUT):
+            os.makedirs(str(PARTS_FINAL), exist_ok=True)
+            for k in dirty:
+                reconstruir_parte(con, k)
+            materializar()
+            with con:
+                con.execute("DELETE FROM dirty_parts")
+        log.info("Particiones reconstruidas: %d/%d", len(dirty), N_PARTS)
+        return dirty
+    finally:
+        con.close()
+
+
+def resumen(path=FINAL_OUT):
+    cols = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in ["sentimiento", "dieta_heuristica"] if c in cols]
+    df = pd.read_csv(path, usecols=usecols)
+    print(df["sentimiento"].value_counts(dropna=False))
+    if "dieta_heuristica" in df.columns:
+        print("\nPor dieta:")
+        print(
+            df.groupby("dieta_heuristica")["sentimiento"]
+            .value_counts()
+            .unstack(fill_value=0)
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--gold",
+        default=None,
+        help=f"CSV con id,sentimiento_gold (por defecto {GOLD_IN}, si existe)",
+    )
+    ap.add_argument("--annotator", default=None)
+    ap.add_argument("--no-resumen", action="store_true")
+    args = ap.parse_args()
+    try:
+        fusionar(args.gold, args.annotator)
+    except (KeyError, ValueError, FileNotFoundError) as e:
+        print(e.args[0] if e.args else e)
+        sys.exit(1)
+
+    # Resumen útil
+    print(f"Etiquetas de sentimiento listas -> {FINAL_OUT}")
+    if not args.no_resumen:
+        resumen()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # src/preprocess/label_sentimiento.py
 import re
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
@@ -13,6 +14,12 @@ SAMPLE_BAL = Path("data/interim/para_anotar_balanceado.csv")
 SAMPLE_HARD = Path("data/interim/para_anotar_dificiles.csv")
 SAMPLE_BAL_CIEGO = Path("data/interim/para_anotar_balanceado_ciego.csv")
 
+# --- Muestreo ---
+CHUNKSIZE = 10_000  # filas por bloque; la memoria no depende del corpus
+N_PER_CELL = 25  # ejemplos por celda dieta × sent_prov
+N_HARD = 400  # tope de la muestra de difíciles
+SEED = 42
+
 print(f">> label_sentimiento leyendo de: {IN}")
 
 # ---------- Léxicos y reglas ----------
@@ -174,10 +181,9 @@ def heur_sent(text_proc: str, text_raw: str):
     return base, conf, why
 
 
-def main():
-    df = pd.read_csv(IN)
-
-    # Asegura columna de dieta para no romper groupby
+def etiquetar_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica rating → heurística sobre un bloque de filas."""
+    # Asegura columna de dieta para no romper el muestreo por celdas
     if "dieta_heuristica" not in df.columns:
         df["dieta_heuristica"] = "sin_dieta"
     else:
@@ -188,36 +194,90 @@ def main():
 
     # 2) aplica heurística donde falta
     mask = df["sentimiento"].isna()
-    tmp = df.loc[mask, ["texto_proc", "texto_raw"]].fillna("")
-    res = tmp.apply(lambda r: heur_sent(r["texto_proc"], r["texto_raw"]), axis=1)
-    df.loc[mask, "sentimiento"] = [x[0] for x in res]
-    df.loc[mask, "sent_conf"] = [x[1] for x in res]
-    df.loc[mask, "sent_why"] = [x[2] for x in res]
+    df["sent_conf"] = np.nan
+    df["sent_why"] = None
+    if mask.any():
+        tmp = df.loc[mask, ["texto_proc", "texto_raw"]].fillna("")
+        res = [heur_sent(p, r) for p, r in zip(tmp["texto_proc"], tmp["texto_raw"])]
+        df.loc[mask, "sentimiento"] = [x[0] for x in res]
+        df.loc[mask, "sent_conf"] = [x[1] for x in res]
+        df.loc[mask, "sent_why"] = [x[2] for x in res]
 
     # donde había rating, confianza alta:
     df.loc[~mask, "sent_conf"] = 0.9
     df.loc[~mask, "sent_why"] = "rating"
+    return df
+
+
+def is_contradictory(s):
+    s = str(s or "")
+    return any(c in s for c in ["pero", "aunque", "sin embargo", "no obstante"])
+
+
+def reservoir_update(res, chunk, k, rng, by=None):
+    """
+    Un paso de muestreo de reservorio (A-Res con prioridades uniformes):
+    cada fila recibe una clave aleatoria y por celda `by` se conservan las
+    k claves más pequeñas. Equivale a `g.sample(k)` sobre todo el corpus pero
+    con memoria acotada a k filas por celda + el chunk actual.
+    """
+    chunk = chunk.assign(_u=rng.random(len(chunk)))
+    both = chunk if res is None else pd.concat([res, chunk], ignore_index=True)
+    both = both.sort_values("_u", kind="stable")
+    if by:
+        return both.groupby(by, sort=False, dropna=False).head(k)
+    return both.head(k)
 
-    # 3) guarda limpio_sent
-    df.to_csv(OUT, index=False)
-    print(f"Guardado {OUT} ({len(df)} filas)")
-
-    # 4) crear muestra balanceada dieta × sent_prov
-    base = df.copy()
-    base["sent_prov"] = base["sentimiento"].fillna("unk")
-    # (opcional) excluir "sin_dieta" si no quieres muestrearla:
-    # base = base[base["dieta_heuristica"] != "sin_dieta"]
-
-    N_PER_CELL = 25
-    parts = []
-    for (d, s), g in base.groupby(["dieta_heuristica", "sent_prov"]):
-        if len(g) == 0:
-            continue
-        k = min(N_PER_CELL, len(g))
-        parts.append(g.sample(k, random_state=42))
-
-    if parts:
-        balanced = pd.concat(parts, ignore_index=True).drop_duplicates("id")
+
+def muestrear(path=OUT, n_per_cell=N_PER_CELL, n_hard=N_HARD, seed=SEED):
+    """
+    Recorre `limpio_sent.csv` una sola vez en chunks y llena a la vez el
+    reservorio por celda dieta × sent_prov y el de casos difíciles.
+    Reproducible dado `seed` (no depende de CHUNKSIZE).
+    """
+    rng_bal = np.random.default_rng(seed)
+    rng_hard = np.random.default_rng(seed + 1)
+    bal, hard = None, None
+    for chunk in pd.read_csv(path, chunksize=CHUNKSIZE):
+        chunk["dieta_heuristica"] = (
+            chunk["dieta_heuristica"].fillna("sin_dieta").astype(str)
+        )
+        chunk["sent_prov"] = chunk["sentimiento"].fillna("unk")
+        # (opcional) excluir "sin_dieta" si no quieres muestrearla:
+        # chunk = chunk[chunk["dieta_heuristica"] != "sin_dieta"]
+        bal = reservoir_update(
+            bal, chunk, n_per_cell, rng_bal, by=["dieta_heuristica", "sent_prov"]
+        )
+
+        # difíciles: baja confianza o contradicción
+        dif = chunk[
+            (chunk["sent_conf"].fillna(0) <= 0.6)
+            | chunk["texto_proc"].apply(is_contradictory)
+        ]
+        hard = reservoir_update(hard, dif, n_hard, rng_hard)
+
+    drop = ["_u"]
+    if bal is not None:
+        bal = bal.drop(columns=drop).reset_index(drop=True)
+    if hard is not None:
+        hard = hard.drop(columns=drop).reset_index(drop=True)
+    return bal, hard
+
+
+def main():
+    # 1-3) etiqueta por bloques y guarda limpio_sent incremental
+    total = 0
+    for i, chunk in enumerate(pd.read_csv(IN, chunksize=CHUNKSIZE)):
+        chunk = etiquetar_chunk(chunk)
+        chunk.to_csv(OUT, index=False, mode="w" if i == 0 else "a", header=i == 0)
+        total += len(chunk)
+    print(f"Guardado {OUT} ({total} filas)")
+
+    balanced, hard = muestrear(OUT)
+
+    # 4) muestra balanceada dieta × sent_prov
+    if balanced is not None and len(balanced) > 0:
+        balanced = balanced.drop_duplicates("id")
         # Con y sin “pistas”
         balanced["sentimiento_gold"] = ""
         balanced[
@@ -240,15 +300,7 @@ def main():
         print("No se pudo crear muestra balanceada (faltan datos).")
 
     # 5) muestra de “difíciles”: baja confianza o contradicción
-    def is_contradictory(s):
-        s = str(s or "")
-        return any(c in s for c in ["pero", "aunque", "sin embargo", "no obstante"])
-
-    hard = df[
-        (df["sent_conf"].fillna(0) <= 0.6) | df["texto_proc"].apply(is_contradictory)
-    ]
-    hard = hard.sample(min(400, len(hard)), random_state=42) if len(hard) > 0 else hard
-    if len(hard) > 0:
+    if hard is not None and len(hard) > 0:
         hard = hard[
             [
                 "id",
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models import absa_extract as ax
+
+TEXTS = [
+    "tengo mucha hambre y poca energía. el precio es caro!",
+    "me encantó la rutina con mi familia",
+    "sin aspectos aquí",
+    "",
+    "antojos de noche? no_pude seguir la dieta. cansancio y fatiga",
+    "salir a un restaurante es caro pero lo recomiendo",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_index_matches_linear_lexicon_scan(text):
+    assert ax.aspect_hits(text) == ax._aspect_hits_lineal(text)
+
+
+def test_mask_ids_decode_bits():
+    assert ax._MASK_IDS[0b10110] == (1, 2, 4)
+    mask = ax.TOKEN_INDEX["caro"]
+    assert [ax.ASPECT_NAMES[i] for i in ax._MASK_IDS[mask]] == ["costo"]
+
+
+def test_extract_in_blocks_keeps_row_numbers():
+    texts = TEXTS * 7
+    one = ax.extract_batch(texts)
+    blocks = ax.extract(texts, chunk=4)
+    for k in one:
+        assert np.array_equal(one[k], blocks[k])
+    assert one["row"].max() == len(texts) - 1
+
+
+def old_rule_sentiment(s):
+    """Bucle por substring anterior al regex (referencia)."""
+    s = s.lower()
+    pos = any(k in s for k in ax.POS_KW)
+    neg = any(k in s for k in ax.NEG_KW) or "no_" in s
+    return "pos" if pos and not neg else "neg" if neg and not pos else "neu"
+
+
+@pytest.mark.parametrize(
+    "s",
+    [
+        "lo recomiendo, excelente",
+        "Me encantó :smile:",
+        "horrible, me dio mareos",
+        "no_pude con el hambre",
+        "mejoró pero con dolor",
+        "nada que decir",
+    ],
+)
+def test_keyword_regex_agrees_with_old_loop_on_whole_words(s):
+    assert ax.rule_sentiment(s) == old_rule_sentiment(s)
+
+
+@pytest.mark.parametrize(
+    "s,old,new",
+    [
+        ("no lo recomiendo", "neu", "neg"),  # la frase gana a "recomiendo"
+        ("un dolorcito leve", "neg", "neu"),  # sin coincidencias dentro de palabras
+        ("casino_abierto", "neg", "neu"),  # "no_" sólo como token de negación
+    ],
+)
+def test_keyword_regex_fixes_substring_matches(s, old, new):
+    assert (old_rule_sentiment(s), ax.rule_sentiment(s)) == (old, new)
+
+
+def test_kw_hits_positions():
+    s = "Excelente, pero no lo recomiendo :fire:"
+    hits = ax.kw_hits(s)
+    assert [(k, p) for _, _, k, p in hits] == [
+        ("excelente", "pos"),
+        ("no lo recomiendo", "neg"),
+        (":fire:", "pos"),
+    ]
+    assert all(s.lower()[a:b] == k for a, b, k, _ in hits)
+
+
+def write(path, texts):
+    pd.DataFrame(
+        {
+            "id": range(len(texts)),
+            "texto_proc": texts,
+            "dieta_heuristica": ["keto", "vegana", "ayuno"] * (len(texts) // 3)
+            + ["keto"] * (len(texts) % 3),
+        }
+    ).to_csv(path, index=False)
+
+
+def same(a, b):
+    assert a.counts.keys() == b.counts.keys()
+    assert all(np.array_equal(a.counts[d], b.counts[d]) for d in a.counts)
+
+
+def test_watermark_counts_only_appended_rows(tmp_path):
+    texts, path = TEXTS * 5, tmp_path / "limpio.csv"
+    write(path, texts)
+    full = ax.count_chunks(path, chunksize=4)
+
+    write(path, texts[:13])
+    acc = ax.count_chunks(path, chunksize=4)
+    assert (acc.start, acc.rows) == (0, 13)
+    write(path, texts)
+    new = ax.count_chunks(path, chunksize=4, start=acc.rows, expect=acc.prefix_sha1)
+    assert (new.start, new.rows) == (13, len(texts) - 13)
+    assert new.prefix_sha1 == full.prefix_sha1
+    same(acc.merge(new), full)
+
+
+def test_changed_prefix_triggers_full_recount(tmp_path):
+    path = tmp_path / "limpio.csv"
+    write(path, TEXTS * 5)
+    acc = ax.count_chunks(path, chunksize=4)
+    changed = TEXTS * 5
+    changed[2] = "el precio es caro"
+    write(path, changed)
+    new = ax.count_chunks(path, chunksize=4, start=acc.rows, expect=acc.prefix_sha1)
+    assert (new.start, new.rows) == (0, len(changed))
+    same(new, ax.count_chunks(path, chunksize=100))
+
+
+def test_counts_merge_and_json_round_trip(tmp_path):
+    a, b = ax.AbsaCounts(), ax.AbsaCounts()
+    a.add(ax.extract_batch(TEXTS), ["keto"] * len(TEXTS), lambda r, k: f"{r}:{k}")
+    b.add(ax.extract_batch(TEXTS), ["ayuno"] * len(TEXTS), lambda r, k: f"{r}:{k}")
+    a.rows, b.rows = 6, 6
+    a.save(tmp_path / "a.json")
+    loaded = ax.AbsaCounts.load(tmp_path / "a.json")
+    same(loaded, a)
+    assert loaded.examples == a.examples and loaded.start == 0
+
+    merged = loaded.merge(b)
+    assert merged.rows == 12 and set(merged.counts) == {"keto", "ayuno"}
+    other = ax.AbsaCounts()
+    other.counts, other.polarity = dict(b.counts), "onnx:x"
+    with pytest.raises(ValueError):
+        merged.merge(other)
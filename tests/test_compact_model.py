@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from src.models.compact_model import CompactModel, export
+
+TRAIN = [
+    "muy buena comida y atención",
+    "pésimo servicio, comida fría",
+    "normal, nada especial",
+    "excelente café muy rico",
+    "malo y caro",
+    "está bien para el precio",
+] * 5
+Y3 = ["pos", "neg", "neu"] * 10
+Y2 = ["pos", "neg"] * 15
+TEST = [
+    "comida muy rica",
+    "servicio malo",
+    "",
+    "Café CARO pero bueno",
+    "xyz desconocido",
+]
+
+
+def pipelines():
+    tfidf = dict(ngram_range=(1, 2), strip_accents="unicode", sublinear_tf=True)
+    return {
+        "tfidf_lr": (
+            Pipeline(
+                [("tfidf", TfidfVectorizer(**tfidf)), ("clf", LogisticRegression())]
+            ),
+            Y3,
+        ),
+        "tfidf_svm_binary": (
+            Pipeline([("tfidf", TfidfVectorizer(**tfidf)), ("clf", LinearSVC())]),
+            Y2,
+        ),
+        "split_tokenizer": (
+            Pipeline(
+                [
+                    (
+                        "tfidf",
+                        TfidfVectorizer(
+                            tokenizer=str.split, token_pattern=None, binary=True
+                        ),
+                    ),
+                    ("clf", LogisticRegression()),
+                ]
+            ),
+            Y3,
+        ),
+        "hash_sgd": (
+            Pipeline(
+                [
+                    ("hash", HashingVectorizer(n_features=2**12)),
+                    ("clf", SGDClassifier(random_state=0)),
+                ]
+            ),
+            Y3,
+        ),
+    }
+
+
+@pytest.mark.parametrize("name", list(pipelines()))
+def test_compact_matches_full_pipeline(tmp_path, name):
+    pipe, y = pipelines()[name]
+    pipe.fit(TRAIN, y)
+    export(pipe, str(tmp_path / "m.compact"))
+    cm = CompactModel(tmp_path / "m.compact")
+    np.testing.assert_allclose(
+        cm.decision_function(TEST), pipe.decision_function(TEST), atol=1e-5
+    )
+    assert cm.predict(TEST).tolist() == pipe.predict(TEST).tolist()
+
+
+def test_pruned_export_is_sparse_and_close(tmp_path):
+    pipe, y = pipelines()["tfidf_lr"]
+    pipe.fit(TRAIN, y)
+    W = pipe.named_steps["clf"].coef_
+    prune = np.quantile(np.abs(W), 0.75)
+    meta = export(pipe, str(tmp_path / "m.compact"), prune=prune)
+    assert not meta["dense"]
+    cm = CompactModel(tmp_path / "m.compact", mmap=False)
+    kept = np.where(np.abs(W) < prune, 0.0, W)
+    X = pipe.named_steps["tfidf"].transform(TEST)
+    ref = X @ kept.T + pipe.named_steps["clf"].intercept_
+    np.testing.assert_allclose(cm.decision_function(TEST), ref, atol=1e-5)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.features import embeddings as emb
+
+
+class FakeEncoder:
+    dim = 4
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen += list(texts)
+        return np.array([[len(t), t.count("a"), 1.0, 0.0] for t in texts], np.float32)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(emb, "EMB_DIR", tmp_path)
+    return tmp_path
+
+
+def make_cache():
+    c = emb.EmbeddingCache("fake-model", 32, dtype="float32")
+    c._encoder = FakeEncoder()
+    return c
+
+
+def test_embed_only_encodes_new_texts_and_survives_reload(cache_dir):
+    c = make_cache()
+    E1 = c.embed(["hola", "mundo", "hola"], chunk=1)
+    assert c.encoder.seen == ["hola", "mundo"]
+    assert E1.shape == (3, 4) and np.array_equal(E1[0], E1[2])
+
+    c2 = make_cache()
+    E2 = c2.embed(["mundo", "nada", "hola"])
+    assert c2.encoder.seen == ["nada"]
+    assert np.array_equal(E2[0], E1[1]) and np.array_equal(E2[2], E1[0])
+    assert c2.meta["n"] == 3
+
+
+def test_torn_append_is_trimmed_on_load(cache_dir):
+    c = make_cache()
+    c.embed(["a", "bb"])
+    with open(c._kpath, "ab") as f:
+        f.write(emb.text_key("ccc"))  # clave sin fila en emb.bin
+    c2 = make_cache()
+    assert c2.meta["n"] == 2
+    E = c2.embed(["ccc", "a"])
+    assert c2.encoder.seen == ["ccc"]
+    assert E[0, 0] == 3 and E[1, 0] == 1
+
+
+def test_text_key_keeps_trailing_null_bytes():
+    keys = {emb.text_key(str(i)) for i in range(5000)}
+    assert len(keys) == 5000 and all(len(k) == 16 for k in keys)
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from src.preprocess import fussion_gold as fg
+
+
+@pytest.fixture
+def con(tmp_path):
+    c = fg.connect(tmp_path / "gold.sqlite")
+    yield c
+    c.close()
+
+
+def dirty(con):
+    return {p for (p,) in con.execute("SELECT part FROM dirty_parts")}
+
+
+def gold(ids, labels):
+    return pd.DataFrame({"id": ids, "sentimiento_gold": labels})
+
+
+def test_import_gold_upserts_and_marks_only_changed_parts(con):
+    assert fg.import_gold(con, gold(["1", "2", "3"], ["pos", "neg", "neu"])) == 3
+    parts = fg.particion(pd.Series(["1", "2", "3"]))
+    assert dirty(con) == set(parts.tolist())
+
+    con.execute("DELETE FROM dirty_parts")
+    assert fg.import_gold(con, gold(["1", "2"], ["pos", "neg"])) == 0
+    assert dirty(con) == set()
+
+    assert fg.import_gold(con, gold(["2", "2"], ["neu", "pos"])) == 1
+    assert dirty(con) == {int(fg.particion(pd.Series(["2"]))[0])}
+    assert con.execute("SELECT sentimiento FROM gold WHERE id = '2'").fetchone() == (
+        "pos",
+    )
+
+
+def test_import_gold_rejects_unknown_labels(con):
+    with pytest.raises(ValueError):
+        fg.import_gold(con, gold(["1"], ["positivo"]))
+    with pytest.raises(KeyError):
+        fg.import_gold(con, pd.DataFrame({"id": ["1"], "sentimiento": ["pos"]}))
+
+
+def test_partitions_rebuild_in_source_order(con, tmp_path, monkeypatch):
+    monkeypatch.setattr(fg, "PARTS_BASE", tmp_path / "base")
+    monkeypatch.setattr(fg, "PARTS_FINAL", tmp_path / "final")
+    (tmp_path / "final").mkdir()
+    ids = ["007", "3", "12", "5", "40", "1"]
+    src = tmp_path / "sent.csv"
+    pd.DataFrame({"id": ids, "sentimiento": ["neu"] * 6}).to_csv(src, index=False)
+
+    assert fg.particionar_base(con, src)
+    assert not fg.particionar_base(con, src)  # misma firma: no se rehace
+    fg.import_gold(con, gold(["007", "5"], ["pos", "neg"]))
+    for k in dirty(con):
+        fg.reconstruir_parte(con, k)
+    out = tmp_path / "final.csv"
+    fg.materializar(out)
+
+    df = pd.read_csv(out, dtype={"id": str})
+    assert df["id"].tolist() == ids
+    assert df["sentimiento"].tolist() == ["pos", "neu", "neu", "neg", "neu", "neu"]
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from src.preprocess.label_sentimiento import reservoir_update
+
+
+def corpus(n=1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "id": np.arange(n),
+            "dieta": rng.choice(["vegana", "keto", "omni"], n),
+            "sent": rng.choice(["pos", "neg", None], n),
+        }
+    )
+
+
+def sample(df, chunksize, k, by):
+    rng, res = np.random.default_rng(42), None
+    for s in range(0, len(df), chunksize):
+        res = reservoir_update(res, df.iloc[s : s + chunksize], k, rng, by)
+    return res
+
+
+def test_reservoir_keeps_k_per_cell_including_nan():
+    df = corpus()
+    res = sample(df, 100, 5, ["dieta", "sent"])
+    sizes = res.groupby(["dieta", "sent"], dropna=False).size()
+    assert len(sizes) == 9 and (sizes == 5).all()
+    assert res["id"].is_unique
+
+
+def test_reservoir_does_not_depend_on_chunk_size():
+    df = corpus()
+    one = sample(df, len(df), 5, ["dieta", "sent"])
+    for chunksize in (1, 37, 250):
+        got = sample(df, chunksize, 5, ["dieta", "sent"])
+        assert set(got["id"]) == set(one["id"])
+
+
+def test_reservoir_without_cells_is_a_global_sample():
+    res = sample(corpus(), 64, 10, None)
+    assert len(res) == 10 and res["_u"].is_monotonic_increasing
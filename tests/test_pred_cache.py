@@ -0,0 +1,58 @@
+import numpy as np
+
+from src.models.pred_cache import PredictionCache
+
+
+class Scorer:
+    def __init__(self, dim=3):
+        self.dim, self.calls = dim, []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        s = np.array([[len(t), t.count("a"), ord(t[0]) if t else 0] for t in texts])
+        return s[:, : self.dim].astype(np.float32)
+
+
+def test_hits_dedup_and_normalization():
+    fn, c = Scorer(), PredictionCache("m")
+    a = c.scores(["Hola  mundo", "hola mundo", "chau"], fn)
+    assert fn.calls == [["Hola  mundo", "chau"]]
+    assert np.array_equal(a[0], a[1])
+
+    b = c.scores(["HOLA mundo ", "chau", "nuevo"], fn)
+    assert fn.calls[-1] == ["nuevo"]
+    assert np.array_equal(b[:2], a[[0, 2]])
+    assert c.stats()["hits"] == 3 and c.stats()["misses"] == 3
+
+
+def test_cased_cache_keeps_case_apart():
+    fn = Scorer()
+    cased = PredictionCache("m", lowercase=False)
+    cased.scores(["Hola", "hola"], fn)
+    assert fn.calls == [["Hola", "hola"]]
+    assert cased.key("hola") != PredictionCache("m").key("hola")
+
+
+def test_lru_bound_and_row_copies():
+    fn, c = Scorer(), PredictionCache("m", max_items=2)
+    c.scores(["a", "bb", "ccc"], fn)
+    assert c.stats()["mem_items"] == 2
+    assert all(v.base is None for v in c._mem.values())
+    c.scores(["a"], fn)
+    assert fn.calls[-1] == ["a"]
+
+
+def test_disk_level_survives_new_instance(tmp_path):
+    db = tmp_path / "preds.sqlite"
+    fn = Scorer(dim=1)
+    c = PredictionCache("m", disk_path=db)
+    first = c.scores(["uno", "dos"], fn)
+    c.close()
+
+    c2 = PredictionCache("m", disk_path=db)
+    again = c2.scores(["dos", "uno"], fn)
+    assert len(fn.calls) == 1 and again.ndim == 1
+    assert np.array_equal(again, first[::-1])
+    assert c2.stats()["disk_hits"] == 2
+    assert PredictionCache("otro", disk_path=db).scores(["uno"], fn).shape == (1,)
+    assert len(fn.calls) == 2
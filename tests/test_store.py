@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features import store
+
+DOCS = ["Muy buena cena", "cena mala", None, "buena buena comida", "café"]
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "limpio.csv"
+    pd.DataFrame({"id": [10, 11, 12, 13, 14], "texto_proc": DOCS}).to_csv(
+        path, index=False
+    )
+    return path
+
+
+@pytest.mark.parametrize("kind,ngram", [("tfidf", 2), ("bow", 1)])
+def test_build_matches_count_vectorizer_and_reloads(csv, tmp_path, kind, ngram):
+    params = store.analyzer_params(kind, ngram)
+    st = store.build(csv, params, str(tmp_path / "fs"))
+    vec = store.make_vectorizer(params)
+    ref = vec.fit_transform([d or "" for d in DOCS])
+    assert st.vocab.tolist() == vec.get_feature_names_out().tolist()
+    assert (st.X != ref).nnz == 0
+
+    again = store.FeatureStore(tmp_path / "fs")
+    assert (again.X != ref).nnz == 0
+    assert again.rows([13, "10"]).tolist() == [3, 0]
+    assert np.array_equal(store.doc_freq(again.X), (ref > 0).sum(axis=0).A1)
+
+
+def test_columns_skips_unknown_terms(csv, tmp_path):
+    st = store.build(csv, store.analyzer_params("bow"), str(tmp_path / "fs"))
+    j = st.columns(["cena", "zzz", "buena", "cena"])
+    assert sorted(st.vocab[j].tolist()) == ["buena", "cena"]
+
+
+def test_columns_on_empty_vocabulary(tmp_path):
+    path = tmp_path / "vacio.csv"
+    pd.DataFrame({"id": [1], "texto_proc": [None]}).to_csv(path, index=False)
+    st = store.build(path, store.analyzer_params("bow"), str(tmp_path / "fs"))
+    assert st.X.shape == (1, 0)
+    assert st.columns(["cena"]).size == 0
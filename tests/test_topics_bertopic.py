@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models import topics_bertopic as tb
+
+
+class FakeBERTopic:
+    """Como BERTopic tras fit_transform: ids renumerados por frecuencia."""
+
+    def __init__(self, clusters, docs):
+        sizes = pd.Series(clusters).value_counts()
+        order = [c for c in sizes.index if c != -1]
+        self.mapping = {c: i for i, c in enumerate(order)} | {-1: -1}
+        self.topics_ = [self.mapping[c] for c in clusters]
+        self.docs = docs
+
+    def get_topic(self, t):
+        docs = [d for d, k in zip(self.docs, self.topics_) if k == t]
+        return [(w, 1.0) for w in sorted(set(" ".join(docs).split()))]
+
+    def get_representative_docs(self, t):
+        return [d for d, k in zip(self.docs, self.topics_) if k == t][:3]
+
+
+@pytest.fixture
+def out_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tb, "pjoin", lambda *p: tmp_path.joinpath(*p))
+    monkeypatch.setattr(tb, "DOC_TOPIC", tmp_path / "doc_topic.npy")
+    return tmp_path
+
+
+def check_alignment(out_dir, docs):
+    terms = pd.read_csv(out_dir / "reports" / "topics_bertopic.csv")
+    examples = pd.read_csv(out_dir / "reports" / "topics_bertopic_examples.csv")
+    labels = np.load(out_dir / "doc_topic.npy")
+    assert list(terms.columns) == ["topic", "terms"]
+    assert list(examples.columns) == ["topic", "rank", "texto_proc"]
+    for t, words in zip(terms["topic"], terms["terms"]):
+        assigned = " ".join(d for d, k in zip(docs, labels) if k == t).split()
+        assert set(words.split(", ")) <= set(assigned)
+    for t, doc in zip(examples["topic"], examples["texto_proc"]):
+        assert labels[docs.index(doc)] == t
+
+
+def test_export_uses_renumbered_topics(out_dir):
+    # cluster 2 es el más grande: BERTopic lo renumera como tópico 0
+    docs = ["pan arroz"] * 2 + ["gym pesas"] * 3 + ["keto grasa"] * 5 + ["nada"]
+    clusters = [0] * 2 + [1] * 3 + [2] * 5 + [-1]
+    model = FakeBERTopic(clusters, docs)
+    labels = tb.export(model)
+    assert labels.tolist() == model.topics_
+    assert labels.tolist() != clusters
+    check_alignment(out_dir, docs)
+
+
+def test_represent_labels_align_with_terms(out_dir):
+    pytest.importorskip("bertopic")
+    vocab = {0: "pan arroz fideo", 1: "gym pesas correr", 2: "keto grasa carne"}
+    clusters = np.array([0] * 10 + [1] * 20 + [2] * 30, dtype=np.int32)
+    docs = [vocab[c] for c in clusters]
+    Z = np.eye(3, dtype=np.float32)[clusters]
+    model = tb.represent(docs, Z, clusters)
+    tb.export(model)
+    check_alignment(out_dir, docs)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+from gensim import corpora, models
+
+from src.models import topics_lda as tl
+
+DOCS = [
+    "keto grasa cetosis energía",
+    "ayuno hambre ventana agua",
+    "keto carbohidratos grasa cetosis",
+    "ayuno ventana horas hambre",
+    "vegana legumbres proteína tofu",
+    "vegana tofu proteína soja",
+] * 5
+
+
+def write(path, docs):
+    pd.DataFrame({"id": range(len(docs)), "texto_proc": docs}).to_csv(path, index=False)
+
+
+def lda_on(texts, k=3):
+    dic = corpora.Dictionary(texts)
+    corpus = [dic.doc2bow(t) for t in texts]
+    lda = models.LdaModel(corpus, id2word=dic, num_topics=k, passes=2, random_state=0)
+    return lda, dic
+
+
+def test_scan_prefix_fingerprints_consumed_rows(tmp_path):
+    path = tmp_path / "limpio.csv"
+    write(path, DOCS[:10])
+    fp, seen, tail, fp_all = tl.scan_prefix(path, chunksize=4)
+    assert (seen, tail, fp) == (10, [], fp_all)
+
+    write(path, DOCS[:10] + ["nuevo doc", None])
+    fp2, seen2, tail2, _ = tl.scan_prefix(path, rows=10, chunksize=3)
+    assert (fp2, seen2, tail2) == (fp, 10, [["nuevo", "doc"], []])
+
+    changed = list(DOCS[:10])
+    changed[4] = "reescrita"
+    write(path, changed + ["nuevo doc"])
+    assert tl.scan_prefix(path, rows=10)[0] != fp
+
+
+def test_grow_vocab_appends_frequent_new_terms(monkeypatch):
+    texts = [d.split() for d in DOCS]
+    lda, dic = lda_on(texts)
+    before = dict(dic.token2id)
+    new = [
+        d.split() + ["menta"] * (i < 6) + ["rara"] * (i < 2) for i, d in enumerate(DOCS)
+    ]
+
+    assert tl.grow_vocab(lda, dic, new) == 1
+    assert all(dic.token2id[t] == i for t, i in before.items())
+    assert dic.token2id["menta"] == len(before) and "rara" not in dic.token2id
+    assert lda.num_terms == len(dic) and lda.state.sstats.shape == (3, len(dic))
+    lda.update([dic.doc2bow(t) for t in new])
+    assert lda.get_topics().shape == (3, len(dic))
+
+    monkeypatch.setattr(tl, "KEEP_N", len(dic))
+    more = [t + ["nueva"] for t in new]
+    assert tl.grow_vocab(lda, dic, more) == 0
+
+
+@pytest.mark.parametrize("measure", ["c_v", "u_mass"])
+def test_coherence_cache_reuses_accumulator(tmp_path, measure):
+    from gensim.models.coherencemodel import CoherenceModel
+
+    texts = [d.split() for d in DOCS]
+    dic = corpora.Dictionary(texts)
+    corpus = [dic.doc2bow(t) for t in texts]
+    topics = [["keto", "grasa", "cetosis"], ["ayuno", "hambre", "ventana"]]
+    calls = []
+
+    def texts_fn():
+        calls.append(1)
+        return texts
+
+    def coherence(cm, tops):
+        cm.topics = tops
+        return cm.get_coherence_per_topic()
+
+    first = tl.coherence_cache(measure, topics, dic, corpus, texts_fn, tmp_path, 3)
+    cached = tl.coherence_cache(measure, topics[:1], dic, corpus, texts_fn, tmp_path, 3)
+    assert len(calls) == (measure == "c_v")
+    ref = CoherenceModel(
+        topics=topics, texts=texts, dictionary=dic, coherence=measure, topn=3
+    )
+    np.testing.assert_allclose(coherence(cached, topics), ref.get_coherence_per_topic())
+    np.testing.assert_allclose(coherence(first, topics), ref.get_coherence_per_topic())
+
+    # tópicos con palabras fuera del acumulador: se vuelve a estimar
+    tl.coherence_cache(
+        measure, [["vegana", "tofu", "soja"]], dic, corpus, texts_fn, tmp_path, 3
+    )
+    assert len(calls) == 2 * (measure == "c_v")
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from src.models.train_baseline import hash_split, make_groups
+
+
+def frame(n=2000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "video_id": np.where(rng.random(n) < 0.5, rng.integers(0, 300, n), None),
+            "url": [f"u{i % 700}" if i % 3 else "" for i in range(n)],
+        }
+    )
+
+
+def test_hash_split_is_stable_across_chunks():
+    df = frame()
+    whole = hash_split(make_groups(df), 0.2, 42)
+    parts = [
+        hash_split(make_groups(df.iloc[s : s + 128], offset=s), 0.2, 42)
+        for s in range(0, len(df), 128)
+    ]
+    assert np.array_equal(whole, np.concatenate(parts))
+
+
+def test_hash_split_keeps_groups_together():
+    g = make_groups(frame())
+    te = pd.Series(hash_split(g, 0.2, 42)).groupby(g.to_numpy())
+    assert (te.nunique() == 1).all()
+    ids = pd.Series(np.arange(20_000)).astype(str)
+    assert 0.18 < hash_split(ids, 0.2, 42).mean() < 0.22
+
+
+def test_hash_split_depends_on_seed():
+    g = pd.Series(np.arange(1000)).astype(str)
+    assert not np.array_equal(hash_split(g, 0.5, 1), hash_split(g, 0.5, 2))
+    assert np.array_equal(hash_split(g, 0.5, 7), hash_split(g, 0.5, 7))
@@ -0,0 +1,56 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from src.models.train_transformer import freeze_lower_layers
+
+
+def tiny_bert():
+    cfg = transformers.BertConfig(
+        vocab_size=100,
+        hidden_size=32,
+        num_hidden_layers=4,
+        num_attention_heads=2,
+        intermediate_size=64,
+        num_labels=3,
+    )
+    torch.manual_seed(0)
+    return transformers.BertForSequenceClassification(cfg)
+
+
+@pytest.mark.parametrize("reentrant", [True, False])
+def test_frozen_layers_with_grad_checkpointing_still_train_upper_layers(reentrant):
+    model = tiny_bert()
+    assert freeze_lower_layers(model, 2) > 0
+    model.gradient_checkpointing_enable(
+        gradient_checkpointing_kwargs={"use_reentrant": reentrant}
+    )
+    model.train()
+    ids = torch.randint(0, 100, (4, 12))
+    out = model(input_ids=ids, labels=torch.tensor([0, 1, 2, 0]))
+    out.loss.backward()
+
+    layers = model.bert.encoder.layer
+    for layer in layers[:2]:
+        assert all(p.grad is None for p in layer.parameters())
+    for layer in layers[2:]:
+        assert all(p.grad is not None for p in layer.parameters())
+    assert model.bert.embeddings.word_embeddings.weight.grad is None
+
+
+def test_grad_checkpointing_flag_applies_without_cpu_profile(tmp_path, monkeypatch):
+    from src.models.train_transformer import (
+        checkpointing_kwargs,
+        make_training_args,
+        parse_args,
+    )
+
+    monkeypatch.chdir(tmp_path)
+    args = parse_args(["--grad-checkpointing"])
+    assert not args.cpu
+    targs, _, _ = make_training_args("t", 1, 2, checkpointing_kwargs(args))
+    assert targs.gradient_checkpointing
+    kw = getattr(targs, "gradient_checkpointing_kwargs", None)
+    assert kw is None or kw == {"use_reentrant": False}
+    assert checkpointing_kwargs(parse_args([])) == {}